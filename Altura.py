@@ -1,25 +1,151 @@
-import lgpio
+from hal import lgpio
 import time
 import statistics
 import numpy as np
 
-def leer_distancia_promedio():
+import calibracion
+import estadistica_robusta
+from ultrasonico import EcoHCSR04, MedianaSecuencial
+
+def medir_eco_sondeo(h, TRIG_PIN, ECHO_PIN):
+    """
+    Ancho del eco en segundos leyendo ECHO en un bucle (depende de cuándo
+    Python alcanza a leer el pin)
+    """
+    # Limpieza robusta del trigger
+    lgpio.gpio_write(h, TRIG_PIN, 0)
+    time.sleep(0.0001)  # 100μs de estabilizacion
+    
+    # Pulso de trigger optimizado
+    lgpio.gpio_write(h, TRIG_PIN, 1)
+    time.sleep(0.000012)  # 12μs - tiempo optimo
+    lgpio.gpio_write(h, TRIG_PIN, 0)
+    
+    # Pequena pausa antes de medicion
+    time.sleep(0.00001)
+    
+    # Timeouts precisos
+    timeout_inicio = 0.005  # 5ms para inicio
+    timeout_fin = 0.025     # 25ms maximo (~4.3m)
+    
+    # Esperar inicio del eco con alta precision
+    inicio_timeout = time.time()
+    while lgpio.gpio_read(h, ECHO_PIN) == 0:
+        if time.time() - inicio_timeout > timeout_inicio:
+            raise Exception("Timeout inicio eco")
+        time.sleep(0.0000002)  # 0.2μs - mayor precision
+    
+    inicio_eco = time.perf_counter()  # Mayor precision temporal
+    
+    # Esperar fin del eco
+    inicio_timeout = time.time()
+    while lgpio.gpio_read(h, ECHO_PIN) == 1:
+        if time.time() - inicio_timeout > timeout_fin:
+            raise Exception("Timeout fin eco")
+        time.sleep(0.0000002)  # 0.2μs
+    
+    fin_eco = time.perf_counter()  # Mayor precision temporal
+    
+    return fin_eco - inicio_eco
+
+def leer_distancia_secuencial(objetivo=0.3, tiempo_max=3.0, min_lecturas=15, intervalo=0.06):
+    """
+    Dispara pings hasta que el intervalo de confianza (95%) de la mediana
+    queda dentro de ±objetivo cm, o hasta tiempo_max segundos
+    """
+    TRIG_PIN = 23
+    ECHO_PIN = 24
+    
+    eco = None
+    try:
+        h = lgpio.gpiochip_open(0)
+        eco = EcoHCSR04(h, TRIG_PIN, ECHO_PIN)
+        
+        print(f"Midiendo distancia hasta ±{objetivo} cm (maximo {tiempo_max} segundos)...")
+        
+        estimador = MedianaSecuencial()
+        inicio = time.time()
+        lecturas_invalidas = 0
+        
+        while time.time() - inicio < tiempo_max:
+            distancia_cm = eco.medir()
+            if distancia_cm is None or not (2.0 <= distancia_cm <= 400.0):
+                lecturas_invalidas += 1
+            else:
+                estimador.agregar(distancia_cm)
+                if estimador.n >= min_lecturas and estimador.semiancho() <= objetivo:
+                    break
+            # El HC-SR04 necesita ~60ms entre disparos
+            time.sleep(intervalo)
+        
+        if estimador.n < min_lecturas:
+            print(f"Insuficientes lecturas validas: {estimador.n}")
+            return None
+        
+        # Geometria de montaje (calibracion.json, sección "ultrasonico")
+        geometria = calibracion.calibracion().seccion('ultrasonico')
+        distancia_final = estimador.mediana() * geometria['factor']
+        semiancho = estimador.semiancho() * geometria['factor']
+        referencia = geometria['altura_referencia']
+        resultado = referencia - distancia_final
+        
+        tiempo_total = time.time() - inicio
+        
+        print(f"\n--- RESULTADOS DETALLADOS ---")
+        print(f"Tiempo total: {tiempo_total:.2f}s")
+        print(f"Lecturas validas: {estimador.n}")
+        print(f"Lecturas invalidas: {lecturas_invalidas}")
+        print(f"Desviacion (MAD): {estimador.mad():.3f} cm")
+        print(f"Distancia medida: {distancia_final:.3f} cm ± {semiancho:.3f}")
+        if semiancho > objetivo:
+            print(f"Aviso: no se llego a ±{objetivo} cm en {tiempo_max} segundos")
+        print(f"Calculo: {referencia:g} - {distancia_final:.3f} = {resultado:.3f}")
+        
+        return round(resultado, 3)
+    
+    except Exception as e:
+        print(f"Error general: {e}")
+        return None
+    finally:
+        try:
+            if eco is not None:
+                eco.close()
+            lgpio.gpiochip_close(h)
+        except:
+            pass
+
+def leer_distancia_promedio(modo='secuencial'):
     """
-    Version mejorada con filtrado avanzado y tecnicas de precision
+    Version mejorada con filtrado avanzado y tecnicas de precision.
+    modo='secuencial' mide hasta que la mediana es confiable
+    (leer_distancia_secuencial); modo='alertas' toma un numero fijo de
+    lecturas con el ancho del eco de los timestamps del kernel (alertas de
+    lgpio); modo='sondeo' lee el pin en un bucle.
     """
+    if modo == 'secuencial':
+        return leer_distancia_secuencial()
+    
     # Configuracion de pines
     TRIG_PIN = 23
     ECHO_PIN = 24
     
     # Parametros configurables
-    NUM_LECTURAS = 200  # Mas muestras para mejor estadistica
-    TIEMPO_TOTAL = 10   # Segundos para completar lecturas
+    if modo == 'alertas':
+        NUM_LECTURAS = 40   # El ancho del eco no tiene jitter de Python
+        TIEMPO_TOTAL = 2.5  # Segundos para completar lecturas
+    else:
+        NUM_LECTURAS = 200  # Mas muestras para mejor estadistica
+        TIEMPO_TOTAL = 10   # Segundos para completar lecturas
     
+    eco = None
     try:
         # Inicializar GPIO
         h = lgpio.gpiochip_open(0)
-        lgpio.gpio_claim_output(h, TRIG_PIN)
-        lgpio.gpio_claim_input(h, ECHO_PIN)
+        if modo == 'alertas':
+            eco = EcoHCSR04(h, TRIG_PIN, ECHO_PIN)
+        else:
+            lgpio.gpio_claim_output(h, TRIG_PIN)
+            lgpio.gpio_claim_input(h, ECHO_PIN)
         
         print(f"Realizando {NUM_LECTURAS} lecturas de distancia en {TIEMPO_TOTAL} segundos...")
         
@@ -32,42 +158,14 @@ def leer_distancia_promedio():
         
         for i in range(NUM_LECTURAS):
             try:
-                # Limpieza robusta del trigger
-                lgpio.gpio_write(h, TRIG_PIN, 0)
-                time.sleep(0.0001)  # 100μs de estabilizacion
-                
-                # Pulso de trigger optimizado
-                lgpio.gpio_write(h, TRIG_PIN, 1)
-                time.sleep(0.000012)  # 12μs - tiempo optimo
-                lgpio.gpio_write(h, TRIG_PIN, 0)
-                
-                # Pequena pausa antes de medicion
-                time.sleep(0.00001)
-                
-                # Timeouts precisos
-                timeout_inicio = 0.005  # 5ms para inicio
-                timeout_fin = 0.025     # 25ms maximo (~4.3m)
-                
-                # Esperar inicio del eco con alta precision
-                inicio_timeout = time.time()
-                while lgpio.gpio_read(h, ECHO_PIN) == 0:
-                    if time.time() - inicio_timeout > timeout_inicio:
-                        raise Exception("Timeout inicio eco")
-                    time.sleep(0.0000002)  # 0.2μs - mayor precision
-                
-                inicio_eco = time.perf_counter()  # Mayor precision temporal
-                
-                # Esperar fin del eco
-                inicio_timeout = time.time()
-                while lgpio.gpio_read(h, ECHO_PIN) == 1:
-                    if time.time() - inicio_timeout > timeout_fin:
-                        raise Exception("Timeout fin eco")
-                    time.sleep(0.0000002)  # 0.2μs
-                
-                fin_eco = time.perf_counter()  # Mayor precision temporal
+                if eco is not None:
+                    duracion = eco.medir_ancho()
+                    if duracion is None:
+                        raise Exception("Timeout eco")
+                else:
+                    duracion = medir_eco_sondeo(h, TRIG_PIN, ECHO_PIN)
                 
                 # Calcular distancia
-                duracion = fin_eco - inicio_eco
                 distancia_cm = (duracion * velocidad_sonido) / 2
                 duracion_us = duracion * 1000000
                 
@@ -109,46 +207,18 @@ def leer_distancia_promedio():
                 continue
         
         # ANALISIS ESTADISTICO AVANZADO
-        if len(lecturas_cm) < 40:
+        if len(lecturas_cm) < NUM_LECTURAS // 5:
             print(f"Insuficientes lecturas validas: {len(lecturas_cm)}")
             return None
         
-        # Convertir a numpy array para analisis
-        array_distancias = np.array(lecturas_cm)
-        
-        # Filtrado por desviacion estandar multiple
-        media_inicial = np.mean(array_distancias)
-        std_inicial = np.std(array_distancias)
-        
-        # Primer filtrado: 2.5 sigma
-        distancias_filtradas1 = array_distancias[
-            abs(array_distancias - media_inicial) <= 2.5 * std_inicial
-        ]
-        
-        if len(distancias_filtradas1) < 30:
-            distancias_filtradas1 = array_distancias
-        
-        # Segundo filtrado: percentiles 10-90
-        p10, p90 = np.percentile(distancias_filtradas1, [10, 90])
-        distancias_filtradas2 = distancias_filtradas1[
-            (distancias_filtradas1 >= p10) & (distancias_filtradas1 <= p90)
-        ]
-        
-        if len(distancias_filtradas2) < 25:
-            distancias_filtradas2 = distancias_filtradas1
-        
-        # Calculo final usando media recortada
-        if len(distancias_filtradas2) >= 10:
-            # Media del 50% central
-            p25, p75 = np.percentile(distancias_filtradas2, [25, 75])
-            distancias_finales = distancias_filtradas2[
-                (distancias_filtradas2 >= p25) & (distancias_filtradas2 <= p75)
-            ]
-            distancia_final = statistics.mean(distancias_finales) if len(distancias_finales) > 5 else statistics.median(distancias_filtradas2)
-        else:
-            distancia_final = statistics.median(distancias_filtradas2)
+        # Rechazo por MAD y media recortada del 50% central
+        distancia_final, distancias_filtradas = estadistica_robusta.estimar(lecturas_cm, k=2.5, recorte=0.25)
         
-        resultado = 196 - distancia_final
+        # Geometria de montaje (calibracion.json, sección "ultrasonico")
+        geometria = calibracion.calibracion().seccion('ultrasonico')
+        distancia_final *= geometria['factor']
+        referencia = geometria['altura_referencia']
+        resultado = referencia - distancia_final
         
         # ESTADISTICAS DETALLADAS
         tiempo_total = time.time() - inicio
@@ -158,10 +228,10 @@ def leer_distancia_promedio():
         print(f"Lecturas totales: {NUM_LECTURAS}")
         print(f"Lecturas validas: {len(lecturas_cm)} ({len(lecturas_cm)/NUM_LECTURAS*100:.1f}%)")
         print(f"Lecturas invalidas: {lecturas_invalidas}")
-        print(f"Desviacion estandar: {np.std(distancias_filtradas2):.3f} cm")
+        print(f"Desviacion estandar: {np.std(distancias_filtradas):.3f} cm")
         print(f"Distancia medida: {distancia_final:.3f} cm")
-        print(f"Rango final: {np.min(distancias_filtradas2):.2f} - {np.max(distancias_filtradas2):.2f} cm")
-        print(f"Calculo: 196 - {distancia_final:.3f} = {resultado:.3f}")
+        print(f"Rango final: {np.min(distancias_filtradas):.2f} - {np.max(distancias_filtradas):.2f} cm")
+        print(f"Calculo: {referencia:g} - {distancia_final:.3f} = {resultado:.3f}")
         
         return round(resultado, 3)
             
@@ -170,6 +240,8 @@ def leer_distancia_promedio():
         return None
     finally:
         try:
+            if eco is not None:
+                eco.close()
             lgpio.gpiochip_close(h)
         except:
             pass
@@ -1,13 +1,19 @@
-import lgpio
+from hal import lgpio
+import math
 import time
 
+from autocero import AutoCero
+import calibracion
+import filtros_bascula
+import hx711
+
 # Pines
 DOUT = 5
 SCK = 6
 
-# Valores de calibración predefinidos (usa tus valores reales)
-OFFSET = 131640  # Tu offset anterior que funciona
-CALIBRATION_FACTOR = 23000.0  # Ajusta este valor según necesites
+# Offset y escala (cuentas por kg) salen de calibracion.json, sección "bascula",
+# el mismo archivo que calibra peso_bascula.BalanzaPi5
+cal = calibracion.calibracion()
 
 # Crear handle para GPIO
 h = lgpio.gpiochip_open(0)
@@ -16,55 +22,58 @@ lgpio.gpio_claim_output(h, SCK)
 
 def read_raw():
     """Lee 24 bits del HX711 (modo canal A, ganancia 128)."""
-    # Esperar a que el HX711 esté listo (DOUT = LOW)
-    while lgpio.gpio_read(h, DOUT) == 1:
-        time.sleep(0.001)
-
-    count = 0
-    # Leer 24 bits
-    for _ in range(24):
-        lgpio.gpio_write(h, SCK, 1)
-        count = (count << 1) | lgpio.gpio_read(h, DOUT)
-        lgpio.gpio_write(h, SCK, 0)
+    # Espera a que DOUT baje y descarta las lecturas cortadas por un apagado;
+    # el pulso extra selecciona canal A (ganancia 128)
+    return hx711.leer_cuenta(h, DOUT, SCK, pulsos_extra=1, timeout=None)
 
-    # Un pulso extra para seleccionar canal A (ganancia 128)
-    lgpio.gpio_write(h, SCK, 1)
-    lgpio.gpio_write(h, SCK, 0)
+# Hilo que lee el HX711 a su tasa (80 SPS), ver iniciar_muestreo()
+muestreo = None
+# Seguimiento del cero mientras la plataforma está vacía; un proceso corto
+# como Bascula3 casi nunca la ve vacía (ver autocero)
+autocero = None
 
-    # Convertir a número con signo (24 bits)
-    if count & 0x800000:
-        count -= 0x1000000
+def iniciar_muestreo(capacidad=800):
+    """Arranca (una sola vez) la lectura continua del HX711 en segundo plano,
+    sin glitches saturados y con los picos filtrados (ver filtros_bascula)."""
+    global muestreo, autocero
+    if muestreo is None:
+        muestreo = hx711.MuestreadorHX711(read_raw, capacidad, filtros_bascula.filtro_por_defecto())
+    muestreo.start()
+    if autocero is None:
+        autocero = AutoCero(muestreo, cal)
+        autocero.start()
+    return muestreo
 
-    return count
+def detener_muestreo():
+    global muestreo, autocero
+    if autocero is not None:
+        autocero.stop()
+        autocero = None
+    if muestreo is not None:
+        muestreo.stop()
+        muestreo = None
 
 def leer_peso_promediado(mediciones=100):
     """Toma múltiples mediciones y devuelve el promedio automáticamente."""
     print(f"Iniciando medición automática de {mediciones} muestras...")
     
-    pesos = []
-    raw_values = []
+    # Las muestras las toma el hilo; aquí solo se espera a tener suficientes
+    m = iniciar_muestreo(max(mediciones, 800))
+    for i in range(20, mediciones + 1, 20):
+        if not m.wait_for_samples(i, timeout=1.0):
+            print(f"Error en medición {len(m) + 1}: Timeout esperando sensor HX711")
+            break
+        print(f"Progreso: {i}/{mediciones} mediciones")
+    m.wait_for_samples(mediciones, timeout=1.0)
     
-    for i in range(mediciones):
-        try:
-            raw_val = read_raw()
-            peso = (raw_val - OFFSET) / CALIBRATION_FACTOR
-            
-            pesos.append(peso)
-            raw_values.append(raw_val)
-            
-            # Mostrar progreso
-            if (i + 1) % 20 == 0:
-                print(f"Progreso: {i + 1}/{mediciones} mediciones")
-            
-            time.sleep(0.05)  # Pausa corta entre mediciones
-            
-        except Exception as e:
-            print(f"Error en medición {i + 1}: {e}")
+    raw_values = m.recent(mediciones).tolist()
+    c = cal.seccion('bascula')
+    pesos = [(raw_val - c['offset']) / c['escala'] for raw_val in raw_values]
     
     if pesos:
-        # Calcular resultados
-        peso_promedio = sum(pesos) / len(pesos)
-        raw_promedio = sum(raw_values) / len(raw_values)
+        # Calcular resultados (media sin el 10% de cada extremo)
+        peso_promedio = filtros_bascula.media_recortada(pesos, 0.1)
+        raw_promedio = filtros_bascula.media_recortada(raw_values, 0.1)
         
         # Calcular precisión
         diferencia_max = max(pesos) - min(pesos)
@@ -73,14 +82,107 @@ def leer_peso_promediado(mediciones=100):
         print(f"Raw promedio: {raw_promedio:.0f}")
         print(f"Peso promedio: {peso_promedio:.4f} kg")
         print(f"Rango de variación: {diferencia_max:.4f} kg")
-        print(f"Offset usado: {OFFSET}")
-        print(f"Factor usado: {CALIBRATION_FACTOR}")
+        print(f"Offset usado: {c['offset']}")
+        print(f"Factor usado: {c['escala']}")
         
         return peso_promedio
     else:
         print("❌ No se pudieron completar las mediciones")
         return 0.0
 
+class Welford:
+    """Media y varianza acumuladas en O(1) por muestra (algoritmo de Welford)."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.n = 0
+        self.media = 0.0
+        self._m2 = 0.0
+
+    def agregar(self, x):
+        self.n += 1
+        delta = x - self.media
+        self.media += delta / self.n
+        self._m2 += delta * (x - self.media)
+
+    @property
+    def varianza(self):
+        return self._m2 / (self.n - 1) if self.n > 1 else 0.0
+
+    @property
+    def error_estandar(self):
+        return math.sqrt(self.varianza / self.n) if self.n > 1 else float('inf')
+
+def leer_peso_estable(tolerancia=0.05, permanencia=0.5, duracion_max=5.0, salto=0.5, min_muestras=10):
+    """
+    Pesa hasta que la lectura se asienta: el error estándar de la media
+    queda por debajo de `tolerancia` kg durante `permanencia` segundos y
+    en ese tiempo la media no se corre más de `tolerancia` (si se corre,
+    el paciente todavía se estaba acomodando y la media se reinicia).
+    Una muestra que se aleja de la media más de `salto` kg (o de 4
+    desviaciones, si el tramo ya es ruidoso) reinicia la media: el
+    paciente se movió. Si pasan `duracion_max` segundos sin asentarse
+    devuelve el promedio del último segundo de muestras.
+    """
+    print(f"Iniciando medición adaptativa (tolerancia {tolerancia} kg)...")
+    
+    m = iniciar_muestreo()
+    m.clear()
+    c = cal.seccion('bascula')
+    est = Welford()
+    inicio = time.monotonic()
+    estable_desde = None
+    estable = False
+    
+    while time.monotonic() - inicio < duracion_max:
+        try:
+            raw_val = m.next_sample()
+        except hx711.ErrorHX711 as e:
+            print(f"Error en medición: {e}")
+            continue
+        peso = (raw_val - c['offset']) / c['escala']
+        
+        umbral = salto
+        if est.n >= min_muestras:
+            umbral = max(salto, 4 * math.sqrt(est.varianza))
+        if est.n and abs(peso - est.media) > umbral:
+            est.reset()
+            estable_desde = None
+        est.agregar(peso)
+        
+        ahora = time.monotonic()
+        if est.n >= min_muestras and est.error_estandar < tolerancia:
+            if estable_desde is None:
+                estable_desde = ahora
+                media_inicial = est.media
+            elif ahora - estable_desde >= permanencia:
+                if abs(est.media - media_inicial) < tolerancia:
+                    estable = True
+                    break
+                est.reset()
+                estable_desde = None
+        else:
+            estable_desde = None
+    
+    if not est.n:
+        print("❌ No se pudieron completar las mediciones")
+        return 0.0
+    
+    peso_final = est.media
+    if not estable:
+        peso_final = (m.mean_over(80) - c['offset']) / c['escala']
+    
+    print(f"\n=== RESULTADOS ===")
+    print(f"Peso promedio: {peso_final:.4f} kg")
+    print(f"Muestras: {est.n} en {time.monotonic() - inicio:.2f} s")
+    print(f"Desviación estándar: {math.sqrt(est.varianza):.4f} kg")
+    if not estable:
+        print("⚠️ El peso no se estabilizó, se usa el promedio del último segundo")
+    
+    return peso_final
+
 # --- Ejecución automática al iniciar ---
 if __name__ == "__main__":
     try:
@@ -95,7 +197,8 @@ if __name__ == "__main__":
         peso_final = 0.0
     
     finally:
-        # Limpiar GPIO
+        # Detener el muestreo y limpiar GPIO
+        detener_muestreo()
         lgpio.gpiochip_close(h)
     
     # El valor queda disponible para ser importado
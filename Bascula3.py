@@ -1,5 +1,5 @@
-from Bascula2 import leer_peso_promediado
+from Bascula2 import leer_peso_estable
 
-# Ejecutar automáticamente las 100 mediciones y obtener promedio
-peso = leer_peso_promediado(100)
+# Pesar hasta que la lectura se estabilice (máximo 5 s)
+peso = leer_peso_estable()
 print(f"Peso: {peso:.2f} kg")
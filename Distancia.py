@@ -1,13 +1,17 @@
 from gpiozero import DistanceSensor
 import time
-import statistics
+
+import calibracion
+import estadistica_robusta
 
 class MedidorEstaturaPi5:
-    def __init__(self, trig_pin=23, echo_pin=24, referencia_cm=210):
+    def __init__(self, trig_pin=23, echo_pin=24, referencia_cm=None):
         self.TRIG = trig_pin
         self.ECHO = echo_pin
-        self.REFERENCIA_CM = referencia_cm
-        self.ALTURA_SENSOR = 210
+        # Altura del sensor sobre el piso (calibracion.json, sección "ultrasonico");
+        # sin referencia_cm se calibra contra el piso
+        self.ALTURA_SENSOR = calibracion.obtener('ultrasonico', 'altura_referencia')
+        self.REFERENCIA_CM = referencia_cm if referencia_cm is not None else self.ALTURA_SENSOR
         
         print("Inicializando medidor para Raspberry Pi 5...")
         
@@ -50,8 +54,8 @@ class MedidorEstaturaPi5:
         print("CALIBRACION DEL SENSOR")
         print("="*50)
         print("Pasos para calibracion:")
-        print("1. Sensor a 210 cm de altura")
-        print("2. Parate a 210 cm del sensor")
+        print(f"1. Sensor a {self.ALTURA_SENSOR:g} cm de altura")
+        print(f"2. Superficie a {self.REFERENCIA_CM:g} cm del sensor")
         print("3. Postura recta y quieta")
         print("4. Buen ambiente (luz, poco ruido)")
         
@@ -81,11 +85,13 @@ class MedidorEstaturaPi5:
             print("- Objetos en rango 2-200 cm")
             
             if len(distancias_validas) == 0:
-                print("Calibracion fallida. Usando factor 1.0")
-                return 1.0
+                factor = calibracion.obtener('ultrasonico', 'factor')
+                print(f"Calibracion fallida. Usando factor guardado {factor:.3f}")
+                return factor
         
-        distancia_promedio = statistics.median(distancias_validas)
+        distancia_promedio, _ = estadistica_robusta.estimar(distancias_validas)
         factor = self.REFERENCIA_CM / distancia_promedio
+        calibracion.guardar('ultrasonico', factor=round(factor, 4))
         
         print(f"\nRESULTADOS CALIBRACION:")
         print(f"Distancia medida: {distancia_promedio:.1f} cm")
@@ -101,7 +107,7 @@ class MedidorEstaturaPi5:
         for i in range(mediciones):
             distancia = self.medir_distancia_robusta()
             if distancia:
-                distancia_calibrada = 200-distancia * self.factor_calibracion
+                distancia_calibrada = distancia * self.factor_calibracion
                 distancias.append(distancia_calibrada)
                 print(f"Medida {i+1}: {distancia_calibrada:.1f} cm")
             else:
@@ -112,7 +118,7 @@ class MedidorEstaturaPi5:
             print("Muy pocas mediciones validas")
             return None
         
-        distancia_final = statistics.median(distancias)
+        distancia_final, _ = estadistica_robusta.estimar(distancias)
         estatura = self.ALTURA_SENSOR - distancia_final
         
         if 100 <= estatura <= 220:
@@ -174,5 +180,5 @@ class MedidorEstaturaPi5:
             print("Prueba terminada")
 
 if __name__ == "__main__":
-    medidor = MedidorEstaturaPi5(referencia_cm=210)
+    medidor = MedidorEstaturaPi5()
     medidor.menu_principal()
\ No newline at end of file
@@ -2,7 +2,7 @@ import Temperatura_cuerpo2
 
 
 # Ejecutar el programa principal del encoder y capturar el valor retornado
-valor_final = Temperatura_cuerpo2.leer_temperatura_promedio()
+valor_final = Temperatura_cuerpo2.leer_temperatura_corporal()
 
 # Imprimir el resultado
 print(f"\nValor final leído del mlx90614: {valor_final:.2f}")
\ No newline at end of file
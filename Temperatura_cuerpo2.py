@@ -1,45 +1,52 @@
-import time
-import board
-import busio
-import adafruit_mlx90614
+from termometro import ErrorTermometro, termometro
 
-def leer_temperatura_promedio():
+# Lecturas que se promedian; el MLX90614 da una nueva cada ~0.1 s
+NUM_LECTURAS = 20
+
+def leer_temperatura_promedio(lecturas=NUM_LECTURAS):
     """
-    Función que lee la temperatura 10 veces y retorna el promedio
+    Función que promedia varias lecturas del termómetro (media recortada)
     Returns:
         float: Temperatura promedio
     """
-    # Inicializar comunicación I2C
-    i2c = busio.I2C(board.SCL, board.SDA)
-    
-    # Crear objeto del sensor
-    mlx = adafruit_mlx90614.MLX90614(i2c)
-    Temp_tot = 0
-    
-    for i in range(1, 1001):
-        # Leer temperatura del objeto
-        temp_object = mlx.object_temperature
-        Temp_tot += temp_object
-        print(f"Lectura {i}: {temp_object:.2f}°C")
-        time.sleep(0.01)
-    
-    Temp_prom = Temp_tot / 1000
+    # El sensor (I2C real o simulado) queda abierto entre llamadas
+    mlx = termometro()
+    print(f"Leyendo {lecturas} temperaturas...")
+    Temp_prom = mlx.promedio(lecturas, timeout=lecturas * mlx.periodo * 3 + 1)
     print(f'La temperatura promedio es {Temp_prom:.2f}°C')
     
     return Temp_prom
 
+def leer_temperatura_corporal():
+    """
+    Función que espera la frente, descarta la subida y termina cuando la
+    lectura se estabiliza (con compensación por temperatura ambiente)
+    Returns:
+        float: Temperatura corporal
+    """
+    print("Acerque la frente al sensor...")
+    try:
+        medicion = termometro().medir_corporal()
+    except ErrorTermometro as e:
+        print(f"{e}; se promedian lecturas")
+        return leer_temperatura_promedio()
+    if not medicion.convergio:
+        print("Aviso: la lectura no llegó a estabilizarse")
+    print(f"Objeto: {medicion.objeto:.2f}°C - Ambiente: {medicion.ambiente:.2f}°C ({medicion.duracion:.1f}s)")
+    print(f'La temperatura corporal es {medicion.temperatura:.2f}°C')
+    
+    return medicion.temperatura
+
 def leer_temperatura_instantanea():
     """
     Función que retorna una sola lectura de temperatura
     Returns:
         float: Temperatura instantánea
     """
-    i2c = busio.I2C(board.SCL, board.SDA)
-    mlx = adafruit_mlx90614.MLX90614(i2c)
-    return mlx.object_temperature
+    return termometro().leer()
 
 # Este bloque solo se ejecuta si el archivo se ejecuta directamente
 if __name__ == "__main__":
     # Código que solo se ejecuta cuando runs este archivo directamente
-    temperatura = leer_temperatura_promedio()
-    print(f"Ejecución directa - Temperatura: {temperatura:.2f}°C")
\ No newline at end of file
+    temperatura = leer_temperatura_corporal()
+    print(f"Ejecución directa - Temperatura: {temperatura:.2f}°C")
@@ -0,0 +1,84 @@
+# -*-coding:utf-8-*-
+
+from collections import namedtuple
+
+# register field encodings (MAX30102 datasheet)
+# FIFO_CONFIG[7:5] SMP_AVE
+SAMPLE_AVERAGE_BITS = {1: 0, 2: 1, 4: 2, 8: 3, 16: 4, 32: 5}
+# SPO2_CONFIG[6:5] SPO2_ADC_RGE, full scale in nA
+ADC_RANGE_BITS = {2048: 0, 4096: 1, 8192: 2, 16384: 3}
+# SPO2_CONFIG[4:2] SPO2_SR, in Hz
+SAMPLE_RATE_BITS = {50: 0, 100: 1, 200: 2, 400: 3, 800: 4, 1000: 5, 1600: 6, 3200: 7}
+# SPO2_CONFIG[1:0] LED_PW, in us (69us = 15-bit ... 411us = 18-bit ADC)
+PULSE_WIDTH_BITS = {69: 0, 118: 1, 215: 2, 411: 3}
+
+_FIELDS = [
+    'name',
+    'sample_rate',     # ADC samples per second
+    'sample_average',  # samples averaged into each FIFO sample
+    'pulse_width',     # LED pulse width in us
+    'adc_range',       # ADC full scale in nA
+    'led_current',     # LED1/LED2 pulse amplitude register (0.2mA per step)
+    'fifo_a_full',     # FIFO_A_FULL, free slots left when A_FULL fires
+    'window',          # samples per HR/SpO2 window
+    'min_dist',        # minimum distance between valleys, in samples
+]
+
+
+class AcquisitionProfile(namedtuple('AcquisitionProfile', _FIELDS)):
+    """
+    MAX30102 register settings together with the hrcalc parameters
+    that match the sample rate they produce.
+    """
+    __slots__ = ()
+
+    @property
+    def sample_freq(self):
+        """
+        Samples per second that reach the FIFO.
+        """
+        return self.sample_rate // self.sample_average
+
+    def fifo_config(self):
+        # fifo rollover = false
+        return SAMPLE_AVERAGE_BITS[self.sample_average] << 5 | self.fifo_a_full
+
+    def spo2_config(self):
+        return (ADC_RANGE_BITS[self.adc_range] << 5
+                | SAMPLE_RATE_BITS[self.sample_rate] << 2
+                | PULSE_WIDTH_BITS[self.pulse_width])
+
+    def hrcalc_params(self):
+        """
+        Keyword arguments for hrcalc.calc_hr_and_spo2 / StreamingEstimator.
+        """
+        return {
+            'sample_freq': self.sample_freq,
+            'buffer_size': self.window,
+            'min_dist': self.min_dist,
+        }
+
+
+PROFILES = {
+    # 50Hz / 2 with 17-bit pulses, half the LED on-time of standard
+    'low_power': AcquisitionProfile('low_power', 50, 2, 215, 4096, 0x24, 0x0f, 100, 4),
+    # the values of the sample Arduino code: 100Hz / 4 = 25Hz, 4 s windows
+    'standard': AcquisitionProfile('standard', 100, 4, 411, 4096, 0x24, 0x0f, 100, 4),
+    # no averaging: 100Hz, same 4 s window and 160 ms valley distance
+    'high_resolution': AcquisitionProfile('high_resolution', 100, 1, 411, 4096, 0x24, 0x0f, 400, 16),
+}
+
+DEFAULT_PROFILE = 'standard'
+
+
+def get_profile(profile=None):
+    """
+    Profile by name (DEFAULT_PROFILE when None), profiles are passed through.
+    """
+    if profile is None:
+        profile = DEFAULT_PROFILE
+    if isinstance(profile, AcquisitionProfile):
+        return profile
+    if profile not in PROFILES:
+        raise ValueError("unknown acquisition profile: {0}".format(profile))
+    return PROFILES[profile]
@@ -0,0 +1,114 @@
+"""
+Seguimiento automático del cero de la báscula.
+
+El offset del HX711 se corre con la temperatura y el tiempo. Mientras
+la plataforma está vacía (las últimas muestras quedan cerca del cero y
+casi sin ruido) AutoCero acerca el offset de a poco a lo que se lee, y
+cada tanto lo guarda en calibracion.json para el próximo proceso.
+
+El seguimiento solo corre mientras vive el proceso que muestrea la
+báscula y solo con la plataforma vacía. En el kiosco ese proceso es
+Bascula3, que se lanza para cada medición y casi siempre arranca con el
+paciente ya arriba, así que ahí apenas corrige algo; donde sigue el cero
+de verdad es en un proceso que queda abierto, como el menú de
+peso_bascula.BalanzaPi5. Una deriva mayor que la banda no se sigue y
+necesita una tara.
+"""
+
+import atexit
+import threading
+import time
+
+import numpy as np
+
+import calibracion
+
+# división de la báscula en kg
+DIVISION = 0.1
+
+
+class AutoCero(object):
+    """
+    Sigue el cero con las muestras de un MuestreadorHX711.
+
+    Cada `ventana` muestras nuevas (un segundo a 80 SPS): si su media está
+    a menos de `banda` kg del cero y su desviación es menor a `ruido_max`
+    kg, el offset se corre una fracción `alfa` hacia la media, pero nunca
+    más de `paso_max` kg por ventana (1/20 de división, 0.3 kg por minuto):
+    un objeto liviano que quedó arriba tarda en desaparecer mucho más que
+    una medición. El offset se guarda cada `periodo` segundos y al
+    detenerse, si cambió al menos `minimo` cuentas.
+    """
+
+    def __init__(self, muestreo, cal=None, ventana=80, banda=0.2, ruido_max=0.05,
+                 alfa=0.1, paso_max=DIVISION / 20, periodo=60.0, minimo=5):
+        self.muestreo = muestreo
+        self.cal = cal if cal is not None else calibracion.calibracion()
+        self.ventana = ventana
+        self.banda = banda
+        self.ruido_max = ruido_max
+        self.alfa = alfa
+        self.paso_max = paso_max
+        self.periodo = periodo
+        self.minimo = minimo
+        self.vacia = False
+        self.guardado = self.cal.obtener('bascula', 'offset')
+        self._ultimo_guardado = time.monotonic()
+        self._visto = 0
+        self._parar = threading.Event()
+        self._hilo = None
+
+    def actualizar(self):
+        """
+        Evalúa las últimas muestras; True si la plataforma está vacía.
+        """
+        total = self.muestreo.muestras.count
+        if total < self._visto:
+            # clear() del muestreo volvió la cuenta a cero
+            self._visto = 0
+        if total - self._visto < self.ventana:
+            return self.vacia
+        self._visto = total
+        cuentas = self.muestreo.recent(self.ventana)
+        c = self.cal.seccion('bascula')
+        media = float(np.mean(cuentas))
+        self.vacia = (abs(media - c['offset']) / c['escala'] < self.banda
+                      and float(np.std(cuentas)) / c['escala'] < self.ruido_max)
+        if self.vacia:
+            limite = self.paso_max * abs(c['escala'])
+            correccion = min(limite, max(-limite, self.alfa * (media - c['offset'])))
+            self.cal.ajustar('bascula', offset=c['offset'] + correccion)
+        if time.monotonic() - self._ultimo_guardado >= self.periodo:
+            self.guardar()
+        return self.vacia
+
+    def guardar(self):
+        offset = round(self.cal.obtener('bascula', 'offset'), 1)
+        self._ultimo_guardado = time.monotonic()
+        if abs(offset - self.guardado) >= self.minimo:
+            self.cal.guardar('bascula', offset=offset)
+            self.guardado = offset
+
+    def start(self):
+        if self._hilo is not None:
+            return
+        self._parar.clear()
+        self._hilo = threading.Thread(target=self._seguir, daemon=True)
+        self._hilo.start()
+        # los procesos de medición son cortos: al salir se guarda lo seguido
+        atexit.register(self.stop)
+
+    def stop(self):
+        if self._hilo is None:
+            return
+        self._parar.set()
+        self._hilo.join(timeout=1)
+        self._hilo = None
+        atexit.unregister(self.stop)
+        self.guardar()
+
+    def _seguir(self):
+        # media ventana a 80 SPS, para no perder una por el jitter del muestreo
+        intervalo = self.ventana / 160.0
+        while not self._parar.wait(intervalo):
+            self.actualizar()
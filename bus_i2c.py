@@ -0,0 +1,246 @@
+"""
+Dueño único del bus I2C del kiosco.
+
+El MAX30102 y el MLX90614 están en el mismo bus. BusI2C abre un solo
+smbus.SMBus y un hilo ejecuta las transacciones del proceso de a una y por
+prioridad: vaciar la FIFO del PPG va antes que consultar el termómetro. Lo
+que se encoló mientras el bus estaba ocupado se ejecuta en tanda.
+
+Una transacción suelta ya la serializa el kernel. Lo que necesita varias
+seguidas (vaciar la FIFO, leer juntos los registros del termómetro) va
+dentro de ClienteI2C.operacion(): mientras dure, el bus solo atiende al
+hilo que la pidió y se tiene un flock sobre un archivo de bloqueo, así las
+mediciones de otros procesos del kiosco (cada una corre en su subproceso)
+no se intercalan. Entre procesos no hay prioridades, solo ese bloqueo.
+
+Los sensores reciben un ClienteI2C, que tiene los métodos de smbus.SMBus
+que usan y mide la latencia de sus transacciones.
+"""
+
+import fcntl
+import heapq
+import itertools
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from hal import smbus
+
+PRIORIDAD_PPG = 0
+PRIORIDAD_TERMOMETRO = 10
+
+ARCHIVO_BLOQUEO = os.environ.get('KIOSCO_I2C_BLOQUEO', '/tmp/kiosco-i2c-{0}.lock')
+# segundos que ejecutar() espera una transacción (otro proceso con el bus reservado)
+ESPERA_MAX = 2.0
+
+
+class _Transaccion(object):
+
+    # metodo None es el pedido de reserva de operacion()
+    def __init__(self, cliente, metodo, argumentos):
+        self.cliente = cliente
+        self.metodo = metodo
+        self.argumentos = argumentos
+        self.hilo = threading.get_ident()
+        self.encolada = time.perf_counter()
+        self.resultado = None
+        self.error = None
+        self.lista = threading.Event()
+        # quien la pidió dejó de esperarla, el hilo del bus la salta
+        self.cancelada = False
+
+
+class ClienteI2C(object):
+    """
+    Un dispositivo del bus: read/write_i2c_block_data y read/write_byte_data
+    como smbus.SMBus, ejecutados por el BusI2C con la prioridad del cliente.
+    """
+
+    def __init__(self, bus, nombre, prioridad):
+        self.bus = bus
+        self.nombre = nombre
+        self.prioridad = prioridad
+        self.transacciones = 0
+        self.latencia_media = 0.0
+        self.latencia_max = 0.0
+
+    def _registrar(self, latencia):
+        self.transacciones += 1
+        self.latencia_media += (latencia - self.latencia_media) / self.transacciones
+        self.latencia_max = max(self.latencia_max, latencia)
+
+    def read_i2c_block_data(self, direccion, reg, n=32):
+        return self.bus.ejecutar(self, 'read_i2c_block_data', (direccion, reg, n))
+
+    def write_i2c_block_data(self, direccion, reg, datos):
+        return self.bus.ejecutar(self, 'write_i2c_block_data', (direccion, reg, list(datos)))
+
+    def read_byte_data(self, direccion, reg):
+        return self.bus.ejecutar(self, 'read_byte_data', (direccion, reg))
+
+    def write_byte_data(self, direccion, reg, valor):
+        return self.bus.ejecutar(self, 'write_byte_data', (direccion, reg, valor))
+
+    @contextmanager
+    def operacion(self):
+        """
+        Reserva el bus para varias transacciones seguidas de este hilo; otros
+        hilos y procesos esperan a que termine. Se puede anidar.
+        """
+        self.bus.reservar(self)
+        try:
+            yield self
+        finally:
+            self.bus.liberar()
+
+    def close(self):
+        # el bus es de todos, lo cierra BusI2C.close()
+        pass
+
+
+class BusI2C(object):
+    """
+    smbus.SMBus(canal) compartido, con un hilo que atiende las transacciones
+    por prioridad (número menor primero, en orden de llegada si empatan).
+    Una transacción que no se atiende en `espera_max` segundos lanza OSError.
+    """
+
+    def __init__(self, canal=1, archivo_bloqueo=None, espera_max=ESPERA_MAX):
+        if not smbus:
+            raise ImportError("smbus no está disponible")
+        self.canal = canal
+        self.espera_max = espera_max
+        self.smbus = smbus.SMBus(canal)
+        self.clientes = {}
+        self.tandas = 0
+        self._cola = []
+        self._orden = itertools.count()
+        # hilo con una operación en curso y cuántas hay anidadas
+        self._dueno = None
+        self._anidadas = 0
+        self._cond = threading.Condition()
+        self._bloqueo = open((archivo_bloqueo or ARCHIVO_BLOQUEO).format(canal), 'a')
+        self._activo = True
+        self._hilo = threading.Thread(target=self._atender, daemon=True)
+        self._hilo.start()
+
+    def cliente(self, nombre, prioridad):
+        """
+        El ClienteI2C de `nombre` (se crea la primera vez).
+        """
+        with self._cond:
+            if nombre not in self.clientes:
+                self.clientes[nombre] = ClienteI2C(self, nombre, prioridad)
+            return self.clientes[nombre]
+
+    def ejecutar(self, cliente, metodo, argumentos):
+        """
+        Encola una transacción y espera su resultado; los errores del bus se
+        relanzan en quien la pidió. Si no se atiende en espera_max segundos
+        se cancela y lanza OSError.
+        """
+        transaccion = _Transaccion(cliente, metodo, argumentos)
+        with self._cond:
+            if not self._activo:
+                raise OSError("el bus I2C está cerrado")
+            heapq.heappush(self._cola, (cliente.prioridad, next(self._orden), transaccion))
+            self._cond.notify()
+        if not transaccion.lista.wait(self.espera_max):
+            with self._cond:
+                if not transaccion.lista.is_set():
+                    transaccion.cancelada = True
+                    self._cola = [e for e in self._cola if e[2] is not transaccion]
+                    heapq.heapify(self._cola)
+                    raise OSError("Timeout esperando el bus I2C ({0})".format(transaccion.cliente.nombre))
+        if transaccion.error is not None:
+            raise transaccion.error
+        return transaccion.resultado
+
+    def reservar(self, cliente):
+        with self._cond:
+            if self._dueno == threading.get_ident():
+                self._anidadas += 1
+                return
+        # la reserva pasa por la cola como una transacción, con su prioridad
+        self.ejecutar(cliente, None, ())
+
+    def liberar(self):
+        with self._cond:
+            self._anidadas -= 1
+            if self._anidadas:
+                return
+            self._dueno = None
+            fcntl.flock(self._bloqueo, fcntl.LOCK_UN)
+            self._cond.notify()
+
+    def _atendible(self, transaccion):
+        return self._dueno is None or transaccion.hilo == self._dueno
+
+    def _atender(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: not self._activo or
+                                    any(self._atendible(e[2]) for e in self._cola))
+                tanda = sorted(e for e in self._cola if self._atendible(e[2]))
+                if not tanda:
+                    return
+                self._cola = [e for e in self._cola if not self._atendible(e[2])]
+                heapq.heapify(self._cola)
+            self.tandas += 1
+            for i, (_, _, transaccion) in enumerate(tanda):
+                if transaccion.cancelada:
+                    continue
+                if transaccion.metodo is None:
+                    # el resto de la tanda espera a que termine la operación
+                    with self._cond:
+                        for entrada in tanda[i + 1:]:
+                            heapq.heappush(self._cola, entrada)
+                    fcntl.flock(self._bloqueo, fcntl.LOCK_EX)
+                    with self._cond:
+                        if transaccion.cancelada:
+                            # se cansó de esperar el bloqueo de otro proceso
+                            fcntl.flock(self._bloqueo, fcntl.LOCK_UN)
+                        else:
+                            self._dueno = transaccion.hilo
+                            self._anidadas = 1
+                            transaccion.lista.set()
+                    break
+                try:
+                    transaccion.resultado = getattr(self.smbus, transaccion.metodo)(*transaccion.argumentos)
+                except Exception as e:
+                    transaccion.error = e
+                transaccion.cliente._registrar(time.perf_counter() - transaccion.encolada)
+                transaccion.lista.set()
+
+    def latencias(self):
+        """
+        Por dispositivo: transacciones, latencia media y máxima (cola + bus) en segundos.
+        """
+        with self._cond:
+            return {nombre: {'transacciones': c.transacciones,
+                             'media': c.latencia_media,
+                             'max': c.latencia_max}
+                    for nombre, c in self.clientes.items()}
+
+    def close(self):
+        with self._cond:
+            self._activo = False
+            self._cond.notify()
+        self._hilo.join(timeout=1)
+        self.smbus.close()
+        self._bloqueo.close()
+
+
+_buses = {}
+_buses_lock = threading.Lock()
+
+
+def bus_i2c(canal=1):
+    """
+    El BusI2C compartido del proceso para `canal`.
+    """
+    with _buses_lock:
+        if canal not in _buses:
+            _buses[canal] = BusI2C(canal)
+        return _buses[canal]
@@ -0,0 +1,131 @@
+"""
+Calibración de todos los sensores del kiosco en un solo archivo JSON.
+
+El archivo se lee una vez por proceso y queda en memoria; cada consulta
+solo revisa con os.stat() si otro programa lo cambió y en ese caso lo
+vuelve a leer. Las escrituras van a un archivo temporal que reemplaza al
+original con os.replace(), así un proceso nunca lee un archivo a medias y
+calibrar desde cualquier herramienta se ve en todas las demás.
+
+    bascula      offset (cuentas del HX711 sin peso), escala (cuentas por kg)
+    ultrasonico  altura_referencia (cm del sensor al piso), factor (corrección
+                 de escala de la distancia medida)
+    termometro   offset (°C que se suman a la temperatura del objeto),
+                 coef_ambiente (corporal = objeto + coef * (objeto - ambiente))
+"""
+
+import copy
+import json
+import os
+import tempfile
+import threading
+
+ARCHIVO = os.environ.get('KIOSCO_CALIBRACION',
+                         os.path.join(os.path.dirname(os.path.abspath(__file__)), 'calibracion.json'))
+
+POR_DEFECTO = {
+    'bascula': {'offset': 131640, 'escala': 23000.0},
+    'ultrasonico': {'altura_referencia': 196.0, 'factor': 1.0},
+    'termometro': {'offset': 0.0, 'coef_ambiente': 0.0},
+}
+
+
+class Calibracion(object):
+
+    def __init__(self, archivo=ARCHIVO):
+        self.archivo = archivo
+        self._datos = copy.deepcopy(POR_DEFECTO)
+        self._firma = None
+        self._lock = threading.Lock()
+
+    def _firma_archivo(self):
+        try:
+            st = os.stat(self.archivo)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def _recargar_si_cambio(self):
+        firma = self._firma_archivo()
+        if firma == self._firma:
+            return
+        datos = copy.deepcopy(POR_DEFECTO)
+        if firma is not None:
+            try:
+                with open(self.archivo) as f:
+                    leidos = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Error cargando calibracion: {e}")
+                leidos = {}
+            if 'offset' in leidos and 'scale' in leidos:
+                # formato viejo de peso_bascula: offset y cuentas por gramo
+                leidos = {'bascula': {'offset': leidos['offset'], 'escala': leidos['scale'] * 1000.0}}
+            for sensor, valores in leidos.items():
+                datos.setdefault(sensor, {}).update(valores)
+        self._datos = datos
+        self._firma = firma
+
+    def seccion(self, sensor):
+        """
+        Copia de los valores de un sensor.
+        """
+        with self._lock:
+            self._recargar_si_cambio()
+            return dict(self._datos[sensor])
+
+    def obtener(self, sensor, clave):
+        with self._lock:
+            self._recargar_si_cambio()
+            return self._datos[sensor][clave]
+
+    def ajustar(self, sensor, **valores):
+        """
+        Cambia valores solo en memoria (por ejemplo el cero que sigue AutoCero);
+        si otro proceso guarda el archivo, lo guardado manda.
+        """
+        with self._lock:
+            self._recargar_si_cambio()
+            self._datos.setdefault(sensor, {}).update(valores)
+
+    def guardar(self, sensor, **valores):
+        """
+        Actualiza valores de un sensor y escribe el archivo de forma atómica.
+        """
+        with self._lock:
+            # lo que otro proceso haya guardado no se pisa
+            self._recargar_si_cambio()
+            self._datos.setdefault(sensor, {}).update(valores)
+            carpeta = os.path.dirname(os.path.abspath(self.archivo))
+            fd, temporal = tempfile.mkstemp(prefix='.calibracion', dir=carpeta)
+            try:
+                with os.fdopen(fd, 'w') as f:
+                    json.dump(self._datos, f, indent=4)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.chmod(temporal, 0o644)
+                os.replace(temporal, self.archivo)
+            except BaseException:
+                os.unlink(temporal)
+                raise
+            self._firma = self._firma_archivo()
+
+
+_calibraciones = {}
+
+
+def calibracion(archivo=ARCHIVO):
+    """
+    La Calibracion compartida del proceso para `archivo`.
+    """
+    archivo = os.path.abspath(archivo)
+    if archivo not in _calibraciones:
+        _calibraciones[archivo] = Calibracion(archivo)
+    return _calibraciones[archivo]
+
+
+def obtener(sensor, clave):
+    return calibracion().obtener(sensor, clave)
+
+
+def guardar(sensor, **valores):
+    calibracion().guardar(sensor, **valores)
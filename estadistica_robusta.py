@@ -0,0 +1,133 @@
+"""
+Estimadores robustos para lecturas ruidosas de los sensores.
+
+Todo trabaja sobre arrays de NumPy. estimar() ordena las lecturas una
+sola vez: la mediana, la MAD, el tramo que sobrevive al rechazo (contiguo
+en el array ordenado) y sus extremos recortados salen de ese array.
+mediana_ordenada y mad_ordenada sirven también a los filtros de flujo,
+que ya mantienen sus muestras ordenadas. Para un solo estadístico sobre
+datos sin ordenar, percentiles y media_recortada usan np.partition.
+"""
+
+from bisect import bisect_left
+
+import numpy as np
+
+# MAD * 1.4826 estima la desviación estándar de un ruido normal
+ESCALA_MAD = 1.4826
+
+
+def percentiles(valores, qs):
+    """
+    Percentiles (0-100) con interpolación lineal, como np.percentile.
+    """
+    x = np.asarray(valores, dtype=float)
+    if x.size == 0:
+        raise ValueError("no hay valores")
+    posicion = np.asarray(qs, dtype=float) / 100.0 * (x.size - 1)
+    bajo = np.floor(posicion).astype(int)
+    alto = np.minimum(bajo + 1, x.size - 1)
+    parcial = np.partition(x, np.union1d(bajo, alto))
+    return parcial[bajo] + (parcial[alto] - parcial[bajo]) * (posicion - bajo)
+
+
+def mediana_ordenada(ordenadas):
+    """
+    Mediana de una secuencia ya ordenada, sin copiarla.
+    """
+    m = len(ordenadas) // 2
+    if len(ordenadas) % 2:
+        return ordenadas[m]
+    return (ordenadas[m - 1] + ordenadas[m]) / 2.0
+
+
+def mad_ordenada(ordenadas, centro=None):
+    """
+    MAD de una secuencia ya ordenada, respecto de `centro` (su mediana si no
+    se da). A cada lado del centro las desviaciones ya están en orden, así
+    que se recorren de adentro hacia afuera hasta la del medio, sin ordenar.
+    """
+    if centro is None:
+        centro = mediana_ordenada(ordenadas)
+    n = len(ordenadas)
+    derecha = bisect_left(ordenadas, centro)
+    izquierda = derecha - 1
+    desvios = []
+    for _ in range(n // 2 + 1):
+        if izquierda < 0 or (derecha < n and ordenadas[derecha] - centro <= centro - ordenadas[izquierda]):
+            desvios.append(ordenadas[derecha] - centro)
+            derecha += 1
+        else:
+            desvios.append(centro - ordenadas[izquierda])
+            izquierda -= 1
+    if n % 2:
+        return desvios[-1]
+    return (desvios[-2] + desvios[-1]) / 2.0
+
+
+def mediana(valores):
+    return float(percentiles(valores, [50])[0])
+
+
+def mad(valores, centro=None):
+    """
+    Mediana de las desviaciones absolutas a `centro` (la mediana si no se da).
+    """
+    x = np.asarray(valores, dtype=float)
+    if centro is None:
+        centro = mediana(x)
+    return mediana(np.abs(x - centro))
+
+
+def rechazo_mad(valores, k=3.0):
+    """
+    Los valores a no más de k desviaciones (estimadas con la MAD) de la mediana.
+    """
+    x = np.asarray(valores, dtype=float)
+    centro = mediana(x)
+    limite = k * ESCALA_MAD * mad(x, centro)
+    return x[np.abs(x - centro) <= limite]
+
+
+def media_recortada_ordenada(ordenadas, recorte=0.1):
+    """
+    media_recortada de valores ya ordenados: los extremos son las puntas del array.
+    """
+    n = len(ordenadas)
+    k = int(n * recorte)
+    if n - 2 * k <= 0:
+        raise ValueError("no hay valores para promediar")
+    return float(np.mean(ordenadas[k:n - k]))
+
+
+def media_recortada(valores, recorte=0.1):
+    """
+    Media sin el `recorte` (fracción) más bajo ni el más alto de los valores.
+    """
+    x = np.asarray(valores, dtype=float)
+    n = x.size
+    k = int(n * recorte)
+    if n - 2 * k <= 0:
+        raise ValueError("no hay valores para promediar")
+    if k == 0:
+        return float(x.mean())
+    parcial = np.partition(x, [k, n - k - 1])
+    return float(parcial[k:n - k].mean())
+
+
+def estimar(valores, k=3.0, recorte=0.25, minimo=5):
+    """
+    Rechazo por MAD y media recortada de lo que queda. Devuelve
+    (estimación, valores conservados ordenados); si el rechazo deja menos
+    de `minimo` valores se promedian todos.
+    """
+    ordenadas = np.sort(np.asarray(valores, dtype=float))
+    centro = mediana_ordenada(ordenadas)
+    limite = k * ESCALA_MAD * mad_ordenada(ordenadas, centro)
+    # lo que está a no más de `limite` de la mediana es un tramo contiguo
+    desde = np.searchsorted(ordenadas, centro - limite, 'left')
+    hasta = np.searchsorted(ordenadas, centro + limite, 'right')
+    conservados = ordenadas[desde:hasta]
+    if conservados.size < minimo:
+        conservados = ordenadas
+    return media_recortada_ordenada(conservados, recorte), conservados
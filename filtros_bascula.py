@@ -0,0 +1,139 @@
+"""
+Filtros para las cuentas del HX711.
+
+Son de flujo: agregar(x) procesa una muestra en tiempo constante (para
+una ventana fija) y devuelve la salida, o None si la muestra se descarta.
+Se encadenan con CadenaFiltros y se le pasan a MuestreadorHX711, así el
+buffer de muestras ya queda limpio para promediar.
+"""
+
+from bisect import bisect_left, insort
+from collections import deque
+
+from estadistica_robusta import ESCALA_MAD, mad_ordenada, media_recortada, mediana_ordenada
+
+# cuentas que da el HX711 saturado o leyendo con DOUT pegado en alto
+CUENTAS_GLITCH = (0x7FFFFF, -0x800000, -1)
+
+
+def es_glitch(cuenta):
+    return cuenta in CUENTAS_GLITCH
+
+
+class DetectorGlitch(object):
+    """
+    Descarta las cuentas saturadas, `glitches` cuenta cuántas hubo.
+    """
+
+    def __init__(self):
+        self.glitches = 0
+
+    def reset(self):
+        self.glitches = 0
+
+    def agregar(self, cuenta):
+        if es_glitch(cuenta):
+            self.glitches += 1
+            return None
+        return cuenta
+
+
+class _Ventana(object):
+    """
+    Últimas n muestras en orden de llegada y ordenadas por valor.
+    """
+
+    def __init__(self, n):
+        if n < 1:
+            raise ValueError("la ventana debe tener al menos 1 muestra")
+        self.n = n
+        self._llegada = deque()
+        self._ordenadas = []
+
+    def reset(self):
+        self._llegada.clear()
+        self._ordenadas = []
+
+    def _agregar(self, x):
+        if len(self._llegada) == self.n:
+            viejo = self._llegada.popleft()
+            del self._ordenadas[bisect_left(self._ordenadas, viejo)]
+        self._llegada.append(x)
+        insort(self._ordenadas, x)
+
+    def mediana(self):
+        return mediana_ordenada(self._ordenadas)
+
+
+class FiltroMediana(_Ventana):
+    """
+    Mediana de las últimas n muestras.
+    """
+
+    def agregar(self, x):
+        self._agregar(x)
+        return self.mediana()
+
+
+class FiltroHampel(_Ventana):
+    """
+    Deja pasar la muestra salvo que se aleje de la mediana de la ventana
+    más de k desviaciones (estimadas con la MAD); entonces sale la mediana.
+    """
+
+    def __init__(self, n=7, k=3.0):
+        super(FiltroHampel, self).__init__(n)
+        self.k = k
+        self.reemplazos = 0
+
+    def agregar(self, x):
+        self._agregar(x)
+        mediana = self.mediana()
+        mad = mad_ordenada(self._ordenadas, mediana)
+        if abs(x - mediana) > self.k * ESCALA_MAD * mad:
+            self.reemplazos += 1
+            return mediana
+        return x
+
+
+class FiltroMediaRecortada(_Ventana):
+    """
+    Media de las últimas n muestras sin el `recorte` más bajo ni el más alto.
+    """
+
+    def __init__(self, n=10, recorte=0.2):
+        super(FiltroMediaRecortada, self).__init__(n)
+        self.recorte = recorte
+
+    def agregar(self, x):
+        self._agregar(x)
+        k = int(len(self._ordenadas) * self.recorte)
+        centro = self._ordenadas[k:len(self._ordenadas) - k]
+        return sum(centro) / float(len(centro))
+
+
+class CadenaFiltros(object):
+    """
+    Aplica los filtros en orden; si uno descarta la muestra, la cadena también.
+    """
+
+    def __init__(self, *filtros):
+        self.filtros = filtros
+
+    def reset(self):
+        for filtro in self.filtros:
+            filtro.reset()
+
+    def agregar(self, x):
+        for filtro in self.filtros:
+            x = filtro.agregar(x)
+            if x is None:
+                return None
+        return x
+
+
+def filtro_por_defecto():
+    """
+    Glitches fuera y picos (alguien que pisa, golpes) reemplazados por la mediana.
+    """
+    return CadenaFiltros(DetectorGlitch(), FiltroHampel(7, 3.0))
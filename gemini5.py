@@ -3,9 +3,8 @@ import PIL.Image
 import os
 import cv2
 import numpy as np
-import requests
 import time
-from gpiozero import AngularServo
+from hal import AngularServo, capturar_foto
 from time import sleep
 import sys
 
@@ -66,10 +65,10 @@ def procesar_imagen():
     url = "http://10.214.59.73:8080/photo.jpg"
 
     # Descargar la imagen
-    r = requests.get(url)
-    if r.status_code == 200:
+    foto = capturar_foto(url)
+    if foto is not None:
         with open("captura_cel.jpg", "wb") as f:
-            f.write(r.content)
+            f.write(foto)
         print("Foto guardada como captura_cel.jpg", file=sys.stderr)
     else:
         print("Error al obtener la foto", file=sys.stderr)
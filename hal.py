@@ -0,0 +1,78 @@
+"""
+Capa de acceso al hardware del kiosco.
+
+Los controladores toman lgpio, smbus, el termómetro, el servo y la cámara
+de aquí en lugar de importarlos directamente. Con la variable de entorno
+KIOSCO_HAL=sim se usan los dispositivos simulados de hal_sim y todo el
+flujo de medición corre en una PC sin hardware.
+"""
+
+import os
+
+BACKEND = os.environ.get('KIOSCO_HAL', 'real')
+
+
+class _NoDisponible(object):
+    """
+    Módulo que no está instalado: falla al usarlo, no al importarlo.
+    """
+
+    def __init__(self, nombre):
+        self._nombre = nombre
+
+    def __bool__(self):
+        return False
+
+    def __getattr__(self, atributo):
+        raise ImportError("{0} no está instalado (KIOSCO_HAL=sim usa dispositivos simulados)".format(self._nombre))
+
+
+def _importar(nombre):
+    try:
+        return __import__(nombre)
+    except ImportError:
+        return _NoDisponible(nombre)
+
+
+if BACKEND == 'sim':
+    import hal_sim
+    lgpio = hal_sim.lgpio
+    smbus = hal_sim.smbus
+else:
+    lgpio = _importar('lgpio')
+    smbus = _importar('smbus')
+
+
+def abrir_mlx90614():
+    """
+    Termómetro MLX90614 (propiedades object_temperature y ambient_temperature).
+    Con smbus es el lector de registros de mlx90614, que además lee los dos
+    registros juntos con leer(); si no, adafruit_mlx90614 sobre busio.
+    """
+    if smbus:
+        import mlx90614
+        return mlx90614.MLX90614()
+    import board
+    import busio
+    import adafruit_mlx90614
+    return adafruit_mlx90614.MLX90614(busio.I2C(board.SCL, board.SDA))
+
+
+def AngularServo(pin, **kwargs):
+    if BACKEND == 'sim':
+        return hal_sim.AngularServo(pin, **kwargs)
+    from gpiozero import AngularServo as _AngularServo
+    return _AngularServo(pin, **kwargs)
+
+
+def capturar_foto(url):
+    """
+    Bytes JPEG de la cámara del celular, None si no se pudo obtener.
+    """
+    if BACKEND == 'sim':
+        return hal_sim.capturar_foto(url)
+    import requests
+    r = requests.get(url)
+    if r.status_code != 200:
+        return None
+    return r.content
@@ -0,0 +1,657 @@
+"""
+Dispositivos simulados para correr el kiosco sin hardware (KIOSCO_HAL=sim).
+
+`lgpio` y `smbus` tienen la misma interfaz que los módulos reales. Los
+pines, el SPI0.0 y las direcciones I2C por defecto del kiosco están conectados a modelos
+de HX711, HC-SR04, KY040, MAX30102 y MLX90614, cuyas señales salen de
+formas de onda sintéticas o grabadas:
+
+    KIOSCO_SIM_PESO=72.5        peso en kg (o archivo con una muestra por línea)
+    KIOSCO_SIM_DISTANCIA=26     distancia del ultrasónico a la cabeza en cm
+    KIOSCO_SIM_CINTURA=85       cinta del encoder en cm
+    KIOSCO_SIM_TEMP=36.5        temperatura de la frente en °C
+    KIOSCO_SIM_AMBIENTE=24      temperatura ambiente en °C
+    KIOSCO_SIM_BPM=72           pulso del MAX30102 sintético
+    KIOSCO_SIM_PPG=archivo.ppg  grabación de ppg_recording en lugar del pulso sintético
+    KIOSCO_SIM_GLITCH=0.01      probabilidad de lecturas 0x7FFFFF / -1 del HX711
+    KIOSCO_SIM_HX711_APAGADO_US=60  PD_SCK en alto que apaga el HX711
+    KIOSCO_SIM_FOTO=foto.jpg    foto que devuelve la cámara
+
+Las formas de onda grabadas se repiten a KIOSCO_SIM_<NOMBRE>_HZ muestras por segundo (10 por defecto).
+"""
+
+from types import SimpleNamespace
+import math
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+_INICIO = time.monotonic()
+_rng = np.random.default_rng()
+
+
+def ahora():
+    """
+    Segundos desde que arrancó la simulación.
+    """
+    return time.monotonic() - _INICIO
+
+
+class Senal(object):
+    """
+    Forma de onda valor(t), t en segundos desde el arranque.
+    Es `base` con ruido gaussiano, o `muestras` grabadas a `frecuencia` Hz que se repiten.
+    Con `desde` la señal vale `desde` hasta `retardo` y luego se acerca a
+    `base` con constante de tiempo `subida` (frente que llega, cinta que se estira).
+    """
+
+    def __init__(self, base=0.0, ruido=0.0, muestras=None, frecuencia=10.0, desde=None, retardo=0.0, subida=0.0):
+        self.base = base
+        self.ruido = ruido
+        self.muestras = muestras
+        self.frecuencia = frecuencia
+        self.desde = desde
+        self.retardo = retardo
+        self.subida = subida
+
+    def __call__(self, t):
+        if self.muestras is not None:
+            valor = self.muestras[int(t * self.frecuencia) % len(self.muestras)]
+        elif self.desde is None or t >= self.retardo + 10 * self.subida:
+            valor = self.base
+        elif t < self.retardo:
+            valor = self.desde
+        else:
+            valor = self.base + (self.desde - self.base) * math.exp(-(t - self.retardo) / self.subida)
+        if self.ruido:
+            valor += _rng.normal(0, self.ruido)
+        return float(valor)
+
+
+def senal_de_entorno(nombre, base, **kwargs):
+    """
+    Senal con `base` tomada de KIOSCO_SIM_<nombre>: un número, o un archivo de muestras.
+    """
+    valor = os.environ.get('KIOSCO_SIM_' + nombre)
+    if valor:
+        try:
+            base = float(valor)
+        except ValueError:
+            kwargs['muestras'] = np.loadtxt(valor, ndmin=1)
+            kwargs['frecuencia'] = float(os.environ.get('KIOSCO_SIM_{0}_HZ'.format(nombre), 10))
+    return Senal(base, **kwargs)
+
+
+# ---------------------------------------------------------------- lgpio
+
+class _Callback(object):
+    def __init__(self, gpio_sim, gpio, edge, func):
+        self._gpio_sim = gpio_sim
+        self.gpio = gpio
+        self.edge = edge
+        self.func = func
+
+    def cancel(self):
+        self._gpio_sim.cancelar(self)
+
+
+class LgpioSimulado(object):
+    """
+    Imitación del módulo lgpio, los pines se conectan a dispositivos simulados.
+    """
+
+    RISING_EDGE = 1
+    FALLING_EDGE = 2
+    BOTH_EDGES = 3
+    SET_ACTIVE_LOW = 4
+    SET_OPEN_DRAIN = 8
+    SET_OPEN_SOURCE = 16
+    SET_PULL_UP = 32
+    SET_PULL_DOWN = 64
+    SET_PULL_NONE = 128
+    TIMEOUT = 2
+
+    def __init__(self):
+        self._dispositivos = {}
+        self._grupos = {}
+        self._niveles = {}
+        self._callbacks = []
+        self._spi = {}
+        self._abiertos = {}
+        self.rebote = {}
+        self._lock = threading.Lock()
+
+    def conectar(self, dispositivo):
+        # un pin puede ir a varios dispositivos (el reloj compartido de varios HX711)
+        for pin in dispositivo.pines:
+            if pin is not None:
+                self._dispositivos.setdefault(pin, []).append(dispositivo)
+        dispositivo.gpio = self
+        return dispositivo
+
+    def gpiochip_open(self, gpiochip):
+        return gpiochip + 1
+
+    def gpiochip_close(self, handle):
+        return 0
+
+    def gpio_claim_input(self, handle, gpio, lFlags=0):
+        return 0
+
+    def gpio_claim_output(self, handle, gpio, level=0, lFlags=0):
+        return self.gpio_write(handle, gpio, level)
+
+    def gpio_claim_alert(self, handle, gpio, eFlags, lFlags=0, notify_handle=None):
+        return 0
+
+    def gpio_set_debounce_micros(self, handle, gpio, debounce_micros):
+        # los dispositivos simulados no rebotan, solo se recuerda el valor
+        self.rebote[gpio] = debounce_micros
+        return 0
+
+    def gpio_free(self, handle, gpio):
+        return 0
+
+    def group_claim_input(self, handle, gpio, lFlags=0):
+        self._grupos[gpio[0]] = list(gpio)
+        return 0
+
+    def group_free(self, handle, gpio):
+        self._grupos.pop(gpio, None)
+        return 0
+
+    def group_read(self, handle, gpio):
+        # como lgpio: [tamaño del grupo, niveles]
+        grupo = self._grupos[gpio]
+        return [len(grupo), sum(self.gpio_read(handle, g) << i for i, g in enumerate(grupo))]
+
+    def conectar_spi(self, dispositivo, spi_dev=0, spi_canal=0):
+        self._spi[(spi_dev, spi_canal)] = dispositivo
+        return dispositivo
+
+    def spi_open(self, spiDev, spiChan, baud, spiFlags=0):
+        handle = len(self._abiertos) + 1
+        self._abiertos[handle] = (self._spi[(spiDev, spiChan)], baud)
+        return handle
+
+    def spi_xfer(self, handle, data):
+        dispositivo, baud = self._abiertos[handle]
+        rx = dispositivo.transferir(bytearray(data), ahora(), baud)
+        return len(rx), rx
+
+    def spi_close(self, handle):
+        self._abiertos.pop(handle, None)
+        return 0
+
+    def gpio_write(self, handle, gpio, level):
+        self._niveles[gpio] = level
+        t = ahora()
+        for dispositivo in self._dispositivos.get(gpio, ()):
+            dispositivo.escribir(gpio, level, t)
+        return 0
+
+    def gpio_read(self, handle, gpio):
+        dispositivos = self._dispositivos.get(gpio)
+        if dispositivos:
+            return dispositivos[0].leer(gpio, ahora())
+        # entradas sin conectar quedan en alto (pull-up)
+        return self._niveles.get(gpio, 1)
+
+    def callback(self, handle, gpio, edge=RISING_EDGE, func=None):
+        cb = _Callback(self, gpio, edge, func)
+        with self._lock:
+            self._callbacks.append(cb)
+        for dispositivo in self._dispositivos.get(gpio, ()):
+            dispositivo.vigilar(gpio)
+        return cb
+
+    def cancelar(self, cb):
+        with self._lock:
+            if cb in self._callbacks:
+                self._callbacks.remove(cb)
+
+    def vigilado(self, gpio):
+        return any(cb.gpio == gpio for cb in self._callbacks)
+
+    def emitir(self, gpio, nivel, t):
+        """
+        Flanco en `gpio` en el instante t (el timestamp va en ns, como el del kernel).
+        """
+        flanco = self.RISING_EDGE if nivel else self.FALLING_EDGE
+        with self._lock:
+            callbacks = [cb for cb in self._callbacks if cb.gpio == gpio and cb.edge & flanco]
+        for cb in callbacks:
+            if cb.func is not None:
+                cb.func(0, gpio, nivel, int(t * 1e9))
+
+
+class DispositivoGpio(object):
+    pines = ()
+    gpio = None
+
+    def escribir(self, pin, nivel, t):
+        pass
+
+    def leer(self, pin, t):
+        return 1
+
+    def vigilar(self, pin):
+        pass
+
+
+class HX711Simulado(DispositivoGpio):
+    """
+    HX711 con celda de carga: DOUT baja cuando hay conversión lista,
+    cada flanco de subida de PD_SCK saca un bit (MSB primero) y los
+    pulsos 25-27 eligen canal/ganancia de la siguiente conversión.
+    PD_SCK en alto más de `apagado` segundos apaga el chip, 60 us como el real.
+    """
+
+    GANANCIAS = {25: ('A', 128), 26: ('B', 32), 27: ('A', 64)}
+
+    def __init__(self, dout=5, pd_sck=6, sps=80, peso=None, offset=131640, factor=23000.0, ruido=40.0, glitch=0.0,
+                 apagado=60e-6):
+        self.dout = dout
+        self.pd_sck = pd_sck
+        self.pines = (dout, pd_sck)
+        self.sps = sps
+        self.peso = peso if peso is not None else Senal(72.5)
+        self.offset = offset
+        self.factor = factor
+        self.ruido = ruido
+        self.glitch = glitch
+        self.apagado = apagado
+        self.canal = ('A', 128)
+        self._sck = 0
+        self._subida = 0.0
+        self._listo = 1.0 / sps
+        self._bits = None
+        self._pulsos = 0
+        self._lista = None
+
+    def conversion(self, t):
+        if self.glitch and _rng.random() < self.glitch:
+            return 0x7FFFFF if _rng.random() < 0.5 else 0xFFFFFF
+        canal, ganancia = self.canal
+        if canal == 'A':
+            valor = (self.offset + self.factor * self.peso(t)) * ganancia / 128.0
+        else:
+            valor = self.offset * ganancia / 128.0
+        valor = int(round(valor + _rng.normal(0, self.ruido)))
+        valor = max(-0x800000, min(0x7FFFFF, valor))
+        return valor & 0xFFFFFF
+
+    def escribir(self, pin, nivel, t):
+        if pin != self.pd_sck:
+            return
+        if nivel and not self._sck:
+            self._subida = t
+            if self._bits is not None and self._pulsos >= 25 and t >= self._listo:
+                # empieza una nueva lectura
+                self._bits = None
+            if self._bits is None:
+                if t >= self._listo:
+                    self._bits = self._lista if self._lista is not None else self.conversion(t)
+                    self._lista = None
+                    self._pulsos = 1
+            else:
+                self._pulsos += 1
+                if self._pulsos == 25:
+                    self._listo = t + 1.0 / self.sps
+                if 25 <= self._pulsos <= 27:
+                    # los pulsos de más eligen la ganancia de la próxima conversión
+                    self.canal = self.GANANCIAS[self._pulsos]
+        elif not nivel and self._sck:
+            if t - self._subida > self.apagado:
+                # apagado: al volver se reinicia en canal A, ganancia 128
+                self._bits = None
+                self._lista = None
+                self._pulsos = 0
+                self.canal = ('A', 128)
+                self._listo = t + 1.0 / self.sps
+        self._sck = nivel
+
+    def leer(self, pin, t):
+        if pin != self.dout:
+            return self._sck
+        if self._bits is not None and self._pulsos <= 24:
+            return (self._bits >> (24 - self._pulsos)) & 1
+        if t < self._listo:
+            return 1
+        # la conversión queda fija cuando DOUT baja, no en el primer pulso
+        if self._lista is None and (self._bits is None or self._pulsos >= 25):
+            self._lista = self.conversion(t)
+        return 0
+
+    def transferir(self, tx, t, baudios):
+        """
+        PD_SCK en MOSI y DOUT en MISO: cada bit de `tx` es medio ciclo del reloj SPI.
+        """
+        rx = bytearray()
+        for i, byte in enumerate(tx):
+            recibido = 0
+            for j, bit in enumerate(range(7, -1, -1)):
+                instante = t + (8 * i + j) / float(baudios)
+                self.escribir(self.pd_sck, (byte >> bit) & 1, instante)
+                recibido = (recibido << 1) | self.leer(self.dout, instante)
+            rx.append(recibido)
+        return rx
+
+
+class HCSR04Simulado(DispositivoGpio):
+    """
+    HC-SR04: un pulso de 10 us en TRIG produce un eco de 2 * distancia / v_sonido.
+    Con callbacks en ECHO los flancos se emiten con su instante exacto.
+    """
+
+    VELOCIDAD_SONIDO = 34300.0  # cm/s
+    RETARDO_ECO = 0.00045
+
+    def __init__(self, trig=23, echo=24, distancia=None):
+        self.trig = trig
+        self.echo = echo
+        self.pines = (trig, echo)
+        self.distancia = distancia if distancia is not None else Senal(26.0, ruido=0.3)
+        self._alto = None
+        self._eco = (0.0, 0.0)
+
+    def escribir(self, pin, nivel, t):
+        if pin != self.trig:
+            return
+        if nivel:
+            self._alto = t
+        elif self._alto is not None:
+            if t - self._alto >= 10e-6:
+                inicio = t + self.RETARDO_ECO
+                fin = inicio + 2 * self.distancia(t) / self.VELOCIDAD_SONIDO
+                self._eco = (inicio, fin)
+                if self.gpio is not None and self.gpio.vigilado(self.echo):
+                    for instante, flanco in ((inicio, 1), (fin, 0)):
+                        timer = threading.Timer(max(0.0, instante - ahora()), self.gpio.emitir,
+                                                (self.echo, flanco, instante))
+                        timer.daemon = True
+                        timer.start()
+            self._alto = None
+
+    def leer(self, pin, t):
+        if pin != self.echo:
+            return 0
+        inicio, fin = self._eco
+        return 1 if inicio <= t < fin else 0
+
+
+class KY040Simulado(DispositivoGpio):
+    """
+    Encoder KY040 unido a la cinta métrica: cada cambio de CLK son `paso_cm` cm.
+    Con callbacks en CLK/DT un hilo emite los flancos en cuadratura.
+    """
+
+    # (clk, dt) en sentido horario, reposo con ambos en alto
+    SECUENCIA = ((1, 1), (0, 1), (0, 0), (1, 0))
+
+    def __init__(self, clk=20, dt=21, sw=26, cinta=None, paso_cm=0.51):
+        self.clk = clk
+        self.dt = dt
+        self.sw = sw
+        self.pines = (clk, dt, sw)
+        self.cinta = cinta if cinta is not None else Senal(85.0, desde=0.0, retardo=1.0, subida=0.6)
+        self.paso_cm = paso_cm
+        self._hilo = None
+
+    def pasos(self, t):
+        return int(round(2 * self.cinta(t) / self.paso_cm))
+
+    def estado(self, t):
+        return self.SECUENCIA[self.pasos(t) % 4]
+
+    def leer(self, pin, t):
+        if pin == self.sw:
+            return 1
+        clk, dt = self.estado(t)
+        return clk if pin == self.clk else dt
+
+    def vigilar(self, pin):
+        if self._hilo is None and pin in (self.clk, self.dt):
+            self._hilo = threading.Thread(target=self._emitir_flancos, daemon=True)
+            self._hilo.start()
+
+    def _emitir_flancos(self):
+        anterior = self.pasos(ahora())
+        while True:
+            time.sleep(0.0002)
+            t = ahora()
+            actual = self.pasos(t)
+            # si el hilo se demoró se emiten todos los estados intermedios, como el kernel
+            paso = 1 if actual > anterior else -1
+            for n in range(anterior, actual, paso):
+                antes, despues = self.SECUENCIA[n % 4], self.SECUENCIA[(n + paso) % 4]
+                for pin, a, d in ((self.clk, antes[0], despues[0]), (self.dt, antes[1], despues[1])):
+                    if a != d:
+                        self.gpio.emitir(pin, d, t)
+            anterior = actual
+
+
+# ---------------------------------------------------------------- I2C
+
+class MAX30102Simulado(object):
+    """
+    MAX30102 en 0x57: el FIFO de 32 muestras se llena a la frecuencia
+    configurada en FIFO_CONFIG/SPO2_CONFIG, con OVF_COUNTER cuando se desborda.
+    """
+
+    TASAS = (50, 100, 200, 400, 800, 1000, 1600, 3200)
+
+    def __init__(self, bpm=None, grabacion=None):
+        self.bpm = bpm if bpm is not None else Senal(72.0)
+        self.grabacion = grabacion
+        self.registros = bytearray(256)
+        self.registros[0xFF] = 0x15
+        self._t0 = None
+        self._generadas = 0
+        self._leidas = 0
+        self._perdidas = 0
+
+    @property
+    def frecuencia(self):
+        tasa = self.TASAS[(self.registros[0x0A] >> 2) & 0x07]
+        promedio = 1 << min(5, self.registros[0x08] >> 5)
+        return tasa / float(promedio)
+
+    def muestra(self, k):
+        if self.grabacion is not None:
+            k %= len(self.grabacion)
+            return int(self.grabacion.red[k]), int(self.grabacion.ir[k])
+        t = k / self.frecuencia
+        fase = 2 * math.pi * self.bpm(t) / 60.0 * t
+        pulso = math.sin(fase) + 0.4 * math.sin(2 * fase)
+        red = 95000 + 600 * pulso + _rng.normal(0, 30)
+        ir = 110000 + 1200 * pulso + _rng.normal(0, 30)
+        return int(red) & 0x3FFFF, int(ir) & 0x3FFFF
+
+    def _actualizar(self):
+        if self._t0 is None:
+            return
+        self._generadas = int((ahora() - self._t0) * self.frecuencia)
+        if self._generadas - self._leidas > 32:
+            self._perdidas += self._generadas - self._leidas - 32
+            self._leidas = self._generadas - 32
+
+    def _registro(self, reg):
+        if reg == 0x00:
+            # PPG_RDY, se limpia al leer
+            return 0x40 if self._generadas > self._leidas else 0x00
+        if reg == 0x04:
+            return self._generadas % 32
+        if reg == 0x05:
+            return min(self._perdidas, 31)
+        if reg == 0x06:
+            return self._leidas % 32
+        return self.registros[reg]
+
+    def leer(self, reg, n):
+        self._actualizar()
+        if reg != 0x07:
+            return [self._registro((reg + i) & 0xFF) for i in range(n)]
+        datos = []
+        for _ in range(n // 6):
+            if self._leidas < self._generadas:
+                red, ir = self.muestra(self._leidas)
+                self._leidas += 1
+                self._perdidas = 0
+            else:
+                red, ir = 0, 0
+            datos += [red >> 16, (red >> 8) & 0xFF, red & 0xFF, ir >> 16, (ir >> 8) & 0xFF, ir & 0xFF]
+        return datos
+
+    def escribir(self, reg, datos):
+        self._actualizar()
+        for i, valor in enumerate(datos):
+            r = (reg + i) & 0xFF
+            self.registros[r] = valor
+            if r == 0x09:
+                if valor & 0x40 or valor & 0x80:
+                    self._t0 = None
+                elif valor & 0x03:
+                    self._t0 = ahora()
+                    self._generadas = self._leidas = self._perdidas = 0
+            elif r in (0x04, 0x06):
+                self._leidas = self._generadas
+            elif r == 0x05:
+                self._perdidas = 0
+
+
+def crc8(datos):
+    """
+    PEC del SMBus (CRC-8, polinomio x^8 + x^2 + x + 1).
+    """
+    crc = 0
+    for byte in datos:
+        crc ^= byte
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x07) & 0xFF if crc & 0x80 else (crc << 1) & 0xFF
+    return crc
+
+
+class MLX90614Simulado(object):
+    """
+    MLX90614 en 0x5A: RAM 0x06 (ambiente), 0x07 y 0x08 (objeto) en pasos de 0.02 K con PEC.
+    También tiene las propiedades de adafruit_mlx90614.MLX90614.
+    """
+
+    def __init__(self, direccion=0x5A, objeto=None, ambiente=None):
+        self.direccion = direccion
+        self.ambiente = ambiente if ambiente is not None else Senal(24.0, ruido=0.02)
+        self.objeto = objeto if objeto is not None else Senal(36.5, ruido=0.05, desde=26.0, retardo=0.8, subida=0.25)
+
+    def temperatura(self, reg, t):
+        if reg == 0x06:
+            return self.ambiente(t)
+        return self.objeto(t)
+
+    def palabra(self, reg):
+        return int(round((self.temperatura(reg, ahora()) + 273.15) / 0.02)) & 0x7FFF
+
+    def leer(self, reg, n):
+        valor = self.palabra(reg)
+        bajo, alto = valor & 0xFF, valor >> 8
+        pec = crc8([self.direccion << 1, reg, (self.direccion << 1) | 1, bajo, alto])
+        return [bajo, alto, pec][:n]
+
+    def escribir(self, reg, datos):
+        pass
+
+    @property
+    def object_temperature(self):
+        return self.palabra(0x07) * 0.02 - 273.15
+
+    @property
+    def ambient_temperature(self):
+        return self.palabra(0x06) * 0.02 - 273.15
+
+
+class SMBusSimulado(object):
+    """
+    Imitación de smbus.SMBus sobre los dispositivos I2C simulados.
+    """
+
+    def __init__(self, bus=1):
+        self.bus = bus
+
+    def _dispositivo(self, direccion):
+        if direccion not in dispositivos_i2c:
+            raise OSError(121, "Remote I/O error")
+        return dispositivos_i2c[direccion]
+
+    def read_i2c_block_data(self, direccion, reg, n=32):
+        return self._dispositivo(direccion).leer(reg, n)
+
+    def write_i2c_block_data(self, direccion, reg, datos):
+        self._dispositivo(direccion).escribir(reg, list(datos))
+
+    def read_byte_data(self, direccion, reg):
+        return self._dispositivo(direccion).leer(reg, 1)[0]
+
+    def write_byte_data(self, direccion, reg, valor):
+        self._dispositivo(direccion).escribir(reg, [valor])
+
+    def read_word_data(self, direccion, reg):
+        bajo, alto = self._dispositivo(direccion).leer(reg, 2)
+        return bajo | alto << 8
+
+    def close(self):
+        pass
+
+
+# ---------------------------------------------------------------- servo y cámara
+
+class AngularServo(object):
+    def __init__(self, pin, min_angle=-90, max_angle=90, **kwargs):
+        self.pin = pin
+        self.min_angle = min_angle
+        self.max_angle = max_angle
+        self.angle = None
+
+    def close(self):
+        pass
+
+
+def capturar_foto(url):
+    foto = os.environ.get('KIOSCO_SIM_FOTO')
+    if foto:
+        with open(foto, 'rb') as f:
+            return f.read()
+    import cv2
+    imagen = np.full((480, 640, 3), 255, dtype=np.uint8)
+    cv2.putText(imagen, "120/80 72", (60, 260), cv2.FONT_HERSHEY_SIMPLEX, 3, (0, 0, 0), 6)
+    return cv2.imencode('.jpg', imagen)[1].tobytes()
+
+
+# ---------------------------------------------------------------- tablero del kiosco
+
+def _grabacion_ppg():
+    ruta = os.environ.get('KIOSCO_SIM_PPG')
+    if not ruta:
+        return None
+    from ppg_recording import PpgRecording
+    return PpgRecording(ruta)
+
+
+lgpio = LgpioSimulado()
+bascula = lgpio.conectar(HX711Simulado(peso=senal_de_entorno('PESO', 72.5),
+                                       glitch=float(os.environ.get('KIOSCO_SIM_GLITCH', 0)),
+                                       apagado=float(os.environ.get('KIOSCO_SIM_HX711_APAGADO_US', 60)) * 1e-6))
+lgpio.conectar_spi(bascula)
+ultrasonico = lgpio.conectar(HCSR04Simulado(distancia=senal_de_entorno('DISTANCIA', 26.0, ruido=0.3)))
+encoder = lgpio.conectar(KY040Simulado(cinta=senal_de_entorno('CINTURA', 85.0, desde=0.0, retardo=1.0, subida=0.6)))
+
+oximetro = MAX30102Simulado(bpm=senal_de_entorno('BPM', 72.0), grabacion=_grabacion_ppg())
+termometro = MLX90614Simulado(objeto=senal_de_entorno('TEMP', 36.5, ruido=0.05, desde=26.0, retardo=0.8, subida=0.25),
+                              ambiente=senal_de_entorno('AMBIENTE', 24.0, ruido=0.02))
+dispositivos_i2c = {0x57: oximetro, 0x5A: termometro}
+
+smbus = SimpleNamespace(SMBus=SMBusSimulado)
+
+print("[hal_sim] usando dispositivos simulados", file=sys.stderr)
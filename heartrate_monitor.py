@@ -1,9 +1,10 @@
 
 from max30102 import MAX30102
+from ringbuffer import RingBuffer
+from acquisition import get_profile
 import hrcalc
 import threading
 import time
-import numpy as np
 
 
 class HeartRateMonitor(object):
@@ -12,57 +13,135 @@ class HeartRateMonitor(object):
     """
 
     LOOP_TIME = 0.01
+    # longest wait for the INT pin before draining the FIFO anyway
+    INT_TIMEOUT = 0.5
 
-    def __init__(self, print_raw=False, print_result=False):
+    def __init__(self, print_raw=False, print_result=False, int_pin=None, profile=None,
+                 sensor=None, recorder=None):
         self.bpm = 0
         if print_raw is True:
             print('IR, Red')
         self.print_raw = print_raw
         self.print_result = print_result
+        # GPIO wired to the MAX30102 INT pin, None polls the FIFO every LOOP_TIME
+        self.int_pin = int_pin
+        # acquisition profile (or its name), sets up both the sensor and hrcalc
+        self.profile = get_profile(profile)
+        # source used instead of opening the MAX30102 (e.g. ppg_recording.ReplaySensor)
+        self.sensor = sensor
+        # every batch read is passed to recorder.write_batch (e.g. ppg_recording.PpgRecorder)
+        self.recorder = recorder
+        self.reset_counters()
+
+    def reset_counters(self):
+        self.samples_received = 0
+        self.samples_dropped = 0
+        # (timestamp, samples_received) after the first batch
+        self._first_batch = None
+        self._last_batch_time = None
+        # samples_received when the last overflow was seen
+        self._received_at_loss = None
+
+    def count_batch(self, batch):
+        """
+        Account the samples of a FifoBatch, returns the number of samples lost before it.
+        """
+        if len(batch.ir) == 0:
+            return 0
+        if batch.lost > 0:
+            self.samples_dropped += batch.lost
+            self._received_at_loss = self.samples_received
+        self.samples_received += len(batch.ir)
+        self._last_batch_time = batch.timestamp
+        if self._first_batch is None:
+            self._first_batch = (batch.timestamp, self.samples_received)
+        return batch.lost
+
+    def effective_sample_rate(self):
+        """
+        Samples actually received per second since the first batch.
+        """
+        if self._first_batch is None or self._last_batch_time <= self._first_batch[0]:
+            return 0.0
+        first_time, first_received = self._first_batch
+        return (self.samples_received - first_received) / (self._last_batch_time - first_time)
+
+    def window_has_gap(self, window=None):
+        """
+        True if samples were lost between the last `window` samples (a HR window by default),
+        the HR computed from them is then based on a broken time base.
+        """
+        if window is None:
+            window = self.profile.window
+        return self._received_at_loss is not None and self.samples_received - self._received_at_loss < window
+
+    def open_sensor(self):
+        if self.sensor is not None:
+            return self.sensor
+        return MAX30102(profile=self.profile)
+
+    def setup_interrupt(self, sensor):
+        """
+        Use the INT pin if configured, returns False when polling.
+        """
+        if self.int_pin is None:
+            return False
+        try:
+            sensor.enable_interrupt_pin(self.int_pin)
+        except Exception as e:
+            print("INT pin {0} not available ({1}), polling instead".format(self.int_pin, e))
+            return False
+        return True
+
+    def wait_for_data(self, sensor, use_interrupt):
+        if use_interrupt:
+            sensor.wait_for_data(self.INT_TIMEOUT)
+        else:
+            time.sleep(self.LOOP_TIME)
 
     def run_sensor(self):
-        sensor = MAX30102()
-        ir_data = []
-        red_data = []
-        bpms = []
+        sensor = self.open_sensor()
+        estimator = hrcalc.StreamingEstimator(**self.profile.hrcalc_params())
+        bpms = RingBuffer(4, dtype=float)
+        use_interrupt = self.setup_interrupt(sensor)
 
         # run until told to stop
         while not self._thread.stopped:
-            # check if any data is available
-            num_bytes = sensor.get_data_present()
-            if num_bytes > 0:
-                # grab all the data and stash it into arrays
-                while num_bytes > 0:
-                    red, ir = sensor.read_fifo()
-                    num_bytes -= 1
-                    ir_data.append(ir)
-                    red_data.append(red)
+            # grab all the data available in one burst
+            batch = sensor.read_fifo_batch(clear_interrupts=use_interrupt)
+            if self.count_batch(batch) and self.print_result:
+                print("Lost {0} samples (FIFO overflow)".format(batch.lost))
+            if self.recorder is not None and len(batch.ir) > 0:
+                self.recorder.write_batch(batch)
+            if len(batch.ir) > 0:
+                # feed it to the estimator
+                for red, ir in zip(batch.red.tolist(), batch.ir.tolist()):
+                    estimator.push(red, ir)
                     if self.print_raw:
                         print("{0}, {1}".format(ir, red))
 
-                while len(ir_data) > 100:
-                    ir_data.pop(0)
-                    red_data.pop(0)
-
-                if len(ir_data) == 100:
-                    bpm, valid_bpm, spo2, valid_spo2 = hrcalc.calc_hr_and_spo2(ir_data, red_data)
+                result = estimator.estimate()
+                if result is not None and self.window_has_gap():
+                    # the window spans a FIFO overflow, its intervals are wrong
+                    result = None
+                if result is not None:
+                    bpm, valid_bpm, spo2, valid_spo2 = result
                     if valid_bpm:
                         bpms.append(bpm)
-                        while len(bpms) > 4:
-                            bpms.pop(0)
-                        self.bpm = np.mean(bpms)
-                        if (np.mean(ir_data) < 50000 and np.mean(red_data) < 50000):
+                        self.bpm = bpms.mean()
+                        if (estimator.ir_mean < 50000 and estimator.red_mean < 50000):
                             self.bpm = 0
                             if self.print_result:
                                 print("Finger not detected")
                         if self.print_result:
                             print("BPM: {0}, SpO2: {1}".format(self.bpm, spo2))
 
-            time.sleep(self.LOOP_TIME)
+            self.wait_for_data(sensor, use_interrupt)
 
         sensor.shutdown()
 
     def start_sensor(self):
+        self.reset_counters()
         self._thread = threading.Thread(target=self.run_sensor)
         self._thread.stopped = False
         self._thread.start()
@@ -1,7 +1,12 @@
 # -*-coding:utf-8
 
+from bisect import bisect_left, bisect_right, insort
+from collections import deque
+
 import numpy as np
 
+from ringbuffer import RingBuffer
+
 # 25 samples per second (in algorithm.h)
 SAMPLE_FREQ = 25
 # taking moving average of 4 samples when calculating HR
@@ -9,13 +14,39 @@ SAMPLE_FREQ = 25
 MA_SIZE = 4
 # sampling frequency * 4 (in algorithm.h)
 BUFFER_SIZE = 100
+# minimum distance between two valleys, in samples (in algorithm.h)
+MIN_DIST = 4
 
+# SAMPLE_FREQ, BUFFER_SIZE and MIN_DIST are the defaults for the "standard"
+# acquisition profile, use acquisition.get_profile(...).hrcalc_params()
+# to get the ones matching the sensor configuration
 
-# this assumes ir_data and red_data as np.array
-def calc_hr_and_spo2(ir_data, red_data):
+
+# engine used by calc_hr_and_spo2 when none is given explicitly
+# "python" is the line-by-line port of algorithm.h, "numpy" is the vectorized
+# version of it (both return exactly the same values)
+ENGINE = "numpy"
+
+
+def calc_hr_and_spo2(ir_data, red_data, engine=None,
+                     sample_freq=SAMPLE_FREQ, buffer_size=BUFFER_SIZE, min_dist=MIN_DIST):
     """
     By detecting  peaks of PPG cycle and corresponding AC/DC
     of red/infra-red signal, the an_ratio for the SPO2 is computed.
+    `engine` selects the implementation ("python" or "numpy"), ENGINE by default.
+    """
+    if engine is None:
+        engine = ENGINE
+    if engine not in ENGINES:
+        raise ValueError("unknown hrcalc engine: {0}".format(engine))
+    return ENGINES[engine](ir_data, red_data, sample_freq, buffer_size, min_dist)
+
+
+# this assumes ir_data and red_data as np.array
+def calc_hr_and_spo2_python(ir_data, red_data,
+                            sample_freq=SAMPLE_FREQ, buffer_size=BUFFER_SIZE, min_dist=MIN_DIST):
+    """
+    Reference implementation, ported loop by loop from algorithm.h.
     """
     # get dc mean
     ir_mean = int(np.mean(ir_data))
@@ -34,14 +65,14 @@ def calc_hr_and_spo2(ir_data, red_data):
     n_th = 30 if n_th < 30 else n_th  # min allowed
     n_th = 60 if n_th > 60 else n_th  # max allowed
 
-    ir_valley_locs, n_peaks = find_peaks(x, BUFFER_SIZE, n_th, 4, 15)
+    ir_valley_locs, n_peaks = find_peaks(x, buffer_size, n_th, min_dist, 15)
     # print(ir_valley_locs[:n_peaks], ",", end="")
     peak_interval_sum = 0
     if n_peaks >= 2:
         for i in range(1, n_peaks):
             peak_interval_sum += (ir_valley_locs[i] - ir_valley_locs[i-1])
         peak_interval_sum = int(peak_interval_sum / (n_peaks - 1))
-        hr = int(SAMPLE_FREQ * 60 / peak_interval_sum)
+        hr = int(sample_freq * 60 / peak_interval_sum)
         hr_valid = True
     else:
         hr = -999  # unable to calculate because # of peaks are too small
@@ -57,7 +88,7 @@ def calc_hr_and_spo2(ir_data, red_data):
 
     # FIXME: needed??
     for i in range(exact_ir_valley_locs_count):
-        if ir_valley_locs[i] > BUFFER_SIZE:
+        if ir_valley_locs[i] > buffer_size:
             spo2 = -999  # do not use SPO2 since valley loc is out of range
             spo2_valid = False
             return hr, hr_valid, spo2, spo2_valid
@@ -193,3 +224,362 @@ def remove_close_peaks(n_peaks, ir_valley_locs, x, min_dist):
     sorted_indices[:n_peaks] = sorted(sorted_indices[:n_peaks])
 
     return sorted_indices, n_peaks
+
+
+def calc_hr_and_spo2_numpy(ir_data, red_data,
+                           sample_freq=SAMPLE_FREQ, buffer_size=BUFFER_SIZE, min_dist=MIN_DIST):
+    """
+    Vectorized version of calc_hr_and_spo2_python.
+    Every step keeps the integer truncation of the loop version,
+    so both engines return the same values for the same window.
+    """
+    ir_data = _as_samples(ir_data)
+    red_data = _as_samples(red_data)
+
+    # get dc mean
+    ir_mean = int(np.mean(ir_data))
+
+    # remove DC mean and inver signal
+    # this lets peak detecter detect valley
+    x = -1 * (ir_data - ir_mean)
+
+    # 4 point moving average (last MA_SIZE samples are left as they are)
+    # assigning back into the int array truncates like the loop version
+    n_avg = x.shape[0] - MA_SIZE
+    if n_avg > 0:
+        x[:n_avg] = np.convolve(x, np.ones(MA_SIZE, dtype=x.dtype), 'valid')[:n_avg] / MA_SIZE
+
+    # calculate threshold
+    n_th = int(np.mean(x))
+    n_th = 30 if n_th < 30 else n_th  # min allowed
+    n_th = 60 if n_th > 60 else n_th  # max allowed
+
+    ir_valley_locs, n_peaks = find_peaks_numpy(x, buffer_size, n_th, min_dist, 15)
+
+    return hr_and_spo2_from_valleys(ir_data, red_data, ir_valley_locs[:n_peaks], sample_freq, buffer_size)
+
+
+def hr_and_spo2_from_valleys(ir_data, red_data, ir_valley_locs,
+                             sample_freq=SAMPLE_FREQ, buffer_size=BUFFER_SIZE):
+    """
+    Compute HR and SPO2 from the (ascending) valley locations of a window,
+    the AC/DC maxima between valleys are taken with np.maximum.reduceat.
+    """
+    n_peaks = len(ir_valley_locs)
+
+    peak_interval_sum = 0
+    if n_peaks >= 2:
+        peak_interval_sum = ir_valley_locs[-1] - ir_valley_locs[0]
+        peak_interval_sum = int(peak_interval_sum / (n_peaks - 1))
+        hr = int(sample_freq * 60 / peak_interval_sum)
+        hr_valid = True
+    else:
+        hr = -999  # unable to calculate because # of peaks are too small
+        hr_valid = False
+
+    # ---------spo2---------
+
+    for loc in ir_valley_locs:
+        if loc > buffer_size:
+            spo2 = -999  # do not use SPO2 since valley loc is out of range
+            spo2_valid = False
+            return hr, hr_valid, spo2, spo2_valid
+
+    ratio = []
+    if n_peaks >= 2:
+        locs = np.asarray(ir_valley_locs, dtype=np.int64)
+        starts = locs[:-1]
+        ends = locs[1:]
+        width = ends - starts
+
+        # max of each span [valley k, valley k+1) and the first index where it occurs
+        first = locs[0]
+        offsets = starts - first
+        span = np.arange(first, locs[-1])
+        span_id = np.repeat(np.arange(n_peaks - 1), width)
+        ir_span = ir_data[first:locs[-1]]
+        red_span = red_data[first:locs[-1]]
+        ir_dc_max = np.maximum.reduceat(ir_span, offsets)
+        red_dc_max = np.maximum.reduceat(red_span, offsets)
+        ir_dc_max_index = np.minimum.reduceat(np.where(ir_span == ir_dc_max[span_id], span, locs[-1]), offsets)
+        red_dc_max_index = np.minimum.reduceat(np.where(red_span == red_dc_max[span_id], span, locs[-1]), offsets)
+
+        red_ac = (red_data[ends] - red_data[starts]) * (red_dc_max_index - starts)
+        red_ac = red_data[starts] + np.trunc(red_ac / width).astype(np.int64)
+        red_ac = red_data[red_dc_max_index] - red_ac  # subtract linear DC components from raw
+
+        ir_ac = (ir_data[ends] - ir_data[starts]) * (ir_dc_max_index - starts)
+        ir_ac = ir_data[starts] + np.trunc(ir_ac / width).astype(np.int64)
+        ir_ac = ir_data[ir_dc_max_index] - ir_ac  # subtract linear DC components from raw
+
+        nume = red_ac * ir_dc_max
+        denom = ir_ac * red_dc_max
+        used = np.flatnonzero((width > 3) & (denom > 0) & (nume != 0))[:5]
+        # same 32-bit wrap as the loop version
+        ratio = np.trunc(((nume[used] * 100) & 0xffffffff) / denom[used]).astype(np.int64).tolist()
+
+    # choose median value since PPG signal may vary from beat to beat
+    ratio = sorted(ratio)  # sort to ascending order
+    i_ratio_count = len(ratio)
+    mid_index = int(i_ratio_count / 2)
+
+    ratio_ave = 0
+    if mid_index > 1:
+        ratio_ave = int((ratio[mid_index-1] + ratio[mid_index])/2)
+    else:
+        if len(ratio) != 0:
+            ratio_ave = ratio[mid_index]
+
+    if ratio_ave > 2 and ratio_ave < 184:
+        spo2 = -45.060 * (ratio_ave**2) / 10000.0 + 30.054 * ratio_ave / 100.0 + 94.845
+        spo2_valid = True
+    else:
+        spo2 = -999
+        spo2_valid = False
+
+    return hr, hr_valid, spo2, spo2_valid
+
+
+def find_peaks_numpy(x, size, min_height, min_dist, max_num):
+    """
+    Vectorized find_peaks, returns the same locations as the loop version
+    """
+    ir_valley_locs = find_peaks_above_min_height_numpy(x, size, min_height, max_num)
+    ir_valley_locs = remove_close_peaks_numpy(ir_valley_locs, x, min_dist)
+
+    n_peaks = min([len(ir_valley_locs), max_num])
+
+    return ir_valley_locs, n_peaks
+
+
+def find_peaks_above_min_height_numpy(x, size, min_height, max_num):
+    """
+    Find all peaks above MIN_HEIGHT with a boolean mask.
+    A peak is the left edge of a (flat) top, higher than the sample before it
+    and than the first different sample after it (capped at size - 1).
+    """
+    if size < 2:
+        return np.zeros(0, dtype=np.int64)
+
+    head = x[:size]
+    body = head[:-1]
+    # x[i-1] for i = 0 is x[-1], same as the loop version
+    prev = np.concatenate((x[-1:], head[:-2]))
+    # first index of every run of equal values (except the one at 0)
+    run_starts = np.append(np.flatnonzero(head[1:] != head[:-1]) + 1, size - 1)
+    right = head[run_starts[np.searchsorted(run_starts, np.arange(size - 1), 'right')]]
+
+    mask = (body > min_height) & (body > prev) & (body > right)
+    return np.flatnonzero(mask)[:max_num]
+
+
+def remove_close_peaks_numpy(ir_valley_locs, x, min_dist):
+    """
+    Remove peaks separated by less than MIN_DISTANCE,
+    larger peaks win (ties are broken like the loop version)
+    """
+    return _remove_close_peaks(np.asarray(ir_valley_locs), x[ir_valley_locs], min_dist)
+
+
+def _remove_close_peaks(ir_valley_locs, heights, min_dist):
+    """
+    remove_close_peaks_numpy on peak locations with their heights
+    """
+    # stable ascending sort then reverse, same as sorted(...).reverse()
+    sorted_indices = ir_valley_locs[np.argsort(heights, kind='stable')[::-1]]
+    # lag-zero peak of autocorr is at index -1
+    sorted_indices = sorted_indices[sorted_indices + 1 > min_dist]
+
+    close = np.abs(sorted_indices[:, None] - sorted_indices[None, :]) <= min_dist
+    keep = np.ones(sorted_indices.shape[0], dtype=bool)
+    for i in range(sorted_indices.shape[0]):
+        if keep[i]:
+            keep[i+1:] &= ~close[i, i+1:]
+
+    return np.sort(sorted_indices[keep]).tolist()
+
+
+class StreamingEstimator(object):
+    """
+    Sliding-window calc_hr_and_spo2 fed one sample at a time.
+    push() keeps the DC sum, the moving average and the runs of the averaged
+    signal up to date in O(1) per sample, estimate() returns what
+    calc_hr_and_spo2 would return for the last `size` samples.
+    """
+
+    def __init__(self, buffer_size=BUFFER_SIZE, sample_freq=SAMPLE_FREQ, min_dist=MIN_DIST):
+        if buffer_size <= MA_SIZE + 1:
+            raise ValueError("window must be longer than {0} samples".format(MA_SIZE + 1))
+        self.size = buffer_size
+        self.sample_freq = sample_freq
+        self.min_dist = min_dist
+        self.reset()
+
+    def reset(self):
+        """
+        Forget every sample pushed so far.
+        """
+        self._ir = RingBuffer(self.size)
+        self._red = RingBuffer(self.size)
+        self._ir_sum = 0
+        self._red_sum = 0
+        # ir of the last MA_SIZE + 1 samples
+        self._recent = deque(maxlen=MA_SIZE + 1)
+        self.count = 0
+
+        # averaged positions are stored as key = ceil(sum of MA_SIZE samples / MA_SIZE),
+        # their averaged value is ir_mean - key whenever it is above zero,
+        # so keys can be compared before the mean of the window is known
+        self._sums = deque()
+        self._key_sum = 0
+        # sums that are not a multiple of MA_SIZE, sorted
+        self._odd_sums = []
+        # (start, key) of every run of equal keys
+        self._runs = deque()
+        # (start, key) of the runs lower than both neighbours
+        self._minima = deque()
+
+    @property
+    def ir_mean(self):
+        return self._ir_sum / max(1, min(self.count, self.size))
+
+    @property
+    def red_mean(self):
+        return self._red_sum / max(1, min(self.count, self.size))
+
+    def push(self, red, ir):
+        """
+        Add one sample (same order as MAX30102.read_fifo returns them).
+        """
+        red = int(red)
+        ir = int(ir)
+        dropped_ir = self._ir.append(ir)
+        dropped_red = self._red.append(red)
+        if dropped_ir is not None:
+            self._ir_sum -= dropped_ir
+            self._red_sum -= dropped_red
+            self._drop(self.count - self.size)
+
+        self._ir_sum += ir
+        self._red_sum += red
+        self._recent.append(ir)
+        self.count += 1
+
+        # calc_hr_and_spo2 averages every position but the last MA_SIZE
+        if self.count > MA_SIZE:
+            self._settle(self.count - 1 - MA_SIZE, sum(self._recent) - ir)
+
+    def window(self):
+        """
+        The last `size` samples as (ir_data, red_data) views.
+        """
+        return self._ir.view(), self._red.view()
+
+    def estimate(self):
+        """
+        (hr, hr_valid, spo2, spo2_valid) of the current window,
+        None until `size` samples have been pushed.
+        """
+        if self.count < self.size:
+            return None
+
+        size = self.size
+        first = self.count - size
+        tail = list(self._recent)[1:]
+
+        ir_mean = int(self._ir_sum / size)
+        # averaged values below zero truncate towards zero, one above ir_mean - key
+        # when the sum is not a multiple of MA_SIZE
+        n_negative = len(self._odd_sums) - bisect_right(self._odd_sums, MA_SIZE * ir_mean)
+        x_sum = size * ir_mean - self._key_sum - sum(tail) + n_negative
+
+        n_th = int(x_sum / size)
+        n_th = 30 if n_th < 30 else n_th  # min allowed
+        n_th = 60 if n_th > 60 else n_th  # max allowed
+
+        # left edges of the first run and of the runs touching the raw tail
+        # are checked here, the others were settled in push()
+        runs = self._runs
+        peaks = []
+        if len(runs) > 1:
+            key = runs[0][1]
+            if key < tail[-1] and key < runs[1][1]:
+                peaks.append((first, key))
+            peaks.extend(self._minima)
+            left = runs[-2][1]
+        else:
+            left = tail[-1]  # x[-1]
+        edge = [(max(runs[-1][0], first), runs[-1][1])]
+        for i, key in enumerate(tail):
+            if key != edge[-1][1]:
+                edge.append((self.count - MA_SIZE + i, key))
+        for (start, key), (_, right) in zip(edge, edge[1:]):
+            if key < left and key < right:
+                peaks.append((start, key))
+            left = key
+
+        # x > n_th, first 15 of them
+        limit = ir_mean - n_th
+        locs = []
+        keys = []
+        for start, key in peaks:
+            if key < limit:
+                locs.append(start - first)
+                keys.append(-key)
+                if len(locs) == 15:
+                    break
+        ir_valley_locs = _remove_close_peaks(np.array(locs, dtype=np.int64), np.array(keys, dtype=np.int64),
+                                             self.min_dist)
+
+        ir_data, red_data = self.window()
+        return hr_and_spo2_from_valleys(ir_data, red_data, ir_valley_locs, self.sample_freq, self.size)
+
+    def _settle(self, pos, ma_sum):
+        """
+        Position `pos` got its moving average.
+        """
+        key = -(-ma_sum // MA_SIZE)
+        self._sums.append(ma_sum)
+        self._key_sum += key
+        if ma_sum % MA_SIZE:
+            insort(self._odd_sums, ma_sum)
+
+        runs = self._runs
+        if runs and runs[-1][1] == key:
+            return
+        # the last run now has both neighbours
+        if len(runs) > 1 and runs[-1][1] < runs[-2][1] and runs[-1][1] < key:
+            self._minima.append(runs[-1])
+        runs.append((pos, key))
+
+    def _drop(self, pos):
+        """
+        Position `pos` left the window.
+        """
+        ma_sum = self._sums.popleft()
+        self._key_sum -= -(-ma_sum // MA_SIZE)
+        if ma_sum % MA_SIZE:
+            del self._odd_sums[bisect_left(self._odd_sums, ma_sum)]
+
+        first = pos + 1
+        while len(self._runs) > 1 and self._runs[1][0] <= first:
+            self._runs.popleft()
+        while self._minima and self._minima[0][0] <= first:
+            self._minima.popleft()
+
+
+def _as_samples(data):
+    """
+    Samples as an np.array, integer samples are widened to int64
+    so AC/DC products cannot overflow.
+    """
+    data = np.asarray(data)
+    if data.dtype.kind in 'iu':
+        data = data.astype(np.int64, copy=False)
+    return data
+
+
+ENGINES = {
+    "python": calc_hr_and_spo2_python,
+    "numpy": calc_hr_and_spo2_numpy,
+}
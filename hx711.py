@@ -0,0 +1,261 @@
+"""
+Lectura del HX711 con lgpio, compartida por peso_bascula y Bascula2.
+
+El HX711 se apaga si PD_SCK queda en alto más de 60 us, y un apagado a
+mitad de lectura devuelve bits basura. Hay dos formas de leerlo:
+
+- por GPIO (el cableado actual, DOUT=5 y PD_SCK=6): las llamadas a lgpio
+  van en variables locales, el bit se lee con PD_SCK en alto y cada fase
+  alta se mide con perf_counter. Si alguna pudo pasar de 60 us, la lectura
+  se descarta y se espera la siguiente conversión.
+- por SPI (LectorSPI, PD_SCK en MOSI y DOUT en MISO): un solo spi_xfer
+  hace los pulsos con el reloj del hardware y lee los bits.
+
+Los pulsos que siguen a los 24 bits eligen canal y ganancia de la
+siguiente conversión: 1 para A/128, 2 para B/32 y 3 para A/64.
+leer_gpio_grupo lee varios HX711 que comparten PD_SCK con la misma
+secuencia de reloj (una plataforma con una celda en cada esquina).
+
+MuestreadorHX711 lee en un hilo a la tasa del chip, así pedir un peso es
+consultar muestras ya tomadas en lugar de bloquear con sleep() entre lecturas.
+"""
+
+import time
+
+from hal import lgpio
+from muestreador import Muestreador
+
+PULSOS_DATOS = 24
+# ganancia -> pulsos extra tras los 24 bits; el canal B solo tiene ganancia 32
+PULSOS_GANANCIA = {128: 1, 32: 2, 64: 3}
+CANAL_GANANCIA = {128: 'A', 32: 'B', 64: 'A'}
+# margen bajo los 60 us de apagado para el tiempo que perf_counter no ve
+T_ALTO_MAX = 50e-6
+
+
+class ErrorHX711(Exception):
+    pass
+
+
+def a_con_signo(valor):
+    """
+    Complemento a 2 de 24 bits.
+    """
+    if valor & 0x800000:
+        valor -= 0x1000000
+    return valor
+
+
+def esperar_listo(h, dout, timeout=0.5):
+    """
+    Espera a que DOUT baje (conversión lista). False si pasó `timeout` segundos
+    (None espera sin límite).
+    """
+    limite = None if timeout is None else time.monotonic() + timeout
+    while lgpio.gpio_read(h, dout):
+        if limite is not None and time.monotonic() > limite:
+            return False
+        time.sleep(0.0005)
+    return True
+
+
+def leer_gpio(h, dout, pd_sck, pulsos_extra=1):
+    """
+    Lee una conversión lista y da `pulsos_extra` pulsos de ganancia.
+    Devuelve la cuenta con signo, o None si PD_SCK pudo quedar en alto
+    el tiempo suficiente para apagar el chip.
+    """
+    escribir = lgpio.gpio_write
+    leer = lgpio.gpio_read
+    reloj = time.perf_counter
+    valor = 0
+    peor = 0.0
+    for _ in range(PULSOS_DATOS):
+        inicio = reloj()
+        escribir(h, pd_sck, 1)
+        valor = (valor << 1) | leer(h, dout)
+        escribir(h, pd_sck, 0)
+        alto = reloj() - inicio
+        if alto > peor:
+            peor = alto
+    for _ in range(pulsos_extra):
+        inicio = reloj()
+        escribir(h, pd_sck, 1)
+        escribir(h, pd_sck, 0)
+        alto = reloj() - inicio
+        if alto > peor:
+            peor = alto
+    if peor > T_ALTO_MAX:
+        return None
+    return a_con_signo(valor)
+
+
+def pulsos_ganancia(ganancia):
+    if ganancia not in PULSOS_GANANCIA:
+        raise ValueError("ganancia del HX711 no valida: {0} (128 o 64 en canal A, 32 en canal B)".format(ganancia))
+    return PULSOS_GANANCIA[ganancia]
+
+
+def leer_cuenta(h, dout, pd_sck, pulsos_extra=1, timeout=0.5, intentos=3):
+    """
+    Siguiente conversión por GPIO, descartando las lecturas cortadas por un apagado.
+    """
+    cortadas = 0
+    reprogramar = False
+    while True:
+        if not esperar_listo(h, dout, timeout):
+            raise ErrorHX711("Timeout esperando sensor HX711")
+        valor = leer_gpio(h, dout, pd_sck, pulsos_extra)
+        if valor is None:
+            cortadas += 1
+            if cortadas >= intentos:
+                raise ErrorHX711("Lecturas del HX711 cortadas por apagado")
+            # al despertar el chip vuelve a canal A, ganancia 128: la próxima
+            # conversión solo sirve para programar otra vez la ganancia
+            reprogramar = pulsos_extra != 1
+        elif reprogramar:
+            reprogramar = False
+        else:
+            return valor
+
+
+def esperar_grupo_listo(h, primer_dout, mascara, timeout=0.5):
+    """
+    Espera a que todos los DOUT del grupo estén en bajo.
+    """
+    limite = None if timeout is None else time.monotonic() + timeout
+    while lgpio.group_read(h, primer_dout)[1] & mascara:
+        if limite is not None and time.monotonic() > limite:
+            return False
+        time.sleep(0.0005)
+    return True
+
+
+def leer_gpio_grupo(h, douts, pd_sck, pulsos_extra=1):
+    """
+    Como leer_gpio para varios HX711 con PD_SCK compartido; los DOUT
+    tienen que estar reclamados como grupo (group_claim_input) y en cada
+    pulso un solo group_read trae el bit de todos los chips.
+    Devuelve la lista de cuentas, o None si PD_SCK pudo apagarlos.
+    """
+    escribir = lgpio.gpio_write
+    leer_grupo = lgpio.group_read
+    reloj = time.perf_counter
+    primer_dout = douts[0]
+    n = len(douts)
+    palabras = []
+    peor = 0.0
+    for _ in range(PULSOS_DATOS):
+        inicio = reloj()
+        escribir(h, pd_sck, 1)
+        palabras.append(leer_grupo(h, primer_dout)[1])
+        escribir(h, pd_sck, 0)
+        alto = reloj() - inicio
+        if alto > peor:
+            peor = alto
+    for _ in range(pulsos_extra):
+        inicio = reloj()
+        escribir(h, pd_sck, 1)
+        escribir(h, pd_sck, 0)
+        alto = reloj() - inicio
+        if alto > peor:
+            peor = alto
+    if peor > T_ALTO_MAX:
+        return None
+    cuentas = []
+    for i in range(n):
+        valor = 0
+        for palabra in palabras:
+            valor = (valor << 1) | ((palabra >> i) & 1)
+        cuentas.append(a_con_signo(valor))
+    return cuentas
+
+
+def leer_cuentas_grupo(h, douts, pd_sck, pulsos_extra=1, timeout=0.5, intentos=3):
+    """
+    Siguiente conversión de todos los chips del grupo.
+    """
+    mascara = (1 << len(douts)) - 1
+    cortadas = 0
+    reprogramar = False
+    while True:
+        if not esperar_grupo_listo(h, douts[0], mascara, timeout):
+            raise ErrorHX711("Timeout esperando sensores HX711")
+        cuentas = leer_gpio_grupo(h, douts, pd_sck, pulsos_extra)
+        if cuentas is None:
+            cortadas += 1
+            if cortadas >= intentos:
+                raise ErrorHX711("Lecturas del HX711 cortadas por apagado")
+            # como en leer_cuenta: la primera conversión tras el apagado es de canal A a 128
+            reprogramar = pulsos_extra != 1
+        elif reprogramar:
+            reprogramar = False
+        else:
+            return cuentas
+
+
+def _trama(pulsos):
+    """
+    Bytes de MOSI con `pulsos` pulsos: cada pulso es un bit en 1 y otro en 0.
+    """
+    bits = '10' * pulsos
+    bits += '0' * (-len(bits) % 8)
+    return bytes(int(bits[i:i + 8], 2) for i in range(0, len(bits), 8))
+
+
+class LectorSPI(object):
+    """
+    HX711 con PD_SCK cableado a MOSI y DOUT a MISO.
+    Cada byte 0xAA son 4 pulsos (1 us en alto a 1 MHz) y MISO se
+    muestrea en la mitad de cada pulso (modo 0), así la lectura entera
+    es un spi_xfer sin riesgo de apagar el chip.
+    """
+
+    def __init__(self, spi_dev=0, spi_canal=0, baudios=1000000):
+        self.spi = lgpio.spi_open(spi_dev, spi_canal, baudios, 0)
+        self._tramas = {}
+
+    def listo(self):
+        # un byte en 0 no da pulsos, solo muestrea DOUT
+        _, rx = lgpio.spi_xfer(self.spi, b'\x00')
+        return not rx[0] & 0x80
+
+    def esperar_listo(self, timeout=0.5):
+        limite = None if timeout is None else time.monotonic() + timeout
+        while not self.listo():
+            if limite is not None and time.monotonic() > limite:
+                return False
+            time.sleep(0.0005)
+        return True
+
+    def leer(self, pulsos_extra=1, timeout=0.5):
+        if not self.esperar_listo(timeout):
+            raise ErrorHX711("Timeout esperando sensor HX711")
+        pulsos = PULSOS_DATOS + pulsos_extra
+        if pulsos not in self._tramas:
+            self._tramas[pulsos] = _trama(pulsos)
+        _, rx = lgpio.spi_xfer(self.spi, self._tramas[pulsos])
+        valor = 0
+        # el bit de cada pulso está en las posiciones 7, 5, 3 y 1 del byte
+        for byte in rx[:PULSOS_DATOS // 4]:
+            for bit in (7, 5, 3, 1):
+                valor = (valor << 1) | ((byte >> bit) & 1)
+        return a_con_signo(valor)
+
+    def close(self):
+        lgpio.spi_close(self.spi)
+
+
+class MuestreadorHX711(Muestreador):
+    """
+    Muestreador de las cuentas de `leer` (una función que bloquea hasta la
+    siguiente cuenta, como HX711_LGPIO.read); las lecturas que fallan con
+    ErrorHX711 solo se cuentan en `errores`.
+    """
+
+    errores_lectura = (ErrorHX711,)
+    error_timeout = ErrorHX711
+    mensaje_timeout = "Timeout esperando sensor HX711"
+
+    def __init__(self, leer, capacidad=800, filtro=None):
+        super(MuestreadorHX711, self).__init__(leer, capacidad, filtro)
@@ -1,14 +1,17 @@
 from heartrate_monitor import HeartRateMonitor
+from ringbuffer import RingBuffer
+from acquisition import PROFILES, DEFAULT_PROFILE
 import time
 import argparse
 import numpy as np
 
 # Importar las clases necesarias
 try:
-    from max30102 import MAX30102
-    MAX30102_AVAILABLE = True
+    from max30102 import MAX30102, smbus
+    MAX30102_AVAILABLE = bool(smbus)
 except ImportError:
     MAX30102_AVAILABLE = False
+if not MAX30102_AVAILABLE:
     print("MAX30102 no disponible, usando modo simulación")
 
 try:
@@ -68,13 +71,15 @@ class BPMMonitor:
         return self.ultimo_bpm
 
 class HeartRateMonitorEstable(HeartRateMonitor):
-    def __init__(self, print_raw=False, print_result=False):
-        super().__init__(print_raw=print_raw, print_result=print_result)
+    def __init__(self, print_raw=False, print_result=False, int_pin=None, profile=None,
+                 sensor=None, recorder=None):
+        super().__init__(print_raw=print_raw, print_result=print_result, int_pin=int_pin, profile=profile,
+                         sensor=sensor, recorder=recorder)
         self.spo2_monitor = SpO2Monitor(MUESTRAS_SPO2)
         self.bpm_monitor = BPMMonitor(MUESTRAS_BPM)
         self.spo2_value = None
         self.bpm_value = None
-        self.simulacion = not MAX30102_AVAILABLE
+        self.simulacion = sensor is None and not MAX30102_AVAILABLE
         self.lecturas_ignoradas = 0
 
     def run_sensor(self):
@@ -82,41 +87,38 @@ class HeartRateMonitorEstable(HeartRateMonitor):
         
         if not self.simulacion:
             # Modo con sensor real
-            sensor = MAX30102()
-            ir_data = []
-            red_data = []
-            bpms = []
-            spo2_values = []
+            sensor = self.open_sensor()
+            ir_data = RingBuffer(self.profile.window)
+            red_data = RingBuffer(self.profile.window)
+            bpms = RingBuffer(4, dtype=float)
+            spo2_values = RingBuffer(4, dtype=float)
+            usar_interrupcion = self.setup_interrupt(sensor)
 
             print("Sensor MAX30102 iniciado. Coloque el dedo en el sensor...")
 
             while not self._thread.stopped:
-                num_bytes = sensor.get_data_present()
-                if num_bytes > 0:
-                    while num_bytes > 0:
-                        red, ir = sensor.read_fifo()
-                        num_bytes -= 1
+                lote = sensor.read_fifo_batch(clear_interrupts=usar_interrupcion)
+                if self.count_batch(lote) and self.print_result:
+                    print(f"Se perdieron {lote.lost} muestras (desbordamiento del FIFO)")
+                if self.recorder is not None and len(lote.ir) > 0:
+                    self.recorder.write_batch(lote)
+                if len(lote.ir) > 0:
+                    for red, ir in zip(lote.red.tolist(), lote.ir.tolist()):
                         ir_data.append(ir)
                         red_data.append(red)
                         if self.print_raw:
                             print("{0}, {1}".format(ir, red))
 
-                    while len(ir_data) > 100:
-                        ir_data.pop(0)
-                        red_data.pop(0)
-
-                    if len(ir_data) == 100:
-                        bpm, valid_bpm, spo2, valid_spo2 = self.calc_hr_and_spo2(ir_data, red_data)
+                    if ir_data.full:
+                        bpm, valid_bpm, spo2, valid_spo2 = self.calc_hr_and_spo2(ir_data.view(), red_data.view())
                         
                         # Procesar BPM con promedio
                         if valid_bpm:
                             bpms.append(bpm)
-                            while len(bpms) > 4:
-                                bpms.pop(0)
-                            self.bpm_value = self.bpm_monitor.procesar_bpm(np.mean(bpms))
+                            self.bpm_value = self.bpm_monitor.procesar_bpm(bpms.mean())
                             
                             # Detección de dedo
-                            if (np.mean(ir_data) < 50000 and np.mean(red_data) < 50000):
+                            if (ir_data.mean() < 50000 and red_data.mean() < 50000):
                                 self.bpm_value = 0
                                 if self.print_result:
                                     print("Dedo no detectado")
@@ -125,9 +127,7 @@ class HeartRateMonitorEstable(HeartRateMonitor):
                         if valid_spo2 and spo2 > 0:
                             if spo2 >= 80:  # Solo aceptar valores >= 80
                                 spo2_values.append(spo2)
-                                while len(spo2_values) > 4:
-                                    spo2_values.pop(0)
-                                self.spo2_value = self.spo2_monitor.procesar_spo2(np.mean(spo2_values))
+                                self.spo2_value = self.spo2_monitor.procesar_spo2(spo2_values.mean())
                             else:
                                 # Contar lecturas ignoradas
                                 self.lecturas_ignoradas += 1
@@ -138,7 +138,7 @@ class HeartRateMonitorEstable(HeartRateMonitor):
                         if self.print_result and self.bpm_value and self.spo2_value:
                             print("BPM: {0}, SpO2: {1}".format(self.bpm_value, self.spo2_value))
 
-                time.sleep(self.LOOP_TIME)
+                self.wait_for_data(sensor, usar_interrupcion)
 
             sensor.shutdown()
         else:
@@ -181,7 +181,7 @@ class HeartRateMonitorEstable(HeartRateMonitor):
     def calc_hr_and_spo2(self, ir_data, red_data):
         """Wrapper para la función de cálculo existente"""
         if HRCALC_AVAILABLE:
-            return hrcalc.calc_hr_and_spo2(ir_data, red_data)
+            return hrcalc.calc_hr_and_spo2(ir_data, red_data, **self.profile.hrcalc_params())
         else:
             # Simulación básica si hrcalc no está disponible - solo valores >= 80
             bpm_sim = 70 + np.random.uniform(-10, 10)
@@ -189,7 +189,7 @@ class HeartRateMonitorEstable(HeartRateMonitor):
             spo2_sim = max(80, spo2_sim)  # Forzar mínimo de 80
             return bpm_sim, True, spo2_sim, True
 
-def obtener_spo2(num_lecturas=15):
+def obtener_spo2(num_lecturas=15, int_pin=None, perfil=DEFAULT_PROFILE):
     """
     Función que realiza un número específico de lecturas y retorna el valor promedio de SpO2
     IGNORA TODAS LAS LECTURAS MENORES A 80%
@@ -198,7 +198,7 @@ def obtener_spo2(num_lecturas=15):
     print('FILTRO ACTIVADO: Ignorando lecturas menores a 80%')
     print('Por favor, coloque su dedo en el sensor y manténgalo quieto...')
     
-    hrm = HeartRateMonitorEstable(print_raw=False, print_result=True)
+    hrm = HeartRateMonitorEstable(print_raw=False, print_result=True, int_pin=int_pin, profile=perfil)
     
     try:
         # Iniciar sensor
@@ -273,6 +273,9 @@ def obtener_spo2(num_lecturas=15):
             print(f"RESULTADOS:")
             print(f"Lecturas válidas: {len(valores_spo2)}/{num_lecturas}")
             print(f"Lecturas ignoradas (<80%): {lecturas_ignoradas_total}")
+            if not hrm.simulacion:
+                print(f"Muestras recibidas/perdidas: {hrm.samples_received}/{hrm.samples_dropped} "
+                      f"({hrm.effective_sample_rate():.1f} muestras/s)")
             print(f"SpO2 promedio: {spo2_final}%")
             print(f"Rango: {min(valores_spo2)}% - {max(valores_spo2)}%")
             if len(valores_spo2) > 1:
@@ -301,6 +304,10 @@ if __name__ == "__main__":
                         help="número de lecturas a realizar, por defecto 15")
     parser.add_argument("-r", "--raw", action="store_true",
                         help="mostrar datos crudos")
+    parser.add_argument("-i", "--int_pin", type=int, default=None,
+                        help="GPIO conectado al pin INT del MAX30102 (sin él se consulta cada 10 ms)")
+    parser.add_argument("-p", "--perfil", choices=sorted(PROFILES), default=DEFAULT_PROFILE,
+                        help="perfil de adquisición del MAX30102, por defecto " + DEFAULT_PROFILE)
     args = parser.parse_args()
 
     # Verificar disponibilidad del sensor
@@ -312,7 +319,7 @@ if __name__ == "__main__":
     print("FILTRO ACTIVADO: Ignorando todas las lecturas de SpO2 menores a 80%")
 
     # Obtener medición de SpO2
-    spo2 = obtener_spo2(args.num_lecturas)
+    spo2 = obtener_spo2(args.num_lecturas, args.int_pin, args.perfil)
     
     if spo2:
         print(f"\nVALOR FINAL DE SpO2: {spo2+2}%")
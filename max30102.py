@@ -2,8 +2,17 @@
 
 # this code is currently for python 2.7
 from __future__ import print_function
-from time import sleep
-import smbus
+from collections import namedtuple
+from contextlib import nullcontext
+from time import monotonic, sleep
+import threading
+import numpy as np
+
+from acquisition import get_profile
+# smbus is only needed to open the sensor, FifoBatch/decode_fifo work without it,
+# lgpio only to wait on the INT pin; both are falsy when not installed
+from bus_i2c import PRIORIDAD_PPG, bus_i2c
+from hal import lgpio, smbus
 
 # register addresses
 REG_INTR_STATUS_1 = 0x00
@@ -34,14 +43,33 @@ REG_PROX_INT_THRESH = 0x30
 REG_REV_ID = 0xFE
 REG_PART_ID = 0xFF
 
+# the FIFO holds 32 samples of 6 bytes (3 red + 3 ir)
+FIFO_DEPTH = 32
+BYTES_PER_SAMPLE = 6
+# SMBus block reads are limited to 32 bytes, 5 whole samples
+SAMPLES_PER_BLOCK = 32 // BYTES_PER_SAMPLE
+
+# samples drained from the FIFO in one go, `lost` is the number of samples
+# the FIFO dropped before them and `timestamp` when the pointers were read
+FifoBatch = namedtuple('FifoBatch', ['red', 'ir', 'lost', 'timestamp'])
+
 
 class MAX30102():
     # by default, this assumes that the device is at 0x57 on channel 1
-    def __init__(self, channel=1, address=0x57):
+    # `profile` is an acquisition profile (or its name), see acquisition.PROFILES
+    # `bus` is anything with the smbus.SMBus methods, by default the shared
+    # bus_i2c broker, where FIFO drains go ahead of the thermometer
+    def __init__(self, channel=1, address=0x57, profile=None, bus=None):
         #print("Channel: {0}, address: {1}".format(channel, address))
         self.address = address
         self.channel = channel
-        self.bus = smbus.SMBus(self.channel)
+        self.profile = get_profile(profile)
+        if bus is None:
+            if not smbus:
+                raise ImportError("smbus is not available")
+            bus = bus_i2c(channel).cliente('max30102', PRIORIDAD_PPG)
+        self.bus = bus
+        self._gpio_handle = None
 
         self.reset()
 
@@ -57,6 +85,7 @@ class MAX30102():
         """
         Shutdown the device.
         """
+        self.disable_interrupt_pin()
         self.bus.write_i2c_block_data(self.address, REG_MODE_CONFIG, [0x80])
 
     def reset(self):
@@ -66,10 +95,15 @@ class MAX30102():
         """
         self.bus.write_i2c_block_data(self.address, REG_MODE_CONFIG, [0x40])
 
-    def setup(self, led_mode=0x03):
+    def setup(self, led_mode=0x03, profile=None):
         """
-        This will setup the device with the values written in sample Arduino code.
+        This will setup the device with the values of the acquisition profile,
+        the "standard" one holds the values written in sample Arduino code.
         """
+        if profile is not None:
+            self.profile = get_profile(profile)
+        profile = self.profile
+
         # INTR setting
         # 0xc0 : A_FULL_EN and PPG_RDY_EN = Interrupt will be triggered when
         # fifo almost full & new fifo data ready
@@ -83,20 +117,20 @@ class MAX30102():
         # FIFO_RD_PTR[4:0]
         self.bus.write_i2c_block_data(self.address, REG_FIFO_RD_PTR, [0x00])
 
-        # 0b 0100 1111
+        # standard: 0b 0100 1111
         # sample avg = 4, fifo rollover = false, fifo almost full = 17
-        self.bus.write_i2c_block_data(self.address, REG_FIFO_CONFIG, [0x4f])
+        self.bus.write_i2c_block_data(self.address, REG_FIFO_CONFIG, [profile.fifo_config()])
 
         # 0x02 for read-only, 0x03 for SpO2 mode, 0x07 multimode LED
         self.bus.write_i2c_block_data(self.address, REG_MODE_CONFIG, [led_mode])
-        # 0b 0010 0111
+        # standard: 0b 0010 0111
         # SPO2_ADC range = 4096nA, SPO2 sample rate = 100Hz, LED pulse-width = 411uS
-        self.bus.write_i2c_block_data(self.address, REG_SPO2_CONFIG, [0x27])
+        self.bus.write_i2c_block_data(self.address, REG_SPO2_CONFIG, [profile.spo2_config()])
 
-        # choose value for ~7mA for LED1
-        self.bus.write_i2c_block_data(self.address, REG_LED1_PA, [0x24])
-        # choose value for ~7mA for LED2
-        self.bus.write_i2c_block_data(self.address, REG_LED2_PA, [0x24])
+        # standard: choose value for ~7mA for LED1
+        self.bus.write_i2c_block_data(self.address, REG_LED1_PA, [profile.led_current])
+        # standard: choose value for ~7mA for LED2
+        self.bus.write_i2c_block_data(self.address, REG_LED2_PA, [profile.led_current])
         # choose value fro ~25mA for Pilot LED
         self.bus.write_i2c_block_data(self.address, REG_PILOT_PA, [0x7f])
 
@@ -105,17 +139,23 @@ class MAX30102():
     def set_config(self, reg, value):
         self.bus.write_i2c_block_data(self.address, reg, value)
 
+    def read_pointers(self):
+        """
+        Read FIFO_WR_PTR, OVF_COUNTER and FIFO_RD_PTR in one transaction.
+        """
+        write_ptr, ovf_counter, read_ptr = self.bus.read_i2c_block_data(self.address, REG_FIFO_WR_PTR, 3)
+        return write_ptr, ovf_counter, read_ptr
+
+    def read_interrupt_status(self):
+        """
+        Read (and clear) both interrupt status registers in one transaction.
+        """
+        status_1, status_2 = self.bus.read_i2c_block_data(self.address, REG_INTR_STATUS_1, 2)
+        return status_1, status_2
+
     def get_data_present(self):
-        read_ptr = self.bus.read_byte_data(self.address, REG_FIFO_RD_PTR)
-        write_ptr = self.bus.read_byte_data(self.address, REG_FIFO_WR_PTR)
-        if read_ptr == write_ptr:
-            return 0
-        else:
-            num_samples = write_ptr - read_ptr
-            # account for pointer wrap around
-            if num_samples < 0:
-                num_samples += 32
-            return num_samples
+        write_ptr, ovf_counter, read_ptr = self.read_pointers()
+        return fifo_samples(write_ptr, ovf_counter, read_ptr)
 
     def read_fifo(self):
         """
@@ -137,6 +177,89 @@ class MAX30102():
 
         return red_led, ir_led
 
+    def enable_interrupt_pin(self, gpio, chip=0):
+        """
+        Watch the INT pin (open drain, active low) with an lgpio alert,
+        so wait_for_data() can block instead of polling the FIFO pointers.
+        """
+        if not lgpio:
+            raise RuntimeError("lgpio is not available")
+        self._data_ready = threading.Event()
+        self._gpio_handle = lgpio.gpiochip_open(chip)
+        try:
+            lgpio.gpio_claim_alert(self._gpio_handle, gpio, lgpio.FALLING_EDGE, lgpio.SET_PULL_UP)
+            self._int_callback = lgpio.callback(self._gpio_handle, gpio, lgpio.FALLING_EDGE, self._on_interrupt)
+        except Exception:
+            lgpio.gpiochip_close(self._gpio_handle)
+            self._gpio_handle = None
+            raise
+        # INT stays low until the status is read, release it so the next edge is seen
+        self.read_interrupt_status()
+
+    def disable_interrupt_pin(self):
+        if self._gpio_handle is None:
+            return
+        self._int_callback.cancel()
+        lgpio.gpiochip_close(self._gpio_handle)
+        self._gpio_handle = None
+
+    def _on_interrupt(self, chip, gpio, level, timestamp):
+        self._data_ready.set()
+
+    def wait_for_data(self, timeout=None):
+        """
+        Block until the INT pin fires, returns False on timeout.
+        """
+        ready = self._data_ready.wait(timeout)
+        self._data_ready.clear()
+        return ready
+
+    def _bus_operation(self):
+        """
+        Reserve the bus for several transactions (bus_i2c), a plain smbus has nothing to reserve.
+        """
+        operation = getattr(self.bus, 'operacion', None)
+        return operation() if operation is not None else nullcontext()
+
+    def read_fifo_burst(self, n=None, clear_interrupts=False):
+        """
+        Read up to `n` samples (everything in the FIFO by default) with
+        block reads of SAMPLES_PER_BLOCK samples each.
+        Reading FIFO_DATA already clears PPG_RDY and A_FULL, so the status
+        registers are only read when clear_interrupts is set.
+        Returns (red, ir) as np.arrays.
+        """
+        batch = self.read_fifo_batch(n, clear_interrupts)
+        return batch.red, batch.ir
+
+    def read_fifo_batch(self, n=None, clear_interrupts=False):
+        """
+        read_fifo_burst that also reports the samples lost to a FIFO
+        overflow since the last read (OVF_COUNTER, saturates at 31)
+        and the time of the read, as a FifoBatch.
+        """
+        # the pointers and the block reads that follow are one drain, no
+        # other process may use the bus in between
+        with self._bus_operation():
+            if clear_interrupts:
+                self.read_interrupt_status()
+
+            timestamp = monotonic()
+            write_ptr, ovf_counter, read_ptr = self.read_pointers()
+            num_samples = fifo_samples(write_ptr, ovf_counter, read_ptr)
+            if n is not None and n < num_samples:
+                num_samples = n
+
+            data = []
+            remaining = num_samples
+            while remaining > 0:
+                count = min(remaining, SAMPLES_PER_BLOCK)
+                data.extend(self.bus.read_i2c_block_data(self.address, REG_FIFO_DATA, count * BYTES_PER_SAMPLE))
+                remaining -= count
+
+        red_led, ir_led = decode_fifo(data)
+        return FifoBatch(red_led, ir_led, ovf_counter, timestamp)
+
     def read_sequential(self, amount=100):
         """
         This function will read the red-led and ir-led `amount` times.
@@ -156,3 +279,28 @@ class MAX30102():
                 count -= 1
 
         return red_buf, ir_buf
+
+
+def fifo_samples(write_ptr, ovf_counter, read_ptr):
+    """
+    Number of unread samples in the FIFO.
+    """
+    num_samples = write_ptr - read_ptr
+    # account for pointer wrap around
+    if num_samples < 0:
+        num_samples += FIFO_DEPTH
+    # equal pointers after an overflow mean a full FIFO, not an empty one
+    if num_samples == 0 and ovf_counter > 0:
+        num_samples = FIFO_DEPTH
+    return num_samples
+
+
+def decode_fifo(data):
+    """
+    Decode raw FIFO bytes into (red, ir) np.arrays.
+    """
+    d = np.asarray(data, dtype=np.int64).reshape(-1, BYTES_PER_SAMPLE)
+    # mask MSB [23:18]
+    red_led = (d[:, 0] << 16 | d[:, 1] << 8 | d[:, 2]) & 0x03FFFF
+    ir_led = (d[:, 3] << 16 | d[:, 4] << 8 | d[:, 5]) & 0x03FFFF
+    return red_led, ir_led
@@ -0,0 +1,133 @@
+"""
+Lector directo de registros del MLX90614.
+
+Lee la RAM del sensor (TA, TOBJ1 y TOBJ2 en los de dos zonas) por el bus
+compartido de bus_i2c, el mismo del MAX30102, sin busio ni adafruit. Cada
+registro es una palabra con PEC; el PEC se verifica con un CRC-8 por tabla
+y los lotes salen como arrays de NumPy.
+"""
+
+import time
+from contextlib import nullcontext
+
+import numpy as np
+
+from bus_i2c import PRIORIDAD_TERMOMETRO, bus_i2c
+from hal import smbus
+
+DIRECCION = 0x5A
+
+# registros de RAM
+TA = 0x06
+TOBJ1 = 0x07
+TOBJ2 = 0x08
+
+# bit 15 de TOBJ en 1: la medición no es válida
+BANDERA_ERROR = 0x8000
+
+
+def _tabla_crc8(polinomio=0x07):
+    tabla = []
+    for byte in range(256):
+        crc = byte
+        for _ in range(8):
+            crc = ((crc << 1) ^ polinomio) & 0xFF if crc & 0x80 else (crc << 1) & 0xFF
+        tabla.append(crc)
+    return bytes(tabla)
+
+
+TABLA_CRC8 = _tabla_crc8()
+
+
+def crc8(datos, crc=0):
+    """
+    PEC del SMBus (CRC-8, polinomio x^8 + x^2 + x + 1). Con `crc` se sigue
+    un cálculo ya empezado.
+    """
+    for byte in datos:
+        crc = TABLA_CRC8[crc ^ byte]
+    return crc
+
+
+def a_celsius(palabras):
+    """
+    Palabras de RAM (pasos de 0.02 K) a °C; acepta arrays.
+    """
+    return np.asarray(palabras) * 0.02 - 273.15
+
+
+class ErrorMLX90614(OSError):
+    pass
+
+
+class MLX90614(object):
+    """
+    MLX90614 leído por registros. leer() da [TA, TOBJ1] (más TOBJ2 con
+    dos_zonas) en °C, leer_lote(n) un array (n, registros). Tiene también
+    las propiedades de adafruit_mlx90614.MLX90614.
+    """
+
+    def __init__(self, bus=None, direccion=DIRECCION, dos_zonas=False, intentos=3):
+        if bus is None:
+            if not smbus:
+                raise ImportError("smbus no está disponible")
+            bus = bus_i2c(1).cliente('mlx90614', PRIORIDAD_TERMOMETRO)
+        self.bus = bus
+        self.direccion = direccion
+        self.registros = (TA, TOBJ1, TOBJ2) if dos_zonas else (TA, TOBJ1)
+        self.intentos = intentos
+        self.errores_pec = 0
+        # el PEC cubre dirección de escritura, comando y dirección de lectura antes de los datos
+        self._inicio_pec = {reg: crc8((direccion << 1, reg, (direccion << 1) | 1))
+                            for reg in (TA, TOBJ1, TOBJ2)}
+
+    def leer_palabra(self, reg):
+        """
+        Palabra de RAM con el PEC verificado; reintenta si no coincide.
+        """
+        for _ in range(self.intentos):
+            bajo, alto, pec = self.bus.read_i2c_block_data(self.direccion, reg, 3)
+            if crc8((bajo, alto), self._inicio_pec[reg]) == pec:
+                break
+            self.errores_pec += 1
+        else:
+            raise ErrorMLX90614("PEC inválido leyendo el registro 0x{0:02X}".format(reg))
+        palabra = bajo | alto << 8
+        if palabra & BANDERA_ERROR:
+            raise ErrorMLX90614("Medición inválida en el registro 0x{0:02X}".format(reg))
+        return palabra
+
+    def leer_palabras(self):
+        # todos los registros en una operación del bus, sin otro proceso en el medio
+        operacion = getattr(self.bus, 'operacion', None)
+        with operacion() if operacion is not None else nullcontext():
+            return [self.leer_palabra(reg) for reg in self.registros]
+
+    def leer(self):
+        """
+        [TA, TOBJ1] (o [TA, TOBJ1, TOBJ2]) en °C.
+        """
+        return a_celsius(self.leer_palabras())
+
+    def leer_lote(self, n, periodo=0.0):
+        """
+        n lecturas de todos los registros como array (n, registros) en °C,
+        con `periodo` segundos entre lecturas.
+        """
+        palabras = np.empty((n, len(self.registros)), dtype=np.uint16)
+        for i in range(n):
+            palabras[i] = self.leer_palabras()
+            if periodo and i < n - 1:
+                time.sleep(periodo)
+        return a_celsius(palabras)
+
+    @property
+    def ambient_temperature(self):
+        return float(a_celsius(self.leer_palabra(TA)))
+
+    @property
+    def object_temperature(self):
+        return float(a_celsius(self.leer_palabra(TOBJ1)))
+
+    def close(self):
+        self.bus.close()
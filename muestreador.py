@@ -0,0 +1,162 @@
+"""
+Muestreo de un sensor en un hilo.
+
+Un Muestreador llama a una función de lectura en un hilo y guarda cada
+valor en un RingBuffer; pedir un promedio o el último valor es consultar
+muestras ya tomadas en lugar de bloquear con sleep() entre lecturas.
+MuestreadorHX711 (báscula) y TermometroMLX90614 son Muestreadores.
+"""
+
+import threading
+import time
+
+import numpy as np
+
+from ringbuffer import RingBuffer
+
+
+class Muestreador(object):
+    """
+    Hilo que guarda en `muestras` cada valor de `fuente`. Con `periodo` lee
+    cada tantos segundos; sin periodo `fuente` tiene que bloquear hasta el
+    próximo valor (como HX711_LGPIO.read). Las excepciones de
+    `errores_lectura` solo suman a `errores`. Con `filtro` (ver
+    filtros_bascula) se guarda la salida del filtro y lo que descarta no entra.
+    latest() y mean_over() no bloquean; wait_for_samples(n) espera a que
+    el buffer tenga n muestras. Cualquier otra excepción detiene el hilo y
+    queda en `fallo`; quien espera muestras la recibe en lugar de un timeout.
+    """
+
+    errores_lectura = ()
+    # excepción y mensaje de next_sample() cuando no llega la muestra
+    error_timeout = TimeoutError
+    mensaje_timeout = "Timeout esperando el sensor"
+
+    def __init__(self, fuente, capacidad=800, filtro=None, periodo=None, dtype=np.int64):
+        self.fuente = fuente
+        self.filtro = filtro
+        self.periodo = periodo
+        self.muestras = RingBuffer(capacidad, dtype=dtype)
+        self.errores = 0
+        self.descartadas = 0
+        self.fallo = None
+        self._ultima = None
+        self._cond = threading.Condition()
+        self._parar = threading.Event()
+        self._hilo = None
+
+    def __len__(self):
+        return len(self.muestras)
+
+    @property
+    def activo(self):
+        return self._hilo is not None and self._hilo.is_alive()
+
+    def start(self):
+        if self.activo:
+            return
+        self._parar.clear()
+        self.fallo = None
+        self._hilo = threading.Thread(target=self._muestrear, daemon=True)
+        self._hilo.start()
+
+    def stop(self):
+        self._parar.set()
+        if self._hilo is not None:
+            self._hilo.join(timeout=1)
+            self._hilo = None
+
+    def _guardar(self, valor):
+        # se llama con el lock tomado
+        self.muestras.append(valor)
+        self._ultima = valor
+
+    def _muestrear(self):
+        try:
+            self._bucle()
+        except Exception as e:
+            with self._cond:
+                self.fallo = e
+                self._cond.notify_all()
+
+    def _bucle(self):
+        proxima = time.monotonic()
+        while not self._parar.is_set():
+            try:
+                valor = self.fuente()
+            except self.errores_lectura:
+                self.errores += 1
+            else:
+                if self.filtro is not None:
+                    valor = self.filtro.agregar(valor)
+                if valor is None:
+                    self.descartadas += 1
+                else:
+                    with self._cond:
+                        self._guardar(valor)
+                        self._cond.notify_all()
+            if self.periodo is not None:
+                proxima = max(proxima + self.periodo, time.monotonic())
+                self._parar.wait(proxima - time.monotonic())
+
+    def _revisar_fallo(self):
+        # se llama con el lock tomado
+        if self.fallo is not None:
+            raise self.fallo
+
+    def _esperar(self, listo, timeout):
+        """
+        wait_for() de `listo` que termina antes si el hilo falló; re-lanza ese fallo.
+        """
+        resultado = self._cond.wait_for(lambda: listo() or self.fallo is not None, timeout)
+        self._revisar_fallo()
+        return resultado
+
+    def clear(self):
+        """
+        Descarta las muestras tomadas (por ejemplo al subir el paciente).
+        """
+        with self._cond:
+            self.muestras.clear()
+            if self.filtro is not None:
+                self.filtro.reset()
+
+    def latest(self):
+        """
+        Último valor leído, None si todavía no hay ninguno.
+        """
+        return self._ultima
+
+    def recent(self, n=None):
+        """
+        Copia de los últimos n valores, el más viejo primero.
+        """
+        with self._cond:
+            return self.muestras.view(n).copy()
+
+    def mean_over(self, window):
+        """
+        Promedio de los últimos `window` valores (menos si aún no hay tantos), None sin muestras.
+        """
+        with self._cond:
+            if not len(self.muestras):
+                return None
+            return float(self.muestras.view(window).mean())
+
+    def wait_for_samples(self, n, timeout=None):
+        """
+        Bloquea hasta que el buffer tenga al menos n muestras. False si pasó `timeout`.
+        """
+        n = min(n, self.muestras.capacity)
+        with self._cond:
+            return self._esperar(lambda: len(self.muestras) >= n, timeout)
+
+    def next_sample(self, timeout=0.5):
+        """
+        El próximo valor que lea el hilo.
+        """
+        with self._cond:
+            cantidad = self.muestras.count
+            if not self._esperar(lambda: self.muestras.count > cantidad, timeout):
+                raise self.error_timeout(self.mensaje_timeout)
+            return self._ultima
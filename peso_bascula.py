@@ -1,16 +1,26 @@
-import lgpio
+from hal import lgpio
 import time
-import json
-import os
+
+from autocero import AutoCero
+import calibracion
+import filtros_bascula
+import hx711
 
 class HX711_LGPIO:
-    def __init__(self, dout, pd_sck, gain=128):
+    def __init__(self, dout, pd_sck, gain=128, spi=None):
         self.DOUT = dout
         self.PD_SCK = pd_sck
+        # gain 128 o 64 es el canal A, 32 el canal B; define los pulsos tras los 24 bits
         self.GAIN = gain
+        self._pulses = hx711.pulsos_ganancia(gain)
         self.OFFSET = 0
         self.SCALE = 1
         
+        # Con spi=(dispositivo, canal) se lee por SPI (PD_SCK en MOSI, DOUT en MISO)
+        self.spi = hx711.LectorSPI(*spi) if spi is not None else None
+        # hilo de muestreo continuo, ver start_sampling()
+        self.muestreo = None
+        
         # Abrir conexión con lgpio
         self.h = lgpio.gpiochip_open(0)
         
@@ -20,6 +30,25 @@ class HX711_LGPIO:
         
         self.power_down()
         self.power_up()
+        # tras el reinicio el chip queda en A/128; una lectura programa otra ganancia
+        if gain != 128:
+            self._read_chip()
+        
+    @property
+    def channel(self):
+        return hx711.CANAL_GANANCIA[self.GAIN]
+    
+    def set_gain(self, gain):
+        # Cambia canal/ganancia; el offset es distinto en cada uno, conviene hacer tara
+        self._pulses = hx711.pulsos_ganancia(gain)
+        self.GAIN = gain
+        if self.muestreo is not None:
+            # la conversión en curso y la siguiente todavía son de la ganancia anterior
+            self.muestreo.next_sample()
+            self.muestreo.next_sample()
+            self.muestreo.clear()
+        else:
+            self._read_chip()
         
     def power_down(self):
         lgpio.gpio_write(self.h, self.PD_SCK, 0)
@@ -32,38 +61,47 @@ class HX711_LGPIO:
     def is_ready(self):
         return lgpio.gpio_read(self.h, self.DOUT) == 0
         
+    def start_sampling(self, capacidad=800, filtro=None):
+        # Lee en segundo plano a la tasa del chip; read() y get_value() usan esas muestras,
+        # sin glitches ni picos salvo que se pase otro filtro
+        if self.muestreo is None:
+            if filtro is None:
+                filtro = filtros_bascula.filtro_por_defecto()
+            self.muestreo = hx711.MuestreadorHX711(self._read_chip, capacidad, filtro)
+        self.muestreo.start()
+        return self.muestreo
+    
+    def stop_sampling(self):
+        if self.muestreo is not None:
+            self.muestreo.stop()
+            self.muestreo = None
+    
     def read(self):
-        # Esperar hasta que el sensor esté listo
-        timeout = time.time() + 0.5  # Timeout de 500ms
-        while not self.is_ready():
-            if time.time() > timeout:
-                raise Exception("Timeout esperando sensor HX711")
-            time.sleep(0.001)
-        
-        # Leer los 24 bits de datos
-        data = 0
-        for i in range(24):
-            lgpio.gpio_write(self.h, self.PD_SCK, 1)
-            lgpio.gpio_write(self.h, self.PD_SCK, 0)
-            bit = lgpio.gpio_read(self.h, self.DOUT)
-            data = (data << 1) | bit
-        
-        # Configurar la ganancia para la siguiente lectura
-        for i in range(self.GAIN):
-            lgpio.gpio_write(self.h, self.PD_SCK, 1)
-            lgpio.gpio_write(self.h, self.PD_SCK, 0)
-        
-        # Convertir a signed integer (complemento a 2)
-        if data & 0x800000:  # Si es negativo
-            data = data - 0x1000000
-        
-        return data
+        if self.muestreo is not None:
+            return self.muestreo.next_sample()
+        return self._read_chip()
+    
+    def _read_chip(self):
+        # 24 bits y los pulsos de ganancia para la siguiente lectura (timeout de 500ms)
+        if self.spi is not None:
+            return self.spi.leer(self._pulses)
+        return hx711.leer_cuenta(self.h, self.DOUT, self.PD_SCK, self._pulses)
     
     def get_value(self, times=3):
+        if self.muestreo is not None:
+            # promedio de las últimas muestras, solo espera si todavía no hay tantas
+            if not self.muestreo.wait_for_samples(times, timeout=0.5 + times / 10.0):
+                raise Exception("No se pudieron obtener lecturas válidas")
+            return self.muestreo.mean_over(times)
+        
         values = []
         for i in range(times):
             try:
-                values.append(self.read())
+                value = self.read()
+                if filtros_bascula.es_glitch(value):
+                    print(f"Lectura {i+1} descartada (glitch {value})")
+                    continue
+                values.append(value)
             except Exception as e:
                 print(f"Error en lectura {i+1}: {e}")
                 continue
@@ -72,7 +110,7 @@ class HX711_LGPIO:
         if not values:
             raise Exception("No se pudieron obtener lecturas válidas")
         
-        return sum(values) / len(values)
+        return filtros_bascula.media_recortada(values, 0.2)
     
     def get_units(self, times=3):
         return (self.get_value(times) - self.OFFSET) / self.SCALE
@@ -87,43 +125,104 @@ class HX711_LGPIO:
         self.OFFSET = offset
     
     def close(self):
+        self.stop_sampling()
+        if self.spi is not None:
+            self.spi.close()
+        lgpio.gpiochip_close(self.h)
+
+class HX711_Multi:
+    # Varios HX711 con PD_SCK compartido (una celda en cada esquina de la plataforma):
+    # la misma secuencia de reloj lee todos los chips a la vez
+    def __init__(self, douts, pd_sck, gain=128):
+        self.DOUTS = list(douts)
+        self.PD_SCK = pd_sck
+        self.GAIN = gain
+        self._pulses = hx711.pulsos_ganancia(gain)
+        self.OFFSETS = [0] * len(self.DOUTS)
+        self.SCALES = [1] * len(self.DOUTS)
+        
+        self.h = lgpio.gpiochip_open(0)
+        # Los DOUT como grupo: un group_read trae el bit de todos
+        lgpio.group_claim_input(self.h, self.DOUTS)
+        lgpio.gpio_claim_output(self.h, self.PD_SCK)
+        
+        # Reinicio de todos los chips (PD_SCK en alto más de 60us)
+        lgpio.gpio_write(self.h, self.PD_SCK, 1)
+        time.sleep(0.0001)
+        lgpio.gpio_write(self.h, self.PD_SCK, 0)
+        if gain != 128:
+            self.read()
+    
+    def read(self):
+        # Una cuenta por chip, en el orden de DOUTS
+        return hx711.leer_cuentas_grupo(self.h, self.DOUTS, self.PD_SCK, self._pulses)
+    
+    def get_value(self, times=3):
+        lecturas = []
+        for i in range(times):
+            try:
+                cuentas = self.read()
+            except Exception as e:
+                print(f"Error en lectura {i+1}: {e}")
+                continue
+            if any(filtros_bascula.es_glitch(c) for c in cuentas):
+                print(f"Lectura {i+1} descartada (glitch {cuentas})")
+                continue
+            lecturas.append(cuentas)
+        
+        if not lecturas:
+            raise Exception("No se pudieron obtener lecturas válidas")
+        
+        # media recortada de cada chip
+        return [filtros_bascula.media_recortada(columna, 0.2) for columna in zip(*lecturas)]
+    
+    def get_units(self, times=3):
+        # Peso total: la suma de lo que carga cada celda
+        valores = self.get_value(times)
+        return sum((v - o) / s for v, o, s in zip(valores, self.OFFSETS, self.SCALES))
+    
+    def tare(self, times=15):
+        self.OFFSETS = self.get_value(times)
+    
+    def set_scales(self, scales):
+        self.SCALES = list(scales)
+    
+    def set_offsets(self, offsets):
+        self.OFFSETS = list(offsets)
+    
+    def close(self):
+        lgpio.group_free(self.h, self.DOUTS[0])
         lgpio.gpiochip_close(self.h)
 
 class BalanzaPi5:
-    def __init__(self, dout_pin=5, pd_sck_pin=6, archivo_calibracion="calibracion.json"):
+    def __init__(self, dout_pin=5, pd_sck_pin=6, archivo_calibracion=calibracion.ARCHIVO):
         self.dout_pin = dout_pin
         self.pd_sck_pin = pd_sck_pin
-        self.archivo_calibracion = archivo_calibracion
+        # calibración compartida con Bascula2 (offset y cuentas por kg)
+        self.cal = calibracion.calibracion(archivo_calibracion)
         
         print("Inicializando HX711 en Raspberry Pi 5...")
         self.hx = HX711_LGPIO(dout_pin, pd_sck_pin)
+        self.hx.start_sampling()
         
         self.cargar_calibracion()
+        # el cero se sigue solo mientras la balanza está vacía
+        self.autocero = AutoCero(self.hx.muestreo, self.cal)
+        self.autocero.start()
         print("Balanza lista")
 
     def cargar_calibracion(self):
-        if os.path.exists(self.archivo_calibracion):
-            try:
-                with open(self.archivo_calibracion, 'r') as f:
-                    datos = json.load(f)
-                    self.hx.set_offset(datos['offset'])
-                    self.hx.set_scale(datos['scale'])
-                print(f"Calibracion cargada - Offset: {self.hx.OFFSET}, Escala: {self.hx.SCALE}")
-            except Exception as e:
-                print(f"Error cargando calibracion: {e}")
-                print("Usando valores por defecto")
-                self.hx.set_offset(0)
-                self.hx.set_scale(1)
-        else:
-            print("No hay calibracion previa. Usar opcion de calibracion.")
+        self.aplicar_calibracion()
+        print(f"Calibracion cargada - Offset: {self.hx.OFFSET}, Escala: {self.hx.SCALE}")
+
+    def aplicar_calibracion(self):
+        # La balanza pesa en gramos: escala en cuentas por gramo
+        datos = self.cal.seccion('bascula')
+        self.hx.set_offset(datos['offset'])
+        self.hx.set_scale(datos['escala'] / 1000.0)
 
     def guardar_calibracion(self):
-        datos = {
-            'offset': self.hx.OFFSET,
-            'scale': self.hx.SCALE
-        }
-        with open(self.archivo_calibracion, 'w') as f:
-            json.dump(datos, f, indent=4)
+        self.cal.guardar('bascula', offset=self.hx.OFFSET, escala=self.hx.SCALE * 1000.0)
         print("Calibracion guardada")
 
     def calibrar(self):
@@ -182,6 +281,8 @@ class BalanzaPi5:
             print(f"Error en tara: {e}")
 
     def leer_peso(self, muestras=5):
+        # Por si se calibró desde otro programa
+        self.aplicar_calibracion()
         try:
             peso = self.hx.get_units(muestras)
             return max(0, peso)
@@ -267,6 +368,7 @@ class BalanzaPi5:
         except KeyboardInterrupt:
             print("\nPrograma terminado por el usuario")
         finally:
+            self.autocero.stop()
             self.hx.close()
             print("Recursos liberados")
 
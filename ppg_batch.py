@@ -0,0 +1,160 @@
+# -*-coding:utf-8-*-
+
+"""
+Offline HR/SpO2 re-analysis of recorded PPG traces.
+
+The trace is split in overlapping windows, chunks of windows are spread
+over a ProcessPoolExecutor and the per-window results are written as
+columns (.npz, or .csv).
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import os
+
+import numpy as np
+
+from acquisition import PROFILES, DEFAULT_PROFILE, get_profile
+from ppg_recording import PpgRecording, is_recording
+import hrcalc
+
+# windows analysed by one worker call
+CHUNK_WINDOWS = 2000
+
+COLUMNS = ['start', 'hr', 'hr_valid', 'spo2', 'spo2_valid']
+
+
+def load_raw_trace(path):
+    """
+    Read a trace printed by HeartRateMonitor(print_raw=True), "IR, Red" per line.
+    Lines that are not two integers (headers, messages) are skipped.
+    Returns (ir, red) as np.arrays.
+    """
+    ir = []
+    red = []
+    with open(path) as f:
+        for line in f:
+            parts = line.split(',')
+            if len(parts) != 2:
+                continue
+            try:
+                ir_value, red_value = int(parts[0]), int(parts[1])
+            except ValueError:
+                continue
+            ir.append(ir_value)
+            red.append(red_value)
+    return np.array(ir, dtype=np.int64), np.array(red, dtype=np.int64)
+
+
+def load_trace(path):
+    """
+    (ir, red, profile_name) of a binary recording (see ppg_recording) or of
+    a raw text trace; profile_name is None for raw traces, which do not record it.
+    """
+    if is_recording(path):
+        recording = PpgRecording(path)
+        return recording.ir, recording.red, recording.profile_name
+    ir, red = load_raw_trace(path)
+    return ir, red, None
+
+
+def analyze_chunk(ir, red, starts, params):
+    """
+    Results for the windows starting at `starts` (relative to ir/red),
+    all windows are fed through one StreamingEstimator.
+    """
+    window = params['buffer_size']
+    estimator = hrcalc.StreamingEstimator(**params)
+    results = np.zeros(len(starts), dtype=[('hr', np.int64), ('hr_valid', bool),
+                                           ('spo2', np.float64), ('spo2_valid', bool)])
+    ends = set((starts + window).tolist())
+    k = 0
+    for i, (red_value, ir_value) in enumerate(zip(red.tolist(), ir.tolist())):
+        estimator.push(red_value, ir_value)
+        if i + 1 in ends:
+            results[k] = estimator.estimate()
+            k += 1
+    return results
+
+
+def _analyze_chunk(args):
+    return analyze_chunk(*args)
+
+
+def analyze_trace(ir, red, step=1, profile=None, params=None, workers=None, chunk_windows=CHUNK_WINDOWS):
+    """
+    HR/SpO2 of every `window` samples of the trace, one window each `step` samples.
+    `params` overrides the hrcalc parameters of the profile.
+    Returns a dict of columns (see COLUMNS).
+    """
+    hrcalc_params = get_profile(profile).hrcalc_params()
+    if params:
+        hrcalc_params.update(params)
+    window = hrcalc_params['buffer_size']
+
+    ir = np.asarray(ir, dtype=np.int64)
+    red = np.asarray(red, dtype=np.int64)
+    starts = np.arange(0, max(0, len(ir) - window + 1), step)
+
+    # each chunk only carries the samples its windows need
+    jobs = []
+    for i in range(0, len(starts), chunk_windows):
+        chunk = starts[i:i + chunk_windows]
+        first, last = chunk[0], chunk[-1] + window
+        jobs.append((ir[first:last], red[first:last], chunk - first, hrcalc_params))
+
+    if workers == 1 or len(jobs) <= 1:
+        parts = [_analyze_chunk(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            parts = list(executor.map(_analyze_chunk, jobs))
+
+    columns = {'start': starts}
+    for name in COLUMNS[1:]:
+        columns[name] = np.concatenate([part[name] for part in parts]) if parts else np.zeros(0)
+    return columns
+
+
+def write_results(path, columns, sample_freq=hrcalc.SAMPLE_FREQ):
+    """
+    Write the result columns, as CSV when `path` ends in .csv, .npz otherwise.
+    """
+    columns = dict(columns)
+    columns['time'] = columns['start'] / float(sample_freq)
+    names = ['time'] + COLUMNS
+    if path.endswith('.csv'):
+        table = np.column_stack([columns[name].astype(np.float64) for name in names])
+        np.savetxt(path, table, delimiter=',', header=','.join(names), comments='',
+                   fmt=['%.3f', '%d', '%d', '%d', '%.4f', '%d'])
+    else:
+        np.savez(path, **columns)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-analyse recorded PPG traces with hrcalc")
+    parser.add_argument("trace", help="binary recording or raw trace (IR, Red lines)")
+    parser.add_argument("output", help="result file (.npz or .csv)")
+    parser.add_argument("-p", "--profile", choices=sorted(PROFILES),
+                        help="acquisition profile the trace was recorded with, default the one "
+                             "in the recording header ({0} for raw traces)".format(DEFAULT_PROFILE))
+    parser.add_argument("-s", "--step", type=int, default=1,
+                        help="samples between windows, default 1")
+    parser.add_argument("--window", type=int, help="override the window length")
+    parser.add_argument("--min_dist", type=int, help="override the minimum valley distance")
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count(),
+                        help="worker processes, default one per CPU")
+    args = parser.parse_args()
+
+    params = {}
+    if args.window:
+        params['buffer_size'] = args.window
+    if args.min_dist:
+        params['min_dist'] = args.min_dist
+
+    ir, red, recorded_profile = load_trace(args.trace)
+    if args.profile and recorded_profile and args.profile != recorded_profile:
+        parser.error("{0} was recorded with profile {1}, not {2}".format(args.trace, recorded_profile, args.profile))
+    profile = args.profile or recorded_profile or DEFAULT_PROFILE
+    columns = analyze_trace(ir, red, step=args.step, profile=profile, params=params, workers=args.workers)
+    write_results(args.output, columns, get_profile(profile).sample_freq)
+    print("{0} windows from {1} samples written to {2}".format(len(columns['start']), len(ir), args.output))
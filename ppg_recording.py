@@ -0,0 +1,176 @@
+# -*-coding:utf-8-*-
+
+"""
+Binary raw-PPG recordings.
+
+A recording is a fixed header (sensor configuration and sample rate)
+followed by RECORD entries: the time the sample was read from the FIFO
+and the raw red/ir counts as int32. Recordings are written by
+HeartRateMonitor(recorder=...) and replayed through ReplaySensor, which
+memory-maps the file and stands in for MAX30102.
+"""
+
+from time import monotonic, sleep, time
+import argparse
+import struct
+
+import numpy as np
+
+from acquisition import get_profile
+from max30102 import FifoBatch, FIFO_DEPTH
+
+MAGIC = b'PPG1'
+VERSION = 1
+# magic, version, header size, sample freq, FIFO_CONFIG, SPO2_CONFIG, LED current,
+# profile name, wall clock time when the recording started
+HEADER = struct.Struct('<4sHHfBBBx16sd')
+RECORD = np.dtype([('timestamp', '<f8'), ('red', '<i4'), ('ir', '<i4')])
+
+
+class PpgRecorder(object):
+    """
+    Append FifoBatches to a recording.
+    """
+
+    def __init__(self, path, profile=None):
+        self.profile = get_profile(profile)
+        self.path = path
+        self.samples = 0
+        self._file = open(path, 'wb')
+        self._file.write(HEADER.pack(MAGIC, VERSION, HEADER.size, self.profile.sample_freq,
+                                     self.profile.fifo_config(), self.profile.spo2_config(),
+                                     self.profile.led_current, self.profile.name.encode('ascii'), time()))
+
+    def write_batch(self, batch):
+        records = np.empty(len(batch.ir), dtype=RECORD)
+        records['timestamp'] = batch.timestamp
+        records['red'] = batch.red
+        records['ir'] = batch.ir
+        records.tofile(self._file)
+        self.samples += len(records)
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class PpgRecording(object):
+    """
+    Memory-mapped recording, `red`, `ir` and `timestamp` are array views of the file.
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            header = f.read(HEADER.size)
+        if len(header) < HEADER.size or header[:4] != MAGIC:
+            raise ValueError("{0} is not a PPG recording".format(path))
+        (_, self.version, header_size, self.sample_freq, self.fifo_config, self.spo2_config,
+         self.led_current, profile_name, self.start_time) = HEADER.unpack(header)
+        self.profile_name = profile_name.rstrip(b'\0').decode('ascii')
+        self.records = np.memmap(path, dtype=RECORD, mode='r', offset=header_size)
+        self.red = self.records['red']
+        self.ir = self.records['ir']
+        self.timestamp = self.records['timestamp']
+
+    def __len__(self):
+        return len(self.records)
+
+
+def is_recording(path):
+    with open(path, 'rb') as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+class ReplaySensor(object):
+    """
+    Feeds a recording to HeartRateMonitor in place of MAX30102.
+    speed=1 replays at the recorded pace, speed=4 four times faster,
+    speed=None as fast as the monitor reads (a FIFO worth per read).
+    """
+
+    def __init__(self, path, speed=1.0):
+        self.recording = PpgRecording(path)
+        self.speed = speed
+        self.position = 0
+        self._start = None
+
+    @property
+    def finished(self):
+        return self.position >= len(self.recording)
+
+    def read_fifo_batch(self, n=None, clear_interrupts=False):
+        recording = self.recording
+        now = monotonic()
+        if self.speed is None:
+            end = self.position + FIFO_DEPTH
+        else:
+            if self._start is None:
+                self._start = now
+            # every sample read before this point of the recording is available
+            end = 0
+            if len(recording):
+                replayed = recording.timestamp[0] + (now - self._start) * self.speed
+                end = int(np.searchsorted(recording.timestamp, replayed, 'right'))
+        if n is not None:
+            end = min(end, self.position + n)
+        end = max(self.position, min(end, len(recording)))
+
+        red = np.array(recording.red[self.position:end], dtype=np.int64)
+        ir = np.array(recording.ir[self.position:end], dtype=np.int64)
+        self.position = end
+        return FifoBatch(red, ir, 0, now)
+
+    def read_fifo_burst(self, n=None, clear_interrupts=False):
+        batch = self.read_fifo_batch(n, clear_interrupts)
+        return batch.red, batch.ir
+
+    def enable_interrupt_pin(self, gpio, chip=0):
+        raise RuntimeError("replayed recordings have no INT pin")
+
+    def shutdown(self):
+        pass
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Record or replay raw MAX30102 data")
+    sub = parser.add_subparsers(dest="command")
+    record = sub.add_parser("record", help="record the sensor to a file")
+    record.add_argument("path")
+    record.add_argument("-t", "--time", type=int, default=30,
+                        help="duration in seconds, default 30")
+    record.add_argument("-p", "--profile", default=None, help="acquisition profile")
+    replay = sub.add_parser("replay", help="run HeartRateMonitor on a recording")
+    replay.add_argument("path")
+    replay.add_argument("-s", "--speed", type=float, default=1.0,
+                        help="replay speed, 0 for as fast as possible, default 1")
+    args = parser.parse_args()
+
+    from heartrate_monitor import HeartRateMonitor
+
+    if args.command == "record":
+        with PpgRecorder(args.path, args.profile) as recorder:
+            hrm = HeartRateMonitor(print_result=True, profile=args.profile, recorder=recorder)
+            hrm.start_sensor()
+            try:
+                sleep(args.time)
+            except KeyboardInterrupt:
+                print('keyboard interrupt detected, exiting...')
+            hrm.stop_sensor()
+        print("{0} samples written to {1}".format(recorder.samples, args.path))
+    elif args.command == "replay":
+        source = ReplaySensor(args.path, speed=args.speed or None)
+        hrm = HeartRateMonitor(print_result=True, profile=source.recording.profile_name, sensor=source)
+        hrm.start_sensor()
+        try:
+            while not source.finished:
+                sleep(0.1)
+        except KeyboardInterrupt:
+            print('keyboard interrupt detected, exiting...')
+        hrm.stop_sensor()
+    else:
+        parser.print_help()
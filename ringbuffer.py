@@ -0,0 +1,57 @@
+# -*-coding:utf-8-*-
+
+import numpy as np
+
+
+class RingBuffer(object):
+    """
+    Fixed-capacity sample buffer backed by a preallocated np.array.
+    Every value is stored twice (at slot and slot + capacity), so the
+    last N values are always one contiguous slice and can be handed to
+    hrcalc without copying.
+    """
+
+    def __init__(self, capacity, dtype=np.int64):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self._data = np.zeros(2 * capacity, dtype=dtype)
+        self.count = 0
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    @property
+    def full(self):
+        return self.count >= self.capacity
+
+    def clear(self):
+        self.count = 0
+
+    def append(self, value):
+        """
+        Store one value, returns the value it pushed out (None while not full).
+        """
+        slot = self.count % self.capacity
+        dropped = self._data[slot].item() if self.count >= self.capacity else None
+        self._data[slot] = self._data[slot + self.capacity] = value
+        self.count += 1
+        return dropped
+
+    def extend(self, values):
+        for value in values:
+            self.append(value)
+
+    def view(self, n=None):
+        """
+        The last n values (all of them by default), oldest first.
+        This is a view: it changes when new values are appended.
+        """
+        size = len(self)
+        if n is None or n > size:
+            n = size
+        end = self.count % self.capacity + self.capacity
+        return self._data[end - n:end]
+
+    def mean(self):
+        return np.mean(self.view())
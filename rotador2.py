@@ -1,8 +1,22 @@
 #!/usr/bin/env python3
-import lgpio
+from hal import lgpio
+import threading
 import time
 import sys
 
+# cm de cinta por cada cambio de CLK
+CM_POR_PASO = 0.51
+
+# avance por transición de estado (clk << 1 | dt), índice estado_anterior << 2 | estado_nuevo;
+# en sentido horario la secuencia es 11 -> 01 -> 00 -> 10. Las transiciones
+# con los dos pines cambiados (no se sabe el sentido) y sin cambio valen 0
+TABLA_CUADRATURA = (
+     0, -1, +1,  0,
+    +1,  0,  0, -1,
+    -1,  0,  0, +1,
+     0, +1, -1,  0,
+)
+
 class KY040:
     def __init__(self, clk_pin, dt_pin, sw_pin=None):
         self.clk_pin = clk_pin
@@ -64,12 +78,115 @@ class KY040:
     
     def get_counter(self):
         """Retorna el valor actual del contador"""
-        return self.counter * 0.51
+        return self.counter * CM_POR_PASO
     
     def cleanup(self):
         """Limpia los recursos de lgpio"""
         lgpio.gpiochip_close(self.h)
 
+class DecodificadorKY040:
+    """
+    KY040 por alertas de lgpio: cada flanco de CLK o DT pasa por la tabla de
+    cuadratura completa (4 estados por ciclo), así no se pierden pasos con
+    tirones rápidos de la cinta y no hay bucle de sondeo. El estado sale solo
+    de los niveles que traen las alertas, en el orden del kernel, no de leer
+    el otro pin cuando llega el callback. El rebote lo filtra el kernel
+    (gpio_set_debounce_micros); un pin que repite su nivel es un flanco
+    perdido, no suma pasos y se cuenta en `errores`.
+    `asentado` se activa cuando, después de moverse, la cinta pasa `quieto`
+    segundos sin flancos.
+    """
+
+    def __init__(self, clk_pin, dt_pin, sw_pin=None, quieto=1.0, rebote_us=500):
+        self.clk_pin = clk_pin
+        self.dt_pin = dt_pin
+        self.sw_pin = sw_pin
+        self.quieto = quieto
+        self.pasos = 0
+        self.errores = 0
+        self.asentado = threading.Event()
+        self.boton = threading.Event()
+        self._movido = False
+        self._ultimo_flanco = 0.0
+        self._cerrado = False
+        self._cond = threading.Condition()
+        self._callbacks = []
+        
+        self.h = lgpio.gpiochip_open(0)
+        for pin in (clk_pin, dt_pin):
+            lgpio.gpio_set_debounce_micros(self.h, pin, rebote_us)
+            lgpio.gpio_claim_alert(self.h, pin, lgpio.BOTH_EDGES)
+        # nivel de cada pin según la última alerta
+        self._niveles = {pin: lgpio.gpio_read(self.h, pin) for pin in (clk_pin, dt_pin)}
+        for pin in (clk_pin, dt_pin):
+            self._callbacks.append(lgpio.callback(self.h, pin, lgpio.BOTH_EDGES, self._flanco))
+        if sw_pin is not None:
+            lgpio.gpio_claim_alert(self.h, sw_pin, lgpio.FALLING_EDGE)
+            self._callbacks.append(lgpio.callback(self.h, sw_pin, lgpio.FALLING_EDGE, self._pulsado))
+        
+        self._hilo = threading.Thread(target=self._vigilar_quietud, daemon=True)
+        self._hilo.start()
+    
+    def _flanco(self, chip, gpio, nivel, timestamp):
+        if nivel > 1:  # watchdog, no es un flanco
+            return
+        with self._cond:
+            if self._niveles[gpio] == nivel:
+                # se perdió el flanco de ida entre estos dos, no se sabe el sentido
+                self.errores += 1
+            else:
+                anterior = self._estado()
+                self._niveles[gpio] = nivel
+                self.pasos += TABLA_CUADRATURA[anterior << 2 | self._estado()]
+            self._movido = True
+            self._ultimo_flanco = time.monotonic()
+            self.asentado.clear()
+            self._cond.notify_all()
+    
+    def _estado(self):
+        return self._niveles[self.clk_pin] << 1 | self._niveles[self.dt_pin]
+    
+    def _pulsado(self, chip, gpio, nivel, timestamp):
+        if nivel == 0:
+            self.boton.set()
+    
+    def _vigilar_quietud(self):
+        with self._cond:
+            while not self._cerrado:
+                if not self._movido or self.asentado.is_set():
+                    self._cond.wait()
+                    continue
+                restante = self.quieto - (time.monotonic() - self._ultimo_flanco)
+                if restante <= 0:
+                    self.asentado.set()
+                else:
+                    self._cond.wait(restante)
+    
+    @property
+    def position(self):
+        """Pasos de cuadratura desde el inicio (4 por ciclo)"""
+        with self._cond:
+            return self.pasos
+    
+    def reset(self):
+        with self._cond:
+            self.pasos = 0
+            self._movido = False
+            self.asentado.clear()
+    
+    def get_counter(self):
+        """Centímetros de cinta (cada cambio de CLK son 2 pasos de cuadratura)"""
+        return self.position * CM_POR_PASO / 2
+    
+    def cleanup(self):
+        for cb in self._callbacks:
+            cb.cancel()
+        with self._cond:
+            self._cerrado = True
+            self._cond.notify_all()
+        self._hilo.join(timeout=1)
+        lgpio.gpiochip_close(self.h)
+
 # Ejemplo de uso básico
 def main():
     # Configurar pines (ajusta según tu conexión)
@@ -77,30 +194,32 @@ def main():
     DT_PIN = 21       
     SW_PIN = 26    # Pin SW del KY040 (opcional)
     
-    encoder = KY040(CLK_PIN, DT_PIN, SW_PIN)
+    encoder = DecodificadorKY040(CLK_PIN, DT_PIN, SW_PIN)
     
     print("Controlador KY040 iniciado")
     print("Gira el encoder o presiona el botón")
-    print("Ejecución automática por 30 segundos...\n")
+    print("La medición termina cuando la cinta se detiene (máximo 30 segundos)...\n")
 
     inicio = time.time()
     duracion = 30  # segundos
 
     try:
+        ultimo = None
         while time.time() - inicio < duracion:
-            # Leer rotación
-            direction = encoder.read_rotation()
-            if direction:
-                print(f"Rotación: {direction} - Contador: {encoder.get_counter():.2f}")
+            if encoder.asentado.wait(0.1):
+                print(f"\nCinta detenida ({time.time() - inicio:.1f} s). Finalizando...")
+                break
             
-            # Leer botón
-            if encoder.read_button():
-                print("Botón presionado!")
-                # encoder.counter = 0  # opcional
+            valor = encoder.get_counter()
+            if valor != ultimo:
+                print(f"Contador: {valor:.2f}")
+                ultimo = valor
             
-            time.sleep(0.01)
-        
-        print("\nTiempo máximo alcanzado (30 s). Finalizando...")
+            if encoder.boton.is_set():
+                encoder.boton.clear()
+                print("Botón presionado!")
+        else:
+            print("\nTiempo máximo alcanzado (30 s). Finalizando...")
         return encoder.get_counter()
 
     finally:
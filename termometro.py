@@ -0,0 +1,168 @@
+"""
+Servicio del termómetro MLX90614.
+
+El bus I2C y el sensor se abren una sola vez por proceso. Un hilo lee al
+ritmo en que el sensor actualiza su RAM y guarda las temperaturas en un
+RingBuffer; promediar o seguir la señal no vuelve a abrir el bus, no repite
+lecturas de un mismo dato ni imprime por cada muestra.
+"""
+
+import time
+from collections import namedtuple
+
+import numpy as np
+
+import calibracion
+import estadistica_robusta
+from hal import abrir_mlx90614
+from muestreador import Muestreador
+from ringbuffer import RingBuffer
+
+# con los filtros de fábrica la temperatura en la RAM no cambia más seguido
+PERIODO_SENSOR = 0.1
+
+
+class ErrorTermometro(Exception):
+    pass
+
+
+# temperatura ya compensada; objeto y ambiente son los promedios medidos
+MedicionTemperatura = namedtuple('MedicionTemperatura', 'temperatura objeto ambiente convergio duracion')
+
+
+class TermometroMLX90614(Muestreador):
+    """
+    MLX90614 abierto una vez. leer() es una lectura directa; start() lanza
+    el hilo que llena `objeto` y `ambiente` (RingBuffer de °C) y del que
+    leen promedio(), lecturas(), latest() y mean_over(), que son del objeto.
+    """
+
+    # NACK o bus ocupado: se pierde esa muestra nada más
+    errores_lectura = (OSError,)
+    error_timeout = ErrorTermometro
+    mensaje_timeout = "Timeout esperando el MLX90614"
+
+    def __init__(self, periodo=PERIODO_SENSOR, capacidad=600, sensor=None):
+        super(TermometroMLX90614, self).__init__(self._leer_ambos, capacidad, periodo=periodo, dtype=float)
+        self.sensor = sensor if sensor is not None else abrir_mlx90614()
+        self.cal = calibracion.calibracion()
+        self.objeto = self.muestras
+        self.ambiente = RingBuffer(capacidad, dtype=float)
+
+    def leer(self):
+        """
+        Temperatura del objeto en °C con la corrección de calibracion.json.
+        """
+        return self.sensor.object_temperature + self.cal.obtener('termometro', 'offset')
+
+    def leer_ambiente(self):
+        return self.sensor.ambient_temperature
+
+    def _leer_ambos(self):
+        if hasattr(self.sensor, 'leer'):
+            # lector de registros de mlx90614: TA y TOBJ1 de una vez
+            ambiente, objeto = self.sensor.leer()[:2]
+            return float(objeto) + self.cal.obtener('termometro', 'offset'), float(ambiente)
+        return self.leer(), self.leer_ambiente()
+
+    def _guardar(self, valor):
+        objeto, ambiente = valor
+        self.objeto.append(objeto)
+        self.ambiente.append(ambiente)
+        self._ultima = objeto
+
+    def clear(self):
+        with self._cond:
+            super(TermometroMLX90614, self).clear()
+            self.ambiente.clear()
+
+    def next_sample(self, timeout=1.0):
+        return super(TermometroMLX90614, self).next_sample(timeout)
+
+    def lecturas(self, timeout=1.0):
+        """
+        Generador con cada temperatura nueva del objeto, al ritmo del sensor.
+        """
+        self.start()
+        while True:
+            yield self.next_sample(timeout)
+
+    def promedio(self, n=20, recorte=0.1, timeout=None):
+        """
+        Media recortada de las próximas n temperaturas del objeto (arranca el
+        hilo si hace falta).
+        """
+        self.start()
+        n = min(n, self.objeto.capacity)
+        with self._cond:
+            inicio = self.objeto.count
+            if not self._esperar(lambda: self.objeto.count - inicio >= n, timeout):
+                raise ErrorTermometro("Timeout esperando el MLX90614")
+            return estadistica_robusta.media_recortada(self.objeto.view(n), recorte)
+
+    def compensar(self, objeto, ambiente):
+        """
+        Temperatura corporal con el modelo de calibracion.json:
+        objeto + coef_ambiente * (objeto - ambiente). `objeto` ya trae el offset.
+        """
+        coef = self.cal.obtener('termometro', 'coef_ambiente')
+        return objeto + coef * (objeto - ambiente)
+
+    def medir_corporal(self, salto=3.0, ventana=6, tolerancia=0.1, timeout=6.0):
+        """
+        Espera una frente (el objeto queda `salto` °C por encima del ambiente
+        y de lo que se veía antes), descarta la subida y termina cuando las
+        últimas `ventana` lecturas ya no se mueven más que `tolerancia` °C.
+        Si en `timeout` segundos no converge devuelve lo último con
+        convergio=False; sin frente lanza ErrorTermometro.
+        """
+        self.start()
+        inicio = time.monotonic()
+        fondo = None
+        frente = []
+        ambientes = []
+        convergio = False
+        while not convergio:
+            restante = timeout - (time.monotonic() - inicio)
+            if restante <= 0:
+                break
+            try:
+                objeto = self.next_sample(restante)
+            except ErrorTermometro:
+                break
+            with self._cond:
+                ambiente = float(self.ambiente.view(1)[0])
+            if not frente:
+                fondo = objeto if fondo is None else min(fondo, objeto)
+                if objeto - min(fondo, ambiente) < salto:
+                    continue
+            frente.append(objeto)
+            ambientes.append(ambiente)
+            if len(frente) >= ventana:
+                ultimas = np.array(frente[-ventana:])
+                mitad = ventana // 2
+                # la subida es exponencial: sin deriva entre mitades ya terminó
+                deriva = ultimas[mitad:].mean() - ultimas[:mitad].mean()
+                convergio = bool(abs(deriva) <= tolerancia / 2 and ultimas.std() <= tolerancia)
+        if not frente:
+            raise ErrorTermometro("No se detectó una frente frente al sensor")
+        objeto = float(np.mean(frente[-ventana:]))
+        ambiente = float(np.mean(ambientes[-ventana:]))
+        return MedicionTemperatura(self.compensar(objeto, ambiente), objeto, ambiente,
+                                   convergio, time.monotonic() - inicio)
+
+    def close(self):
+        self.stop()
+
+
+_termometro = None
+
+
+def termometro():
+    """
+    El TermometroMLX90614 compartido del proceso.
+    """
+    global _termometro
+    if _termometro is None:
+        _termometro = TermometroMLX90614()
+    return _termometro
@@ -0,0 +1,8 @@
+import os
+import sys
+
+# the modules live at the top of the repository, not in a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# drivers that open a bus or a pin get the simulated devices of hal_sim
+os.environ.setdefault('KIOSCO_HAL', 'sim')
@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+import calibracion
+from autocero import AutoCero
+from ringbuffer import RingBuffer
+
+OFFSET = 100000.0
+ESCALA = 20000.0
+
+
+class Muestreo(object):
+    """
+    Lo que AutoCero usa de un MuestreadorHX711, lleno a mano.
+    """
+
+    def __init__(self):
+        self.muestras = RingBuffer(800, dtype=float)
+
+    def recent(self, n=None):
+        return self.muestras.view(n).copy()
+
+    def agregar(self, kg, n=80):
+        self.muestras.extend(np.full(n, OFFSET + kg * ESCALA))
+
+
+@pytest.fixture
+def cal(tmp_path):
+    cal = calibracion.Calibracion(str(tmp_path / 'calibracion.json'))
+    cal.ajustar('bascula', offset=OFFSET, escala=ESCALA)
+    return cal
+
+
+def test_sigue_el_cero_con_la_plataforma_vacia(cal):
+    muestreo = Muestreo()
+    autocero = AutoCero(muestreo, cal, alfa=0.5, paso_max=1.0)
+    muestreo.agregar(0.01)
+    assert autocero.actualizar()
+    assert cal.obtener('bascula', 'offset') == pytest.approx(OFFSET + 0.005 * ESCALA)
+
+
+def test_no_sigue_con_peso(cal):
+    muestreo = Muestreo()
+    autocero = AutoCero(muestreo, cal)
+    muestreo.agregar(70.0)
+    assert not autocero.actualizar()
+    assert cal.obtener('bascula', 'offset') == OFFSET
+
+
+def test_la_correccion_por_ventana_esta_limitada(cal):
+    muestreo = Muestreo()
+    autocero = AutoCero(muestreo, cal)
+    # un objeto de 150 g, dentro de la banda
+    for _ in range(10):
+        muestreo.agregar(0.15)
+        autocero.actualizar()
+    corrido = (cal.obtener('bascula', 'offset') - OFFSET) / ESCALA
+    assert corrido == pytest.approx(10 * autocero.paso_max)
+    assert corrido < 0.15 / 2
+
+
+def test_espera_una_ventana_nueva(cal):
+    muestreo = Muestreo()
+    autocero = AutoCero(muestreo, cal, alfa=1.0, paso_max=1.0)
+    muestreo.agregar(0.01, n=79)
+    assert not autocero.actualizar()
+    assert cal.obtener('bascula', 'offset') == OFFSET
+
+
+def test_sigue_despues_de_vaciar_el_muestreo(cal):
+    muestreo = Muestreo()
+    autocero = AutoCero(muestreo, cal)
+    muestreo.agregar(70.0, n=400)
+    assert not autocero.actualizar()
+    # clear() vuelve la cuenta a cero, como al subir el paciente
+    muestreo.muestras.clear()
+    muestreo.agregar(0.0)
+    assert autocero.actualizar()
@@ -0,0 +1,109 @@
+import fcntl
+import threading
+import time
+
+import pytest
+
+import bus_i2c
+
+
+class SMBus(object):
+    """
+    smbus de prueba: anota los registros leídos en orden.
+    """
+
+    def __init__(self):
+        self.leidos = []
+
+    def read_byte_data(self, direccion, reg):
+        self.leidos.append(reg)
+        return reg
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def bus(tmp_path):
+    bus = bus_i2c.BusI2C(archivo_bloqueo=str(tmp_path / 'i2c-{0}.lock'), espera_max=0.5)
+    bus.smbus = SMBus()
+    yield bus
+    bus.close()
+
+
+def en_hilo(funcion, *argumentos):
+    hilo = threading.Thread(target=funcion, args=argumentos, daemon=True)
+    hilo.start()
+    return hilo
+
+
+def esperar_cola(bus, n):
+    limite = time.monotonic() + 1
+    while len(bus._cola) < n:
+        assert time.monotonic() < limite
+        time.sleep(0.001)
+
+
+def test_atiende_por_prioridad(bus):
+    ppg = bus.cliente('ppg', bus_i2c.PRIORIDAD_PPG)
+    termometro = bus.cliente('termometro', bus_i2c.PRIORIDAD_TERMOMETRO)
+    otro = bus.cliente('otro', 5)
+    with ppg.operacion():
+        # mientras este hilo tiene el bus los demás quedan en la cola
+        hilos = [en_hilo(termometro.read_byte_data, 0x5A, 1),
+                 en_hilo(otro.read_byte_data, 0x10, 2)]
+        esperar_cola(bus, 2)
+        hilos.append(en_hilo(ppg.read_byte_data, 0x57, 3))
+        esperar_cola(bus, 3)
+        assert bus.smbus.leidos == []
+    for hilo in hilos:
+        hilo.join(1)
+    assert bus.smbus.leidos == [3, 2, 1]
+    assert bus.latencias()['termometro']['transacciones'] == 1
+
+
+def test_operacion_es_exclusiva_y_se_anida(bus):
+    ppg = bus.cliente('ppg', bus_i2c.PRIORIDAD_PPG)
+    termometro = bus.cliente('termometro', bus_i2c.PRIORIDAD_TERMOMETRO)
+    with termometro.operacion():
+        hilo = en_hilo(ppg.read_byte_data, 0x57, 9)
+        esperar_cola(bus, 1)
+        with termometro.operacion():
+            assert termometro.read_byte_data(0x5A, 1) == 1
+        # sigue reservado hasta salir de la operación de afuera
+        assert termometro.read_byte_data(0x5A, 2) == 2
+        assert bus.smbus.leidos == [1, 2]
+    hilo.join(1)
+    assert bus.smbus.leidos == [1, 2, 9]
+
+
+def test_transaccion_que_no_se_atiende_se_cancela(bus):
+    ppg = bus.cliente('ppg', bus_i2c.PRIORIDAD_PPG)
+    termometro = bus.cliente('termometro', bus_i2c.PRIORIDAD_TERMOMETRO)
+    errores = []
+
+    def leer():
+        try:
+            termometro.read_byte_data(0x5A, 7)
+        except OSError as e:
+            errores.append(e)
+
+    with ppg.operacion():
+        hilo = en_hilo(leer)
+        hilo.join(2)
+    assert len(errores) == 1
+    assert ppg.read_byte_data(0x57, 1) == 1
+    assert bus.smbus.leidos == [1]
+
+
+def test_timeout_con_el_bus_reservado_por_otro_proceso(bus, tmp_path):
+    ppg = bus.cliente('ppg', bus_i2c.PRIORIDAD_PPG)
+    with open(str(tmp_path / 'i2c-1.lock'), 'a') as otro_proceso:
+        fcntl.flock(otro_proceso, fcntl.LOCK_EX)
+        with pytest.raises(OSError):
+            with ppg.operacion():
+                pass
+        fcntl.flock(otro_proceso, fcntl.LOCK_UN)
+    # la reserva cancelada suelta el bloqueo y el bus vuelve a atender
+    with ppg.operacion():
+        assert ppg.read_byte_data(0x57, 4) == 4
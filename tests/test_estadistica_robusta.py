@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+import estadistica_robusta as er
+
+
+@pytest.fixture
+def lecturas():
+    rng = np.random.default_rng(7)
+    x = rng.normal(150.0, 2.0, 301)
+    x[::25] += 60.0
+    return x
+
+
+def test_percentiles_como_numpy(lecturas):
+    qs = [0, 10, 25, 50, 75, 90, 100]
+    assert er.percentiles(lecturas, qs) == pytest.approx(np.percentile(lecturas, qs))
+    with pytest.raises(ValueError):
+        er.percentiles([], [50])
+
+
+@pytest.mark.parametrize('n', [1, 2, 5, 6, 51])
+def test_mediana_y_mad_ordenadas(n):
+    rng = np.random.default_rng(n)
+    x = np.sort(rng.integers(0, 20, n).astype(float))
+    assert er.mediana_ordenada(x) == np.median(x)
+    assert er.mad_ordenada(x) == pytest.approx(np.median(np.abs(x - np.median(x))))
+    # respecto de otro centro, y sobre una lista como la de los filtros
+    assert er.mad_ordenada(list(x), 3.5) == pytest.approx(np.median(np.abs(x - 3.5)))
+
+
+def test_mediana_y_mad(lecturas):
+    assert er.mediana(lecturas) == pytest.approx(np.median(lecturas))
+    centro = np.median(lecturas)
+    assert er.mad(lecturas) == pytest.approx(np.median(np.abs(lecturas - centro)))
+
+
+def test_rechazo_mad(lecturas):
+    conservados = er.rechazo_mad(lecturas, k=3.0)
+    assert conservados.max() < 170.0
+    assert conservados.size >= lecturas.size - 13
+
+
+def test_media_recortada():
+    x = [1.0, 2.0, 3.0, 4.0, 100.0]
+    assert er.media_recortada(x, 0.2) == pytest.approx(3.0)
+    assert er.media_recortada(x, 0.0) == pytest.approx(22.0)
+    assert er.media_recortada_ordenada(sorted(x), 0.2) == pytest.approx(3.0)
+    with pytest.raises(ValueError):
+        er.media_recortada([1.0, 2.0], 0.5)
+
+
+def test_estimar_igual_a_los_pasos_por_separado(lecturas):
+    estimacion, conservados = er.estimar(lecturas, k=2.5, recorte=0.25)
+    esperados = er.rechazo_mad(lecturas, k=2.5)
+    assert sorted(conservados) == sorted(esperados)
+    assert estimacion == pytest.approx(er.media_recortada(esperados, 0.25))
+    assert abs(estimacion - 150.0) < 0.5
+
+
+def test_estimar_con_pocos_conservados_usa_todos():
+    x = [10.0, 10.0, 10.0, 50.0, 90.0]
+    estimacion, conservados = er.estimar(x, k=1.0, recorte=0.0, minimo=5)
+    assert conservados.tolist() == sorted(x)
+    assert estimacion == pytest.approx(34.0)
@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+
+import hrcalc
+from heartrate_monitor import HeartRateMonitor
+from max30102 import FifoBatch
+
+
+def batch(n, lost=0, timestamp=0.0):
+    return FifoBatch(np.zeros(n, dtype=np.int64), np.zeros(n, dtype=np.int64), lost, timestamp)
+
+
+def test_count_batch():
+    monitor = HeartRateMonitor()
+    assert monitor.count_batch(batch(10, timestamp=1.0)) == 0
+    assert monitor.count_batch(batch(0, lost=4, timestamp=1.2)) == 0
+    assert monitor.count_batch(batch(20, lost=3, timestamp=2.0)) == 3
+    assert monitor.samples_received == 30
+    assert monitor.samples_dropped == 3
+    assert monitor.effective_sample_rate() == pytest.approx(20.0)
+
+
+def test_window_has_gap_until_a_full_window_after_the_loss():
+    monitor = HeartRateMonitor()
+    monitor.count_batch(batch(hrcalc.BUFFER_SIZE))
+    assert not monitor.window_has_gap()
+    monitor.count_batch(batch(10, lost=5))
+    assert monitor.window_has_gap()
+    # the window is clean once it starts at the first sample after the loss
+    monitor.count_batch(batch(hrcalc.BUFFER_SIZE - 11))
+    assert monitor.window_has_gap()
+    monitor.count_batch(batch(1))
+    assert not monitor.window_has_gap()
@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+import hrcalc
+
+
+def ppg(n=hrcalc.BUFFER_SIZE, bpm=72.0, seed=0, fs=hrcalc.SAMPLE_FREQ):
+    """
+    Synthetic (ir, red) finger trace with a pulse at `bpm` and sensor noise.
+    """
+    rng = np.random.default_rng(seed)
+    t = np.arange(n) / float(fs)
+    phase = 2 * np.pi * bpm / 60.0 * t
+    pulse = np.sin(phase) + 0.4 * np.sin(2 * phase)
+    ir = 110000 + 900 * pulse + rng.normal(0, 40, n)
+    red = 95000 + 600 * pulse + rng.normal(0, 30, n)
+    return ir.astype(np.int64), red.astype(np.int64)
+
+
+@pytest.mark.parametrize('seed', range(20))
+@pytest.mark.parametrize('bpm', [45.0, 72.0, 130.0])
+def test_engines_agree(seed, bpm):
+    ir, red = ppg(bpm=bpm, seed=seed)
+    assert (hrcalc.calc_hr_and_spo2(ir, red, engine='numpy') ==
+            hrcalc.calc_hr_and_spo2(ir, red, engine='python'))
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_engines_agree_without_pulse(seed):
+    rng = np.random.default_rng(seed)
+    ir = rng.integers(0, 3000, hrcalc.BUFFER_SIZE)
+    red = rng.integers(0, 3000, hrcalc.BUFFER_SIZE)
+    assert (hrcalc.calc_hr_and_spo2(ir, red, engine='numpy') ==
+            hrcalc.calc_hr_and_spo2(ir, red, engine='python'))
+
+
+def test_heart_rate_of_clean_pulse():
+    ir, red = ppg(bpm=72.0)
+    hr, hr_valid, spo2, spo2_valid = hrcalc.calc_hr_and_spo2(ir, red)
+    assert hr_valid
+    assert abs(hr - 72) <= 6
+
+
+def test_unknown_engine():
+    ir, red = ppg()
+    with pytest.raises(ValueError):
+        hrcalc.calc_hr_and_spo2(ir, red, engine='fortran')
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_streaming_matches_batch(seed):
+    ir, red = ppg(n=400, bpm=60.0 + 10 * seed, seed=seed)
+    estimator = hrcalc.StreamingEstimator()
+    size = hrcalc.BUFFER_SIZE
+    for i, (red_value, ir_value) in enumerate(zip(red, ir)):
+        estimator.push(red_value, ir_value)
+        if i + 1 < size:
+            assert estimator.estimate() is None
+        else:
+            window = slice(i + 1 - size, i + 1)
+            assert estimator.estimate() == hrcalc.calc_hr_and_spo2(ir[window], red[window])
+
+
+def test_streaming_reset():
+    ir, red = ppg(n=150)
+    estimator = hrcalc.StreamingEstimator()
+    for red_value, ir_value in zip(red, ir):
+        estimator.push(red_value, ir_value)
+    estimator.reset()
+    assert estimator.count == 0
+    assert estimator.estimate() is None
@@ -0,0 +1,133 @@
+import time
+
+import pytest
+
+import hx711
+from peso_bascula import HX711_LGPIO
+
+
+@pytest.mark.parametrize('cuenta, esperado', [
+    (0x000000, 0),
+    (0x000001, 1),
+    (0x7FFFFF, 0x7FFFFF),
+    (0x800000, -0x800000),
+    (0xFFFFFF, -1),
+])
+def test_a_con_signo(cuenta, esperado):
+    assert hx711.a_con_signo(cuenta) == esperado
+
+
+def test_trama_spi():
+    # cada pulso es un 1 seguido de un 0, completado a bytes enteros
+    assert hx711._trama(4) == b'\xaa'
+    assert hx711._trama(25) == b'\xaa' * 6 + b'\x80'
+    assert hx711._trama(27) == b'\xaa' * 6 + b'\xa8'
+
+
+def test_pulsos_ganancia():
+    assert hx711.pulsos_ganancia(128) == 1
+    assert hx711.pulsos_ganancia(32) == 2
+    assert hx711.pulsos_ganancia(64) == 3
+    with pytest.raises(ValueError):
+        hx711.pulsos_ganancia(1)
+
+
+@pytest.mark.parametrize('ganancia, pulsos', [(128, 1), (64, 3), (32, 2)])
+def test_hx711_lgpio_da_los_pulsos_de_su_ganancia(monkeypatch, ganancia, pulsos):
+    pedidos = []
+    monkeypatch.setattr(hx711, 'leer_cuenta', lambda h, dout, pd_sck, extra: pedidos.append(extra) or 0)
+    hx = HX711_LGPIO(5, 6, gain=ganancia)
+    try:
+        hx.read()
+    finally:
+        hx.close()
+    assert pedidos[-1] == pulsos
+
+
+def fuente(valores):
+    """
+    Función de lectura que devuelve `valores` en orden (o los lanza si son
+    excepciones) y después bloquea un poco como el chip entre conversiones.
+    """
+    pendientes = list(valores)
+
+    def leer():
+        if not pendientes:
+            time.sleep(0.01)
+            raise hx711.ErrorHX711("sin conversión")
+        valor = pendientes.pop(0)
+        if isinstance(valor, Exception):
+            raise valor
+        return valor
+    return leer
+
+
+def test_muestreador_guarda_las_cuentas():
+    muestreo = hx711.MuestreadorHX711(fuente([10, 20, hx711.ErrorHX711("cortada"), 30, 40]), capacidad=8)
+    muestreo.start()
+    try:
+        assert muestreo.wait_for_samples(4, timeout=2)
+        assert muestreo.recent().tolist() == [10, 20, 30, 40]
+        assert muestreo.latest() == 40
+        assert muestreo.mean_over(2) == 35.0
+        assert muestreo.errores >= 1
+    finally:
+        muestreo.stop()
+
+
+def test_muestreador_sin_muestras_da_timeout():
+    muestreo = hx711.MuestreadorHX711(fuente([]))
+    muestreo.start()
+    try:
+        with pytest.raises(hx711.ErrorHX711):
+            muestreo.next_sample(timeout=0.05)
+        assert not muestreo.wait_for_samples(1, timeout=0.05)
+    finally:
+        muestreo.stop()
+
+
+def test_muestreador_relanza_errores_inesperados():
+    muestreo = hx711.MuestreadorHX711(fuente([10, ZeroDivisionError("del filtro")]))
+    muestreo.start()
+    try:
+        with pytest.raises(ZeroDivisionError):
+            muestreo.wait_for_samples(5, timeout=2)
+        with pytest.raises(ZeroDivisionError):
+            muestreo.next_sample(timeout=2)
+        assert not muestreo.activo
+    finally:
+        muestreo.stop()
+
+
+def lecturas_gpio(monkeypatch, valores):
+    pendientes = list(valores)
+    monkeypatch.setattr(hx711, 'esperar_listo', lambda h, dout, timeout: True)
+    monkeypatch.setattr(hx711, 'leer_gpio', lambda h, dout, pd_sck, extra: pendientes.pop(0))
+
+
+def test_leer_cuenta_descarta_las_cortadas(monkeypatch):
+    lecturas_gpio(monkeypatch, [None, 111, 222])
+    assert hx711.leer_cuenta(0, 5, 6, pulsos_extra=1) == 111
+
+
+def test_leer_cuenta_reprograma_la_ganancia_tras_un_apagado(monkeypatch):
+    # la conversión después de un apagado es de A/128, no de la ganancia pedida
+    lecturas_gpio(monkeypatch, [None, 111, 222])
+    assert hx711.leer_cuenta(0, 5, 6, pulsos_extra=3) == 222
+
+
+def test_leer_cuenta_se_rinde(monkeypatch):
+    lecturas_gpio(monkeypatch, [None, None, None])
+    with pytest.raises(hx711.ErrorHX711):
+        hx711.leer_cuenta(0, 5, 6, intentos=3)
+
+
+def test_leer_gpio_grupo_separa_los_chips(monkeypatch):
+    # bit i de cada group_read es el DOUT del chip i
+    cuentas = [0x123456, 0xFFFFFE, 0x000001]
+    palabras = [sum(((c >> (23 - b)) & 1) << i for i, c in enumerate(cuentas)) for b in range(24)]
+    lecturas = iter(palabras)
+    monkeypatch.setattr(hx711.lgpio, 'group_read', lambda h, gpio: [3, next(lecturas)])
+    monkeypatch.setattr(hx711.lgpio, 'gpio_write', lambda h, gpio, nivel: 0)
+    monkeypatch.setattr(hx711, 'T_ALTO_MAX', float('inf'))
+    assert hx711.leer_gpio_grupo(0, [16, 17, 18], 6) == [0x123456, -2, 1]
@@ -0,0 +1,46 @@
+import pytest
+
+import max30102
+
+
+def sample_bytes(red, ir):
+    return [(red >> 16) & 0xFF, (red >> 8) & 0xFF, red & 0xFF,
+            (ir >> 16) & 0xFF, (ir >> 8) & 0xFF, ir & 0xFF]
+
+
+def test_decode_fifo():
+    samples = [(0x012345, 0x03ABCD), (0, 0x03FFFF), (0x20000, 1)]
+    data = []
+    for red, ir in samples:
+        data.extend(sample_bytes(red, ir))
+    red, ir = max30102.decode_fifo(data)
+    assert red.tolist() == [s[0] for s in samples]
+    assert ir.tolist() == [s[1] for s in samples]
+
+
+def test_decode_fifo_masks_unused_bits():
+    red, ir = max30102.decode_fifo([0xFF] * max30102.BYTES_PER_SAMPLE)
+    assert red.tolist() == [0x03FFFF]
+    assert ir.tolist() == [0x03FFFF]
+
+
+def test_decode_fifo_empty():
+    red, ir = max30102.decode_fifo([])
+    assert red.size == 0 and ir.size == 0
+
+
+def test_block_reads_fit_in_smbus_limit():
+    assert max30102.SAMPLES_PER_BLOCK * max30102.BYTES_PER_SAMPLE <= 32
+
+
+@pytest.mark.parametrize('write_ptr, ovf_counter, read_ptr, expected', [
+    (0, 0, 0, 0),
+    (5, 0, 2, 3),
+    (2, 0, 30, 4),
+    (31, 0, 0, 31),
+    # equal pointers after an overflow: the FIFO is full
+    (7, 3, 7, 32),
+    (9, 1, 4, 5),
+])
+def test_fifo_samples(write_ptr, ovf_counter, read_ptr, expected):
+    assert max30102.fifo_samples(write_ptr, ovf_counter, read_ptr) == expected
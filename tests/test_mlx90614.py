@@ -0,0 +1,73 @@
+import pytest
+
+import mlx90614
+
+
+class Bus(object):
+    """
+    smbus de prueba: cada lectura de bloque devuelve la próxima respuesta de la lista.
+    """
+
+    def __init__(self, respuestas):
+        self.respuestas = list(respuestas)
+        self.lecturas = []
+
+    def read_i2c_block_data(self, direccion, reg, n):
+        self.lecturas.append((direccion, reg, n))
+        return list(self.respuestas.pop(0))
+
+
+def respuesta(palabra, reg, direccion=mlx90614.DIRECCION):
+    bajo, alto = palabra & 0xFF, palabra >> 8
+    pec = mlx90614.crc8((direccion << 1, reg, (direccion << 1) | 1, bajo, alto))
+    return [bajo, alto, pec]
+
+
+def test_crc8_valor_de_control():
+    # valor de control del CRC-8/SMBus
+    assert mlx90614.crc8(b'123456789') == 0xF4
+    assert mlx90614.crc8(b'6789', mlx90614.crc8(b'12345')) == 0xF4
+
+
+def test_a_celsius():
+    assert mlx90614.a_celsius(0x3AF7) == pytest.approx(0x3AF7 * 0.02 - 273.15)
+    assert mlx90614.a_celsius([13658, 15507]).tolist() == pytest.approx([0.01, 36.99])
+
+
+def test_lee_palabra_con_pec_correcto():
+    sensor = mlx90614.MLX90614(bus=Bus([respuesta(15507, mlx90614.TOBJ1)]))
+    assert sensor.leer_palabra(mlx90614.TOBJ1) == 15507
+    assert sensor.errores_pec == 0
+
+
+def test_pec_invalido_reintenta():
+    malo = respuesta(15507, mlx90614.TOBJ1)
+    malo[2] ^= 0x01
+    bus = Bus([malo, respuesta(15507, mlx90614.TOBJ1)])
+    sensor = mlx90614.MLX90614(bus=bus)
+    assert sensor.object_temperature == pytest.approx(36.99)
+    assert sensor.errores_pec == 1
+    assert len(bus.lecturas) == 2
+
+
+def test_pec_siempre_invalido_lanza_error():
+    malo = respuesta(15507, mlx90614.TA)
+    malo[2] ^= 0x01
+    sensor = mlx90614.MLX90614(bus=Bus([malo] * 3), intentos=3)
+    with pytest.raises(mlx90614.ErrorMLX90614):
+        sensor.leer_palabra(mlx90614.TA)
+    assert sensor.errores_pec == 3
+
+
+def test_bandera_de_error():
+    sensor = mlx90614.MLX90614(bus=Bus([respuesta(0x8000 | 15507, mlx90614.TOBJ1)]))
+    with pytest.raises(OSError):
+        sensor.leer_palabra(mlx90614.TOBJ1)
+
+
+def test_leer_lote():
+    fila = [respuesta(14907, mlx90614.TA), respuesta(15507, mlx90614.TOBJ1)]
+    sensor = mlx90614.MLX90614(bus=Bus(fila * 2))
+    lote = sensor.leer_lote(2)
+    assert lote.shape == (2, 2)
+    assert lote[1].tolist() == pytest.approx([24.99, 36.99])
@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from max30102 import FifoBatch
+from ppg_batch import load_trace
+from ppg_recording import PpgRecorder, PpgRecording, ReplaySensor, is_recording
+
+
+def record(path, profile='low_power', batches=3, size=10):
+    red = np.arange(batches * size, dtype=np.int64) + 90000
+    ir = np.arange(batches * size, dtype=np.int64) + 110000
+    with PpgRecorder(str(path), profile) as recorder:
+        for i in range(batches):
+            part = slice(i * size, (i + 1) * size)
+            recorder.write_batch(FifoBatch(red[part], ir[part], 0, float(i)))
+    return red, ir
+
+
+def test_round_trip(tmp_path):
+    path = tmp_path / 'trace.ppg'
+    red, ir = record(path)
+    assert is_recording(str(path))
+    recording = PpgRecording(str(path))
+    assert len(recording) == len(red)
+    assert recording.profile_name == 'low_power'
+    assert recording.red.tolist() == red.tolist()
+    assert recording.ir.tolist() == ir.tolist()
+    assert recording.timestamp.tolist() == [0.0] * 10 + [1.0] * 10 + [2.0] * 10
+
+
+def test_not_a_recording(tmp_path):
+    path = tmp_path / 'trace.txt'
+    path.write_text('IR, Red\n1, 2\n')
+    assert not is_recording(str(path))
+    with pytest.raises(ValueError):
+        PpgRecording(str(path))
+
+
+def test_replay_as_fast_as_read(tmp_path):
+    path = tmp_path / 'trace.ppg'
+    red, ir = record(path, batches=4, size=20)
+    sensor = ReplaySensor(str(path), speed=None)
+    replayed = []
+    while not sensor.finished:
+        replayed.extend(sensor.read_fifo_batch().ir.tolist())
+    assert replayed == ir.tolist()
+
+
+def test_load_trace_reports_the_profile(tmp_path):
+    path = tmp_path / 'trace.ppg'
+    red, ir = record(path, profile='high_resolution')
+    loaded_ir, loaded_red, profile = load_trace(str(path))
+    assert profile == 'high_resolution'
+    assert loaded_ir.tolist() == ir.tolist()
+
+    raw = tmp_path / 'trace.txt'
+    raw.write_text('IR, Red\n110000, 90000\n110001, 90001\n')
+    loaded_ir, loaded_red, profile = load_trace(str(raw))
+    assert profile is None
+    assert loaded_ir.tolist() == [110000, 110001]
+    assert loaded_red.tolist() == [90000, 90001]
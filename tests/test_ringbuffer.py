@@ -0,0 +1,56 @@
+import pytest
+
+from ringbuffer import RingBuffer
+
+
+def test_view_before_full():
+    buf = RingBuffer(5)
+    buf.extend([1, 2, 3])
+    assert len(buf) == 3
+    assert not buf.full
+    assert buf.view().tolist() == [1, 2, 3]
+    assert buf.view(2).tolist() == [2, 3]
+    assert buf.view(10).tolist() == [1, 2, 3]
+
+
+def test_wraps_in_order():
+    buf = RingBuffer(4)
+    for value in range(1, 12):
+        buf.append(value)
+        expected = list(range(max(1, value - 3), value + 1))
+        assert buf.view().tolist() == expected
+    assert buf.full
+    assert len(buf) == 4
+    assert buf.count == 11
+
+
+def test_append_returns_dropped():
+    buf = RingBuffer(2)
+    assert buf.append(1) is None
+    assert buf.append(2) is None
+    assert buf.append(3) == 1
+    assert buf.append(4) == 2
+
+
+def test_view_is_contiguous_and_live():
+    buf = RingBuffer(3)
+    buf.extend([1, 2, 3, 4])
+    view = buf.view()
+    assert view.flags['C_CONTIGUOUS']
+    assert view.base is not None
+    buf.append(5)
+    assert buf.view().tolist() == [3, 4, 5]
+
+
+def test_mean_and_clear():
+    buf = RingBuffer(3, dtype=float)
+    buf.extend([1.0, 2.0, 4.0, 6.0])
+    assert buf.mean() == pytest.approx(4.0)
+    buf.clear()
+    assert len(buf) == 0
+    assert buf.view().size == 0
+
+
+def test_capacity_must_be_positive():
+    with pytest.raises(ValueError):
+        RingBuffer(0)
@@ -0,0 +1,62 @@
+import pytest
+
+import rotador2
+
+# pines sin dispositivo simulado: quedan en alto, como el encoder en reposo
+CLK = 16
+DT = 17
+# (clk, dt) en sentido horario desde el reposo
+HORARIO = ((1, 1), (0, 1), (0, 0), (1, 0))
+
+
+@pytest.fixture
+def encoder():
+    encoder = rotador2.DecodificadorKY040(CLK, DT, quieto=0.05)
+    yield encoder
+    encoder.cleanup()
+
+
+def girar(pasos, desde=0):
+    """
+    Alertas de `pasos` pasos de cuadratura (negativo es antihorario), en orden.
+    """
+    sentido = 1 if pasos > 0 else -1
+    for n in range(desde, desde + pasos, sentido):
+        antes, despues = HORARIO[n % 4], HORARIO[(n + sentido) % 4]
+        for pin, a, d in ((CLK, antes[0], despues[0]), (DT, antes[1], despues[1])):
+            if a != d:
+                rotador2.lgpio.emitir(pin, d, 0.0)
+
+
+def test_tabla_cuadratura():
+    tabla = rotador2.TABLA_CUADRATURA
+    for anterior in range(4):
+        assert tabla[anterior << 2 | anterior] == 0
+        # los dos pines cambiados no tienen sentido
+        assert tabla[anterior << 2 | (anterior ^ 3)] == 0
+        for nuevo in range(4):
+            assert tabla[anterior << 2 | nuevo] == -tabla[nuevo << 2 | anterior]
+    estados = [clk << 1 | dt for clk, dt in HORARIO]
+    vuelta = zip(estados, estados[1:] + estados[:1])
+    assert sum(tabla[a << 2 | b] for a, b in vuelta) == 4
+
+
+def test_cuenta_cada_flanco(encoder):
+    girar(40)
+    assert encoder.position == 40
+    assert encoder.get_counter() == pytest.approx(40 * rotador2.CM_POR_PASO / 2)
+    girar(-10, desde=40)
+    assert encoder.position == 30
+    assert encoder.errores == 0
+    assert encoder.asentado.wait(1)
+
+
+def test_nivel_repetido_es_un_flanco_perdido(encoder):
+    girar(1)
+    # CLK vuelve a bajar sin haber subido: no se sabe el sentido
+    rotador2.lgpio.emitir(CLK, 0, 0.0)
+    assert encoder.errores == 1
+    assert encoder.position == 1
+    girar(3, desde=1)
+    assert encoder.position == 4
+    assert encoder.errores == 1
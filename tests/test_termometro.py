@@ -0,0 +1,84 @@
+import pytest
+
+import termometro
+
+
+class Sensor(object):
+    """
+    MLX90614 de prueba: devuelve las temperaturas de la lista, una por
+    lectura; con `repetir` vuelve a empezar al terminarla.
+    """
+
+    def __init__(self, objetos, ambiente=25.0, repetir=False):
+        self.objetos = list(objetos)
+        self.ambiente = ambiente
+        self.repetir = repetir
+
+    @property
+    def object_temperature(self):
+        if not self.objetos:
+            raise OSError("NACK")
+        valor = self.objetos.pop(0)
+        if self.repetir:
+            self.objetos.append(valor)
+        if isinstance(valor, Exception):
+            raise valor
+        return valor
+
+    @property
+    def ambient_temperature(self):
+        return self.ambiente
+
+
+def test_promedio_recorta_y_guarda_el_ambiente():
+    # cualquier tramo de 5 lecturas tiene los mismos valores
+    t = termometro.TermometroMLX90614(periodo=0.001, sensor=Sensor([36.0, 36.2, 50.0, 36.1, 36.3], repetir=True))
+    offset = t.cal.obtener('termometro', 'offset')
+    try:
+        assert t.promedio(5, recorte=0.2, timeout=2) == pytest.approx(36.2 + offset)
+        assert set(t.ambiente.view(5).tolist()) == {25.0}
+    finally:
+        t.close()
+
+
+def test_errores_de_bus_solo_se_cuentan():
+    t = termometro.TermometroMLX90614(periodo=0.001, sensor=Sensor([]))
+    try:
+        with pytest.raises(termometro.ErrorTermometro):
+            t.promedio(1, timeout=0.05)
+        assert t.errores >= 1
+        assert t.activo
+    finally:
+        t.close()
+
+
+def test_promedio_relanza_errores_inesperados():
+    t = termometro.TermometroMLX90614(periodo=0.001, sensor=Sensor([36.0, ValueError("dato raro")]))
+    try:
+        with pytest.raises(ValueError):
+            t.promedio(5, timeout=2)
+        assert not t.activo
+    finally:
+        t.close()
+
+
+def test_medir_corporal_espera_la_frente_y_que_se_asiente():
+    subida = [25.0, 25.1, 25.0, 34.0, 35.5, 35.9] + [36.0] * 30
+    t = termometro.TermometroMLX90614(periodo=0.001, sensor=Sensor(subida))
+    offset = t.cal.obtener('termometro', 'offset')
+    try:
+        medicion = t.medir_corporal(timeout=2)
+        assert medicion.convergio is True
+        assert medicion.objeto == pytest.approx(36.0 + offset, abs=0.05)
+        assert medicion.ambiente == 25.0
+    finally:
+        t.close()
+
+
+def test_medir_corporal_sin_frente():
+    t = termometro.TermometroMLX90614(periodo=0.001, sensor=Sensor([25.0], repetir=True))
+    try:
+        with pytest.raises(termometro.ErrorTermometro):
+            t.medir_corporal(timeout=0.1)
+    finally:
+        t.close()
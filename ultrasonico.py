@@ -0,0 +1,101 @@
+"""
+Medición del eco del HC-SR04 con alertas de lgpio.
+
+El kernel marca cada flanco de ECHO con su timestamp, así el ancho del
+pulso no depende de cuándo Python alcanza a leer el pin y no hace falta
+un bucle de espera activa.
+"""
+
+import math
+import threading
+import time
+from bisect import insort
+
+from estadistica_robusta import ESCALA_MAD, mad_ordenada, mediana_ordenada
+from hal import lgpio
+
+VELOCIDAD_SONIDO = 34300.0  # cm/s
+# error estándar de la mediana / error estándar de la media, ruido normal (sqrt(pi/2))
+EFICIENCIA_MEDIANA = 1.2533
+
+
+class EcoHCSR04(object):
+    """
+    HC-SR04 con TRIG como salida y ECHO como alerta de ambos flancos.
+    """
+
+    def __init__(self, h, trig, echo):
+        self.h = h
+        self.trig = trig
+        self.echo = echo
+        self._subida = None
+        self._ancho = None
+        self._listo = threading.Event()
+        lgpio.gpio_claim_output(h, trig, 0)
+        lgpio.gpio_claim_alert(h, echo, lgpio.BOTH_EDGES)
+        self._callback = lgpio.callback(h, echo, lgpio.BOTH_EDGES, self._flanco)
+
+    def _flanco(self, chip, gpio, nivel, timestamp):
+        if nivel == 1:
+            self._subida = timestamp
+        elif nivel == 0 and self._subida is not None:
+            self._ancho = (timestamp - self._subida) / 1e9
+            self._subida = None
+            self._listo.set()
+
+    def medir_ancho(self, timeout=0.03):
+        """
+        Dispara un pulso y devuelve el ancho del eco en segundos, None si no llegó en `timeout`.
+        """
+        self._listo.clear()
+        self._subida = None
+        self._ancho = None
+        lgpio.gpio_write(self.h, self.trig, 1)
+        time.sleep(0.00001)
+        lgpio.gpio_write(self.h, self.trig, 0)
+        if not self._listo.wait(timeout):
+            return None
+        return self._ancho
+
+    def medir(self, timeout=0.03):
+        """
+        Distancia en cm, None si no hubo eco.
+        """
+        ancho = self.medir_ancho(timeout)
+        if ancho is None:
+            return None
+        return ancho * VELOCIDAD_SONIDO / 2
+
+    def close(self):
+        self._callback.cancel()
+        lgpio.gpio_free(self.h, self.echo)
+
+
+class MedianaSecuencial(object):
+    """
+    Mediana y MAD de las lecturas a medida que llegan, con el semiancho del
+    intervalo de confianza de la mediana (z=1.96 es el 95%).
+    """
+
+    def __init__(self, z=1.96):
+        self.z = z
+        self.ordenadas = []
+
+    @property
+    def n(self):
+        return len(self.ordenadas)
+
+    def agregar(self, x):
+        insort(self.ordenadas, x)
+
+    def mediana(self):
+        return mediana_ordenada(self.ordenadas)
+
+    def mad(self):
+        return mad_ordenada(self.ordenadas)
+
+    def semiancho(self):
+        if len(self.ordenadas) < 2:
+            return float('inf')
+        sigma = ESCALA_MAD * self.mad()
+        return self.z * EFICIENCIA_MEDIANA * sigma / math.sqrt(len(self.ordenadas))